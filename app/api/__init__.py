@@ -1,11 +1,29 @@
 from fastapi import APIRouter
 
-from .routes import auth, download_tools, google_sheet, updater
+from app.utils import AdmissionGroup
+
+from .routes import (
+    auth,
+    download_tools,
+    flashship,
+    fulfilment,
+    google_sheet,
+    label,
+    updater,
+)
 
 api_router = APIRouter()
 api_router.include_router(
-    updater.router, prefix="/aiotts/update", tags=["Update AIOTTS"]
+    updater.create_update_router("aiotts"),
+    prefix="/aiotts/update",
+    tags=["Update AIOTTS"],
 )
+api_router.include_router(
+    updater.create_update_router("autopts"),
+    prefix="/autopts/update",
+    tags=["Update AutoPTS"],
+)
+api_router.include_router(updater.router, prefix="/update", tags=["Update"])
 api_router.include_router(
     download_tools.router,
     prefix="/aiotts",
@@ -13,6 +31,65 @@ api_router.include_router(
 )
 api_router.include_router(auth.router, prefix="/aiotts/auth", tags=["Authentication"])
 api_router.include_router(google_sheet.router, prefix="/aiotts/order", tags=["Orders"])
+api_router.include_router(label.router, prefix="/aiotts/label", tags=["Label"])
+api_router.include_router(
+    fulfilment.router, prefix="/aiotts/fulfilment-china", tags=["Fulfilment China"]
+)
+api_router.include_router(
+    flashship.router, prefix="/aiotts/flashship", tags=["FlashShip"]
+)
+
+# Concurrency limits and queue-time budgets per route group, in every worker. The
+# sync routes of the heavy groups (Sheets, label, fulfilment) use at most 24 of the
+# THREADPOOL_SIZE threads together, the rest is kept for the auth and update checks.
+# The downloads only hold a thread of the routes to open the file, their chunks are
+# read by the DOWNLOAD_READ_THREADS threads of the file reads (see FileRangeResponse).
+admission_groups = [
+    AdmissionGroup(
+        "update",
+        ["/aiotts/update", "/autopts/update", "/update"],
+        max_concurrent=64,
+        max_queue=256,
+        max_wait=2.0,
+    ),
+    AdmissionGroup(
+        "update_download",
+        ["/aiotts/update/download", "/autopts/update/download"],
+        max_concurrent=128,
+        max_queue=128,
+        max_wait=10.0,
+    ),
+    AdmissionGroup(
+        "download",
+        ["/aiotts/installer", "/aiotts/dependencies"],
+        max_concurrent=256,
+        max_queue=256,
+        max_wait=10.0,
+    ),
+    AdmissionGroup(
+        "auth", ["/aiotts/auth"], max_concurrent=64, max_queue=256, max_wait=2.0
+    ),
+    AdmissionGroup(
+        "sheets", ["/aiotts/order"], max_concurrent=8, max_queue=32, max_wait=5.0
+    ),
+    AdmissionGroup(
+        "label", ["/aiotts/label"], max_concurrent=8, max_queue=32, max_wait=2.0
+    ),
+    AdmissionGroup(
+        "fulfilment",
+        ["/aiotts/fulfilment-china"],
+        max_concurrent=8,
+        max_queue=32,
+        max_wait=2.0,
+    ),
+    AdmissionGroup(
+        "flashship",
+        ["/aiotts/flashship"],
+        max_concurrent=32,
+        max_queue=64,
+        max_wait=5.0,
+    ),
+]
 
 
-__all__ = ["api_router"]
+__all__ = ["api_router", "admission_groups"]
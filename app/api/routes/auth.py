@@ -1,19 +1,28 @@
 import json
-import os
+from functools import lru_cache
 
-from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
 from starlette.responses import JSONResponse
 
 import app.database.models as models
+from app.config import Config, get_config
 from app.database.crud import get_user_info, get_uuid
-from app.utils import get_db, validate_apikey
-
-router = APIRouter()
-
-
-load_dotenv(override=True)
+from app.utils import (
+    ProfilingRoute,
+    SharedCache,
+    const,
+    get_db,
+    settings_store,
+    update_manifests,
+    validate_apikey,
+)
+
+router = APIRouter(route_class=ProfilingRoute)
+
+# Known device uuids, a burst of checks of a device reaches the database once per
+# UUID_CACHE_TTL, which is kept short since it delays the revocation of a uuid
+uuid_cache = SharedCache("uuid", ttl=const.UUID_CACHE_TTL)
 
 ## SEARCH API ##
 
@@ -26,6 +35,12 @@ def check_uuid(
 ):
     validate_apikey(api_key)
 
+    if uuid_cache.get(value):
+        return JSONResponse(
+            status_code=200,
+            content={"status": "found"},
+        )
+
     uuid: models.UUID = get_uuid(value, db)
     if uuid is None:
         return JSONResponse(
@@ -33,6 +48,9 @@ def check_uuid(
             content={"status": "not_found"},
         )
 
+    # Only found uuids are cached, a new device is seen as soon as it is registered
+    uuid_cache.set(value, True)
+
     return JSONResponse(
         status_code=200,
         content={"status": "found"},
@@ -69,18 +87,34 @@ def search_user_by_email(
         )
 
 
+# Built once per configuration, a reload builds them again on the next request
+@lru_cache(maxsize=1)
+def login_expired_day_body(config: Config) -> bytes:
+    # Default value is 1 day
+    return (config.login_expired_days or "1").encode("utf-8")
+
+
+@lru_cache(maxsize=1)
+def telegram_settings_body(config: Config) -> bytes:
+    return json.dumps(
+        {
+            "bot_token": config.telegram_bot_token,
+            "channel_id": config.telegram_channel_id,
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
 @router.get("/search/login-expired-day")
 def check_login_expired_day(api_key: str = Query(default="")):
     validate_apikey(api_key)
 
-    expired_days: str = os.getenv("LOGIN_EXPIRED_DAYS")
-
-    if not expired_days:  # Default value is 1 day
-        return Response(content="1", status_code=200, media_type="application/text")
-    else:
-        return Response(
-            content=expired_days, status_code=200, media_type="application/text"
-        )
+    return Response(
+        content=login_expired_day_body(get_config()),
+        status_code=200,
+        media_type="application/text",
+    )
 
 
 ## GET SETTINGS ##
@@ -90,19 +124,66 @@ def check_login_expired_day(api_key: str = Query(default="")):
 def get_telegram_settings(api_key: str = Query(default="")):
     validate_apikey(api_key)
 
-    telegram_bot_token: str = os.getenv("TELEGRAM_BOT_TOKEN")
-    telebot_channel_id: str = os.getenv("TELEGRAM_CHANNEL_ID")
+    return Response(
+        content=telegram_settings_body(get_config()),
+        status_code=200,
+        media_type="application/json",
+    )
+
+
+@router.get("/settings/fulfilment-china")
+def get_fulfilment_china_settings(api_key: str = Query(default="")):
+    validate_apikey(api_key)
+
+    if settings_store.version == 0:
+        return JSONResponse(
+            status_code=503,
+            content={"message": "settings_not_loaded"},
+        )
 
     return JSONResponse(
         status_code=200,
-        content={"bot_token": telegram_bot_token, "channel_id": telebot_channel_id},
+        content={
+            "tier_1_keywords": settings_store.tier_1_keywords,
+            "tier_2_keywords": settings_store.tier_2_keywords,
+        },
     )
 
 
 @router.get("/update/checksum")
-def get_md5_checksum_of_update_version(
-    version: str, api_key: str = Query(default=""), db: Session = Depends(get_db)
-):
+def get_md5_checksum_of_update_version(version: str, api_key: str = Query(default="")):
     validate_apikey(api_key)
 
-    pass
+    update_info: dict = settings_store.update_infos.get(version)
+    if update_info is not None:
+        if not update_info["is_active"]:
+            return JSONResponse(
+                status_code=404,
+                content={"message": "version_not_found"},
+            )
+
+        return JSONResponse(
+            status_code=200,
+            content={
+                "version": update_info["version"],
+                "md5_checksum": update_info["md5_checksum"],
+                "is_required": update_info["is_required"],
+            },
+        )
+
+    # Versions not registered in the database fall back to the uploaded package
+    release = update_manifests["aiotts"].get_release(version)
+    if release is None or release["package"] is None:
+        return JSONResponse(
+            status_code=404,
+            content={"message": "version_not_found"},
+        )
+
+    return JSONResponse(
+        status_code=200,
+        content={
+            "version": version,
+            "md5_checksum": release["package"]["md5"],
+            "is_required": False,
+        },
+    )
@@ -1,50 +1,51 @@
 import logging
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request
 
-from app.utils import setup_logger
+from app.utils import ProfilingRoute, ranged_file_response, setup_logger
 
 logger = logging.getLogger(__name__)
 setup_logger(logger)
 
-router = APIRouter()
+router = APIRouter(route_class=ProfilingRoute)
 
 
 @router.get("/installer")
-def download_installer(file_name: str):
+def download_installer(file_name: str, request: Request):
+    # A plain file name of uploads/, never a path out of it or a hidden temp file
+    if (
+        Path(file_name).name != file_name
+        or "\\" in file_name
+        or file_name[:1] in ("", ".")
+    ):
+        raise HTTPException(status_code=400, detail="Invalid file name")
+
     file_path = Path(f"./uploads/{file_name}")
 
     # Print the file path as the logger and return the file
-    logger.info(f"Requested file path: {file_path}")
+    logger.info("Requested file path: %s", file_path)
 
-    if not file_path.exists():
-        logger.error(f"File not found: {file_path}")
+    try:
+        return ranged_file_response(request, file_path, filename=file_name)
+    except FileNotFoundError:
+        logger.error("File not found: %s", file_path)
         raise HTTPException(status_code=404, detail=f"File {file_name} not found")
 
-    return FileResponse(
-        file_path,
-        media_type="application/octet-stream",
-        filename=file_name,
-    )
-
 
 @router.get("/dependencies/ocr")
-def download_ocr_dependencies():
+def download_ocr_dependencies(request: Request):
     file_path = Path("./dependencies/Tesseract-OCR-Setup.exe")
 
     # Print the file path as the logger and return the file
-    logger.info(f"Requested file path: {file_path}")
+    logger.info("Requested file path: %s", file_path)
 
-    if not file_path.exists():
-        logger.error(f"File not found: {file_path}")
+    try:
+        return ranged_file_response(
+            request, file_path, filename="Tesseract-OCR-Setup.exe"
+        )
+    except FileNotFoundError:
+        logger.error("File not found: %s", file_path)
         raise HTTPException(
             status_code=404, detail="File Tesseract-OCR-Setup.exe not found"
         )
-
-    return FileResponse(
-        file_path,
-        media_type="application/octet-stream",
-        filename="Tesseract-OCR-Setup.exe",
-    )
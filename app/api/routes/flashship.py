@@ -0,0 +1,231 @@
+import asyncio
+import logging
+
+import httpx
+from fastapi import APIRouter, HTTPException
+from starlette.responses import JSONResponse
+
+from app.api.schema.flashship import (
+    BulkOrderItem,
+    CancelOrderBody,
+    LoginBody,
+    OrderData,
+    OrderItem,
+    OrderStatusBody,
+)
+from app.utils import (
+    ProfilingRoute,
+    const,
+    flashship_client,
+    response_content,
+    setup_logger,
+    validate_apikey,
+)
+
+logger = logging.getLogger(__name__)
+setup_logger(logger)
+
+router = APIRouter(route_class=ProfilingRoute)
+
+# Never forwarded to FlashShip
+AUTH_FIELDS = {"access_token", "api_key"}
+
+
+def check_mode(mode: str) -> str:
+    if mode not in flashship_client.endpoints:
+        raise HTTPException(status_code=400, detail="Invalid mode")
+
+    if not flashship_client.endpoints[mode]:
+        raise HTTPException(
+            status_code=503, detail=f"FlashShip {mode} endpoint is not configured"
+        )
+
+    return mode
+
+
+def upstream_error(e: Exception, action: str) -> JSONResponse:
+    logger.error("Error while %s", action, exc_info=True)
+
+    return JSONResponse(
+        content={"msg": "fail", "error": str(e) or type(e).__name__},
+        status_code=504 if isinstance(e, httpx.TimeoutException) else 500,
+    )
+
+
+@router.post("/login")
+async def login(body: LoginBody, mode: str = "dev"):
+    validate_apikey(body.api_key)
+    mode = check_mode(mode)
+
+    try:
+        status_code, content = await flashship_client.login(
+            mode, body.username, body.password
+        )
+    except httpx.HTTPError as e:
+        return upstream_error(e, "logging in")
+
+    return JSONResponse(content=content, status_code=status_code)
+
+
+async def create_one_order(mode: str, order: OrderData, access_token: str) -> tuple:
+    response = await flashship_client.request(
+        mode,
+        "POST",
+        "/seller-api-v2/orders/shirt-add",
+        access_token=access_token,
+        json=order.model_dump(exclude=AUTH_FIELDS),
+    )
+
+    return response.status_code, response_content(response)
+
+
+@router.post("/order/create")
+async def create_order(body: OrderItem, mode: str = "dev"):
+    validate_apikey(body.api_key)
+    mode = check_mode(mode)
+
+    try:
+        status_code, content = await create_one_order(mode, body, body.access_token)
+    except httpx.HTTPError as e:
+        return upstream_error(e, "creating order")
+
+    return JSONResponse(content=content, status_code=status_code)
+
+
+@router.post("/order/create/bulk")
+async def create_orders(body: BulkOrderItem, mode: str = "dev"):
+    """
+    Creates many orders concurrently, at most FLASHSHIP_BULK_CONCURRENCY at a time.
+
+    Returns the FlashShip status code and response of every order, in the order of the body.
+    """
+    validate_apikey(body.api_key)
+    mode = check_mode(mode)
+
+    if len(body.orders) > const.FLASHSHIP_BULK_MAX_ORDERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {const.FLASHSHIP_BULK_MAX_ORDERS} orders per request",
+        )
+
+    semaphore = asyncio.Semaphore(const.FLASHSHIP_BULK_CONCURRENCY)
+
+    async def create(order: OrderData) -> dict:
+        async with semaphore:
+            try:
+                status_code, content = await create_one_order(
+                    mode, order, body.access_token
+                )
+            except httpx.HTTPError as e:
+                logger.error(
+                    "Error while creating order %s", order.order_id, exc_info=True
+                )
+                status_code = 504 if isinstance(e, httpx.TimeoutException) else 500
+                content = {"msg": "fail", "error": str(e) or type(e).__name__}
+
+        return {
+            "order_id": order.order_id,
+            "status_code": status_code,
+            "response": content,
+        }
+
+    results = await asyncio.gather(*(create(x) for x in body.orders))
+    failed = sum(1 for x in results if x["status_code"] >= 400)
+
+    logger.info("Created %d/%d FlashShip orders", len(results) - failed, len(results))
+
+    return JSONResponse(
+        content={"total": len(results), "failed": failed, "results": results},
+        status_code=200,
+    )
+
+
+@router.get("/order/details")
+async def get_order_detail(
+    api_key: str,
+    access_token: str,
+    order_code: str,
+    mode: str = "dev",
+):
+    validate_apikey(api_key)
+    mode = check_mode(mode)
+
+    try:
+        status_code, content = await flashship_client.get_order(
+            mode, order_code, access_token
+        )
+    except httpx.HTTPError as e:
+        return upstream_error(e, "getting order details")
+
+    return JSONResponse(content=content, status_code=status_code)
+
+
+@router.post("/order/details/batch")
+async def get_order_details(body: OrderStatusBody, mode: str = "dev"):
+    """
+    Returns the details of many orders, for polling their status.
+
+    Duplicate order codes are fetched once, at most FLASHSHIP_STATUS_CONCURRENCY at a
+    time. Finished orders are served from the cache of the access token without
+    reaching FlashShip, the in-flight ones at most once every FLASHSHIP_ORDER_TTL
+    seconds.
+    """
+    validate_apikey(body.api_key)
+    mode = check_mode(mode)
+
+    order_codes = list(dict.fromkeys(body.order_codes))
+    if len(order_codes) > const.FLASHSHIP_STATUS_MAX_ORDERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {const.FLASHSHIP_STATUS_MAX_ORDERS} orders per request",
+        )
+
+    semaphore = asyncio.Semaphore(const.FLASHSHIP_STATUS_CONCURRENCY)
+
+    async def get_one(order_code: str) -> dict:
+        async with semaphore:
+            try:
+                status_code, content = await flashship_client.get_order(
+                    mode, order_code, body.access_token
+                )
+            except httpx.HTTPError as e:
+                logger.error(
+                    "Error while getting order details %s", order_code, exc_info=True
+                )
+                status_code = 504 if isinstance(e, httpx.TimeoutException) else 500
+                content = {"msg": "fail", "error": str(e) or type(e).__name__}
+
+        return {
+            "order_code": order_code,
+            "status_code": status_code,
+            "response": content,
+        }
+
+    results = await asyncio.gather(*(get_one(x) for x in order_codes))
+    failed = sum(1 for x in results if x["status_code"] >= 400)
+
+    return JSONResponse(
+        content={"total": len(results), "failed": failed, "results": results},
+        status_code=200,
+    )
+
+
+@router.post("/order/cancel")
+async def cancel_order(body: CancelOrderBody, mode: str = "dev"):
+    validate_apikey(body.api_key)
+    mode = check_mode(mode)
+
+    try:
+        response = await flashship_client.request(
+            mode,
+            "POST",
+            "/seller-api-v2/orders/seller-reject",
+            access_token=body.access_token,
+            json=body.model_dump(exclude=AUTH_FIELDS),
+        )
+    except httpx.HTTPError as e:
+        return upstream_error(e, "canceling order")
+
+    return JSONResponse(
+        content=response_content(response), status_code=response.status_code
+    )
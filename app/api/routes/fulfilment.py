@@ -0,0 +1,63 @@
+import logging
+from typing import List
+
+from fastapi import APIRouter, Body, HTTPException, Query
+from starlette.responses import JSONResponse
+
+from app.utils import (
+    KeywordMatcher,
+    ProfilingRoute,
+    SettingsStore,
+    const,
+    settings_store,
+    setup_logger,
+    validate_apikey,
+)
+
+logger = logging.getLogger(__name__)
+setup_logger(logger)
+
+router = APIRouter(route_class=ProfilingRoute)
+
+keyword_matcher = KeywordMatcher()
+
+
+def recompile_keywords(store: SettingsStore) -> None:
+    if keyword_matcher.compile(store.tier_1_keywords, store.tier_2_keywords):
+        logger.info(
+            "Compiled keyword matcher with %d/%d keywords",
+            len(keyword_matcher.tier_1_keywords),
+            len(keyword_matcher.tier_2_keywords),
+        )
+
+
+settings_store.add_listener(recompile_keywords)
+
+
+@router.post("/classify")
+def classify_titles(body: List[str] = Body(...), api_key: str = Query(default="")):
+    validate_apikey(api_key)
+
+    if len(body) > const.CLASSIFY_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {const.CLASSIFY_BATCH_MAX_SIZE} titles are allowed per request",
+        )
+
+    if settings_store.version == 0:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "error", "message": "settings_not_loaded"},
+        )
+
+    results = keyword_matcher.classify_many(body)
+
+    return JSONResponse(
+        status_code=200,
+        content={
+            "status": "success",
+            "data": [
+                {"title": title, **result} for title, result in zip(body, results)
+            ],
+        },
+    )
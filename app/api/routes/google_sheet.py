@@ -4,23 +4,57 @@ import os
 import tempfile
 import traceback
 from datetime import datetime
-from typing import List
+from typing import Any, Callable, List
 
-import gspread
-import pandas as pd
-import polars as pl
-from dotenv import load_dotenv
-from fastapi import APIRouter, Response
-from oauth2client.service_account import ServiceAccountCredentials
+from fastapi import APIRouter, Depends, Header, Response
+from sqlalchemy.orm import Session
 
 from app.api.schema.google_sheet import SKUSToInsert
-from app.utils import setup_logger, validate_apikey
-
-load_dotenv(override=True)
+from app.config import get_config
+from app.database.crud import (
+    add_sheet_changes,
+    get_sheet_change_bounds,
+    get_sheet_changes,
+)
+from app.utils import (
+    ProfilingRoute,
+    const,
+    encode_sheet_rows,
+    find_duplicate_sku_rows,
+    find_sku_rows,
+    get_db,
+    get_sheet_change_cursor,
+    record_sheets_response,
+    run_idempotent,
+    search_sheet_rows,
+    setup_logger,
+    sheet_pool,
+    sheet_refresher,
+    sync_sheet_changes,
+    timed,
+    validate_admin_key,
+    validate_apikey,
+)
 
 logger = logging.getLogger(__name__)
 setup_logger(logger)
 
+# The columns A:L written by insert_new_sku
+DESIGN_SHEET_COLUMNS = [
+    "SKU",
+    "Product Name",
+    "Variation",
+    "Image 1 (front)",
+    "Image 2 (back)",
+    "Mockup Front",
+    "Mockup Back",
+    "Mockup (For Onos)",
+    "Image front (Beefun)",
+    "Image back (Beefun)",
+    "Created at",
+    "User",
+]
+
 
 class GoogleSheetWorker:
     """
@@ -28,13 +62,15 @@ class GoogleSheetWorker:
 
     Attributes:
         scopes (list): A list of Google API scopes required for accessing Google Sheets and Drive.
+        client_factory (Callable | None): When set, returns the client used instead of an authorized gspread client (e.g. an offline double).
         workbook_name (str): The name of the Google Sheets workbook.
 
     Methods:
         __init__(self, workbook_name: str) -> None: Initializes a new instance of the GoogleSheetWorker class.
-        read_sheet_data(self, sheet_name: str) -> dict: Reads data from a specific sheet in the workbook.
+        read_sheet_table(self, sheet_name: str) -> dict: Reads the raw table of a specific sheet in the workbook.
         insert_new_sku(self, seller_name: str, sheet_name: str, new_sku_data: list) -> dict: Inserts new SKU data into a specific sheet.
         delete_rows(self, sheet_name: str, sku_ids: List[str]): Deletes rows from a specific sheet based on SKU IDs.
+        compact_duplicate_rows(self, sheet_name: str) -> dict: Deletes the duplicate rows of the SKUs of a specific sheet.
     """
 
     scopes = [
@@ -42,6 +78,8 @@ class GoogleSheetWorker:
         "https://www.googleapis.com/auth/drive",
     ]
 
+    client_factory: Callable[[], Any] | None = None
+
     def __init__(self, workbook_name: str) -> None:
         """
         Initializes a new instance of the GoogleSheetWorker class.
@@ -51,57 +89,81 @@ class GoogleSheetWorker:
         """
         self.workbook_name = workbook_name
 
-        # Get the path to the secret file
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            with open(os.path.join(tmpdirname, "sheet_secret_key.json"), "w") as f:
-                json.dump(
-                    json.loads(os.getenv("SHEET_SECRET_KEY")),
-                    f,
-                    indent=4,
-                    ensure_ascii=False,
+        # Looked up on the class so a plain function is not bound as a method
+        client_factory = type(self).client_factory
+        if client_factory is not None:
+            self.files = client_factory()
+            return
+
+        # Imported here, the Sheets stack is only loaded by workers that use it
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+
+        with timed("sheets.authorize"):
+            # Get the path to the secret file
+            with tempfile.TemporaryDirectory() as tmpdirname:
+                with open(os.path.join(tmpdirname, "sheet_secret_key.json"), "w") as f:
+                    json.dump(
+                        json.loads(get_config().sheet_secret_key),
+                        f,
+                        indent=4,
+                        ensure_ascii=False,
+                    )
+
+                # Get the credentials
+                self.creds = ServiceAccountCredentials.from_json_keyfile_name(
+                    filename=os.path.join(tmpdirname, "sheet_secret_key.json"),
+                    scopes=self.scopes,  # type: ignore
                 )
+            # Authorize the client
+            self.files = gspread.authorize(self.creds)
 
-            # Get the credentials
-            self.creds = ServiceAccountCredentials.from_json_keyfile_name(
-                filename=os.path.join(tmpdirname, "sheet_secret_key.json"),
-                scopes=self.scopes,  # type: ignore
-            )
-        # Authorize the client
-        self.files = gspread.authorize(self.creds)
+        # Count the calls and bytes of every Google API request of this client
+        self.files.session.hooks["response"].append(record_sheets_response)
+        self.files.session.hooks["response"].append(sheet_refresher.record_response)
+
+    def _fetch_table(self, sheet_name: str) -> tuple:
+        with timed("sheets.open_workbook"):
+            workbook = self.files.open(self.workbook_name)
+            sheet = workbook.worksheet(sheet_name)
+
+        with timed("sheets.fetch_range"):
+            if sheet_name.find("PHONGKD") != -1:
+                table = sheet.get("A1:J200000")
+            else:
+                table = sheet.get_all_records()
+
+        return sheet, table
 
-    def read_sheet_data(self, sheet_name: str) -> dict:
+    def read_sheet_table(self, sheet_name: str) -> dict:
         """
-        Reads data from a specific sheet in the workbook.
+        Reads the raw table (header first) of a specific sheet in the workbook.
+
+        The table is left as is, so the row dicts can be built in the sheet pool.
 
         Args:
             sheet_name (str): The name of the sheet to read data from.
 
         Returns:
-            dict: A dictionary containing the status of the operation and the retrieved data.
+            dict: A dictionary containing the status of the operation, the retrieved table and the change feed cursor it was read at.
         """
-        logger.info(f"Reading data from sheet: {sheet_name}")
+        logger.info("Reading data from sheet: %s", sheet_name)
 
         try:
-            workbook = self.files.open(self.workbook_name)
-            sheet = workbook.worksheet(sheet_name)
-
-            if sheet_name.find("PHONGKD") != -1:
-                table = sheet.get("A1:J200000")
-            else:
-                table = sheet.get_all_records()
-
-            # Convert the table to a dataframe (skip the first row)
-            data = pd.DataFrame(table[1:], columns=table[0], dtype=str)
-            data_pl = pl.from_pandas(data)
-            data_pl_rows = data_pl.rows(named=True)
+            snapshot = sheet_refresher.get_snapshot(
+                self.workbook_name,
+                sheet_name,
+                lambda: self._fetch_table(sheet_name)[1],
+            )
 
             return {
                 "status": "success",
-                "data": data_pl_rows,
+                "table": snapshot["table"],
+                "cursor": snapshot["cursor"],
             }
         except Exception:
             logger.error(
-                f"Error when reading data from sheet: {sheet_name}", exc_info=True
+                "Error when reading data from sheet: %s", sheet_name, exc_info=True
             )
 
             err_str = traceback.format_exc()
@@ -126,12 +188,14 @@ class GoogleSheetWorker:
             dict: A dictionary containing the status of the operation and the inserted SKU data.
         """
         try:
-            workbook = self.files.open(self.workbook_name)
+            with timed("sheets.open_workbook"):
+                workbook = self.files.open(self.workbook_name)
 
-            sheet: gspread.Worksheet = workbook.worksheet(sheet_name)
+                sheet = workbook.worksheet(sheet_name)
 
             # Get the last row of the sheet
-            last_row = len(sheet.get("A1:J200000")) + 1
+            with timed("sheets.fetch_range"):
+                last_row = len(sheet.get("A1:J200000")) + 1
 
             # Create a new dict to store the position to insert for each sku
             row_to_insert = {}
@@ -162,15 +226,16 @@ class GoogleSheetWorker:
                 ):
                     is_light_green = not is_light_green
 
-            sheet.batch_format(
-                [
-                    {
-                        "range": f"A{row_to_insert[sku_id]}:H{row_to_insert[sku_id]}",
-                        "format": {"backgroundColor": color},
-                    }
-                    for sku_id, color in color_of_row.items()
-                ]
-            )
+            with timed("sheets.batch_format"):
+                sheet.batch_format(
+                    [
+                        {
+                            "range": f"A{row_to_insert[sku_id]}:H{row_to_insert[sku_id]}",
+                            "format": {"backgroundColor": color},
+                        }
+                        for sku_id, color in color_of_row.items()
+                    ]
+                )
 
             data_to_insert = []
 
@@ -221,11 +286,13 @@ class GoogleSheetWorker:
                         ],
                     }
                 )
-            sheet.batch_update(data_to_insert)
+            with timed("sheets.batch_update"):
+                sheet.batch_update(data_to_insert)
         except Exception:
             logger.error(
-                f"Error when inserting new SKU to sheet: {sheet_name}", exc_info=True
+                "Error when inserting new SKU to sheet: %s", sheet_name, exc_info=True
             )
+            sheet_refresher.invalidate(self.workbook_name, sheet_name)
 
             error_message = traceback.format_exc()
             return {
@@ -233,10 +300,16 @@ class GoogleSheetWorker:
                 "message": f"Error when inserting new SKU to sheet: {error_message}",
             }
         else:
+            sheet_refresher.invalidate(self.workbook_name, sheet_name)
+
             return {
                 "status": "success",
                 "message": "Insert new SKU to sheet successfully",
                 "data": [x["values"][0][0] for x in data_to_insert],
+                "rows": [
+                    dict(zip(DESIGN_SHEET_COLUMNS, x["values"][0]))
+                    for x in data_to_insert
+                ],
             }
 
     def delete_rows(self, sheet_name: str, sku_ids: List[str]):
@@ -252,38 +325,18 @@ class GoogleSheetWorker:
         """
         try:
             # Read the sheet
-            workbook = self.files.open(self.workbook_name)
-            sheet = workbook.worksheet(sheet_name)
-
-            logger.info(f"Reading data from sheet: {sheet_name}")
-
-            if sheet_name.find("PHONGKD") != -1:
-                table = sheet.get("A1:J200000")
-            else:
-                table = sheet.get_all_records()
-
-            data = pd.DataFrame(table[1:], columns=table[0], dtype=str)
-            data_pl = pl.from_pandas(data)
-            data_pl_rows = data_pl.rows(named=True)
-
-            # Get the dict that mapping from SKU ID to row index
-            sku_infos = {}
+            logger.info("Reading data from sheet: %s", sheet_name)
+            sheet, table = self._fetch_table(sheet_name)
 
             # Remove duplicates
             sku_ids = list(set(sku_ids))
 
-            for sku_id in sku_ids:
-                for idx, row in enumerate(data_pl_rows):
-                    if row["SKU"] == sku_id:
-                        print(f"Found SKU ID at index {idx + 3}")
-                        sku_infos[sku_id] = {
-                            "index": idx
-                            + 3,  # Skip 2 rows, and google sheet index starts from 1
-                            "data": row,
-                        }
-                        break
+            # Get the dict that mapping from SKU ID to row index
+            with timed("sheets.to_rows"):
+                sku_infos = sheet_pool.run(find_sku_rows, table, sku_ids)
 
-            logger.info(f"Deleting rows with SKU IDs: {sku_ids}")
+            logger.info("Deleting rows of %d SKU IDs", len(sku_ids))
+            logger.debug("Deleting rows with SKU IDs: %s", sku_ids)
 
             if len(sku_infos) == 0:
                 return {
@@ -297,9 +350,9 @@ class GoogleSheetWorker:
             )
 
             # Delete the rows
-            for sku_id, row_info in sku_infos.items():
-                sheet.delete_row(row_info["index"])  # Since we skip 2 rows
-                print(f"Deleted row at index {row_info['index']} with SKU ID: {sku_id}")
+            self._delete_sheet_rows(sheet, [x["index"] for x in sku_infos.values()])
+
+            sheet_refresher.invalidate(self.workbook_name, sheet_name)
 
             return {
                 "status": "success",
@@ -310,14 +363,200 @@ class GoogleSheetWorker:
         except Exception:
             logger.error("Error when deleting", exc_info=True)
 
+            # Some rows may have been deleted already
+            sheet_refresher.invalidate(self.workbook_name, sheet_name)
+
             error_str = traceback.format_exc()
             return {
                 "status": "error",
                 "message": f"Error when deleting row: {error_str}",
             }
 
+    def compact_duplicate_rows(self, sheet_name: str) -> dict:
+        """
+        Deletes the duplicate rows of the SKUs of a specific sheet, keeping the first row of each SKU.
+
+        The sheet is read, then the duplicate rows and the first rows of their SKUs
+        are read again right before the deletion. When any of them changed meanwhile
+        (an edit, or rows inserted or deleted above), nothing is deleted and the
+        compaction is reported as skipped. The rows are deleted with a single batch
+        update.
 
-router = APIRouter()
+        Args:
+            sheet_name (str): The name of the sheet to compact.
+
+        Returns:
+            dict: A dictionary containing the status of the operation and the number of deleted rows.
+        """
+        try:
+            sheet, table = self._fetch_table(sheet_name)
+
+            with timed("sheets.find_duplicates"):
+                duplicates = sheet_pool.run(find_duplicate_sku_rows, table)
+
+            if duplicates and not self._are_rows_unchanged(sheet, duplicates):
+                logger.warning(
+                    "Sheet %s of %s changed while being compacted, skipped",
+                    sheet_name,
+                    self.workbook_name,
+                )
+                return {
+                    "status": "success",
+                    "message": "The sheet changed during the compaction, retry later",
+                    "deleted": 0,
+                    "skipped": True,
+                }
+
+            indexes = [x["index"] for x in duplicates]
+            if indexes:
+                self._delete_sheet_rows(sheet, indexes)
+                sheet_refresher.invalidate(self.workbook_name, sheet_name)
+
+                logger.info(
+                    "Deleted %d duplicate rows of sheet %s of %s",
+                    len(indexes),
+                    sheet_name,
+                    self.workbook_name,
+                )
+
+            return {
+                "status": "success",
+                "message": "Compact the sheet successfully",
+                "deleted": len(indexes),
+                "skipped": False,
+            }
+        except Exception:
+            logger.error("Error when compacting sheet: %s", sheet_name, exc_info=True)
+            sheet_refresher.invalidate(self.workbook_name, sheet_name)
+
+            error_str = traceback.format_exc()
+            return {
+                "status": "error",
+                "message": f"Error when compacting sheet: {error_str}",
+            }
+
+    def _are_rows_unchanged(self, sheet, duplicates: List[dict]) -> bool:
+        """
+        Reads the duplicate rows and the first rows of their SKUs again with one batch
+        read, and checks they still hold what the compaction found.
+        """
+        columns = list(duplicates[0]["row"])
+        last_column = _column_letters(len(columns))
+
+        expected = {}
+        for duplicate in duplicates:
+            values = [str(duplicate["row"][x]) for x in columns]
+            expected[duplicate["index"]] = values
+            # The first row of the SKU only has to match apart from "Created at"
+            expected.setdefault(
+                duplicate["first_index"],
+                [None if x == "Created at" else v for x, v in zip(columns, values)],
+            )
+
+        indexes = sorted(expected)
+        with timed("sheets.verify_rows"):
+            ranges = sheet.batch_get([f"A{x}:{last_column}{x}" for x in indexes])
+
+        for index, value_range in zip(indexes, ranges):
+            values = [str(x) for x in (value_range[0] if value_range else [])]
+            values += [""] * (len(columns) - len(values))
+
+            for actual, wanted in zip(values, expected[index]):
+                if wanted is not None and actual != wanted:
+                    return False
+
+        return True
+
+    def _delete_sheet_rows(self, sheet, indexes: List[int]) -> None:
+        """
+        Deletes the rows at the given indexes with a single batch update.
+        """
+        # From the last row up, so a deletion does not shift the rows left to delete
+        requests = [
+            {
+                "deleteDimension": {
+                    "range": {
+                        "sheetId": sheet.id,
+                        "dimension": "ROWS",
+                        "startIndex": index - 1,
+                        "endIndex": index,
+                    }
+                }
+            }
+            for index in sorted(set(indexes), reverse=True)
+        ]
+
+        with timed("sheets.delete_rows"):
+            sheet.spreadsheet.batch_update({"requests": requests})
+
+        logger.debug("Deleted rows at indexes: %s", indexes)
+
+
+def sheet_response(func, table: list, *args) -> Response:
+    """
+    Returns the JSON response built by func(table, *args) in the sheet pool.
+    """
+    with timed("sheets.encode_rows"):
+        body = sheet_pool.run(func, table, *args)
+
+    return Response(content=body, status_code=200, media_type="application/json")
+
+
+def json_response(content, status_code: int = 200) -> Response:
+    with timed("json.encode"):
+        body = json.dumps(content, ensure_ascii=False, indent=4)
+
+    return Response(
+        content=body, status_code=status_code, media_type="application/json"
+    )
+
+
+def _column_letters(number: int) -> str:
+    """
+    Returns the A1 letters of a 1-based column number (1 -> A, 27 -> AA).
+    """
+    letters = ""
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+
+    return letters
+
+
+def fetch_sheet_table(workbook_name: str, sheet_name: str) -> list:
+    """
+    Fetches the table of a sheet, used by the refresh-ahead scheduler.
+    """
+    _, table = GoogleSheetWorker(workbook_name)._fetch_table(sheet_name)
+    return table
+
+
+sheet_refresher.fetcher = fetch_sheet_table
+sheet_refresher.cursor_reader = get_sheet_change_cursor
+sheet_refresher.add_listener(sync_sheet_changes)
+
+
+def log_sheet_changes(
+    workbook_name: str, sheet_name: str, operation: str, rows: List[dict], db: Session
+) -> None:
+    """
+    Appends the rows the routes changed to the version log of the change feed.
+    """
+    try:
+        add_sheet_changes(
+            workbook_name,
+            sheet_name,
+            [{"sku_id": x["SKU"], "operation": operation, "row": x} for x in rows],
+            db,
+        )
+        db.commit()
+    except Exception:
+        # The sheet is already modified, the next sync logs what is missing
+        db.rollback()
+        logger.error("Error when logging sheet changes", exc_info=True)
+
+
+router = APIRouter(route_class=ProfilingRoute)
 
 
 @router.get("/design/read")
@@ -326,20 +565,17 @@ def read_google_sheet(workbook_name: str, sheet_name: str, api_key: str = ""):
 
     sheet_worker = GoogleSheetWorker(workbook_name)
 
-    result = sheet_worker.read_sheet_data(sheet_name)
+    result = sheet_worker.read_sheet_table(sheet_name)
 
     if result["status"] == "error":
-        return Response(
-            content=json.dumps(result, ensure_ascii=False, indent=4),
-            status_code=400,
-            media_type="application/json",
-        )
+        return json_response(result, status_code=400)
 
-    return Response(
-        content=json.dumps(result, ensure_ascii=False, indent=4),
-        status_code=200,
-        media_type="application/json",
-    )
+    response = sheet_response(encode_sheet_rows, result["table"])
+    # The change feed cursor of this very table, see /design/changes
+    if result["cursor"] is not None:
+        response.headers["X-Sheet-Cursor"] = str(result["cursor"])
+
+    return response
 
 
 @router.post("/design/sku/search")
@@ -350,39 +586,12 @@ def search_design_by_sku_id(
 
     sheet_worker = GoogleSheetWorker(workbook_name)
 
-    result = sheet_worker.read_sheet_data(sheet_name)
+    result = sheet_worker.read_sheet_table(sheet_name)
 
     if result["status"] == "error":
-        return Response(
-            content=json.dumps(result, ensure_ascii=False, indent=4),
-            status_code=400,
-            media_type="application/json",
-        )
+        return json_response(result, status_code=400)
 
-    # Create a mapping from SKU to row data
-    mapping = {}
-    for row in result["data"]:
-        if row["SKU"]:
-            if row["SKU"].strip != "":
-                mapping[row["SKU"]] = row
-
-    # Remove duplicates
-    sku_ids: list = body
-    sku_ids = list(set(sku_ids))
-
-    result_data = {}
-
-    for sku_id in sku_ids:
-        if sku_id in mapping:
-            result_data[sku_id] = mapping[sku_id]
-        else:
-            result_data[sku_id] = None
-
-    return Response(
-        content=json.dumps(result_data, ensure_ascii=False, indent=4),
-        status_code=200,
-        media_type="application/json",
-    )
+    return sheet_response(search_sheet_rows, result["table"], body)
 
 
 @router.post("/design/sku/insert")
@@ -392,9 +601,32 @@ def insert_new_sku_ids(
     sheet_name: str,
     seller_name: str,
     api_key: str = "",
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
 ):
+    """
+    Appends new SKU rows to a sheet.
+
+    With an Idempotency-Key header, the retries of a request return its response
+    without writing the rows again.
+    """
     validate_apikey(api_key)
 
+    return run_idempotent(
+        ("insert", workbook_name, sheet_name),
+        idempotency_key,
+        {"body": body, "seller_name": seller_name},
+        lambda: insert_skus(body, workbook_name, sheet_name, seller_name, db),
+    )
+
+
+def insert_skus(
+    body: List[SKUSToInsert],
+    workbook_name: str,
+    sheet_name: str,
+    seller_name: str,
+    db: Session,
+) -> Response:
     sheet_worker = GoogleSheetWorker(workbook_name)
 
     # Validate when model dump to json
@@ -418,56 +650,88 @@ def insert_new_sku_ids(
     )
 
     if result["status"] == "error":
-        return Response(
-            content=json.dumps(result, ensure_ascii=False, indent=4),
-            status_code=400,
-            media_type="application/json",
-        )
+        return json_response(result, status_code=400)
+
+    log_sheet_changes(workbook_name, sheet_name, "insert", result.pop("rows"), db)
 
     if len(error_sku_data) > 0:
         result["error_sku_data"] = error_sku_data
 
-    return Response(
-        content=json.dumps(result, ensure_ascii=False, indent=4),
-        status_code=200,
-        media_type="application/json",
-    )
+    return json_response(result, status_code=200)
+
+
+@router.post("/design/compact")
+def compact_design_sheet(
+    workbook_name: str,
+    sheet_name: str,
+    admin_key: str = Header("", alias="X-Admin-Key"),
+):
+    """
+    Deletes the duplicate SKU rows of a sheet, like the rows written twice by a retried insert.
+
+    An admin route: the rows are only deleted when they still hold what was found,
+    otherwise the compaction is skipped and can be retried.
+    """
+    validate_admin_key(admin_key)
+
+    sheet_worker = GoogleSheetWorker(workbook_name)
+
+    result = sheet_worker.compact_duplicate_rows(sheet_name)
+
+    if result["status"] == "error":
+        return json_response(result, status_code=400)
+
+    return json_response(result, status_code=200)
 
 
 @router.post("/design/sku/move-down")
 def move_designs_to_last_row(
-    body: List[str], workbook_name: str, sheet_name: str, api_key: str = ""
+    body: List[str],
+    workbook_name: str,
+    sheet_name: str,
+    api_key: str = "",
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
 ):
+    """
+    Moves the rows of the SKUs to the end of a sheet.
+
+    With an Idempotency-Key header, the retries of a request return its response
+    without moving the rows again.
+    """
     validate_apikey(api_key)
 
+    return run_idempotent(
+        ("move-down", workbook_name, sheet_name),
+        idempotency_key,
+        body,
+        lambda: move_skus_down(body, workbook_name, sheet_name, db),
+    )
+
+
+def move_skus_down(
+    body: List[str], workbook_name: str, sheet_name: str, db: Session
+) -> Response:
     sheet_worker = GoogleSheetWorker(workbook_name)
 
-    logger.info(f"Start deleting rows: {body}")
+    logger.info("Start deleting rows of %d SKU IDs", len(body))
+    logger.debug("Start deleting rows: %s", body)
 
     result = sheet_worker.delete_rows(sheet_name, body)
-    # print(f"==>> result: {result}")
 
     if result["status"] == "error":
-        return Response(
-            content=json.dumps(result, ensure_ascii=False, indent=4),
-            status_code=400,
-            media_type="application/json",
-        )
+        return json_response(result, status_code=400)
     else:
         if not result.get("deleted_rows"):
-            return Response(
-                content=json.dumps(result, ensure_ascii=False, indent=4),
-                status_code=200,
-                media_type="application/json",
-            )
+            return json_response(result, status_code=200)
         else:
             # Insert new sku to the last row:
             new_sku_data = []
 
-            logger.info(f"Start inserting rows: {list(result['deleted_rows'].keys())}")
+            logger.info("Start inserting %d rows", len(result["deleted_rows"]))
 
             seller_name = list(result["deleted_rows"].values())[0]["data"]["User"]
-            print(f"==>> seller_name: {seller_name}")
+            logger.debug("Seller name: %s", seller_name)
 
             for sku_id, row_info in result["deleted_rows"].items():
                 new_sku_data.append(
@@ -496,17 +760,94 @@ def move_designs_to_last_row(
             )
 
             if result_insert["status"] == "error":
-                return Response(
-                    content=json.dumps(result_insert, ensure_ascii=False, indent=4),
-                    status_code=400,
-                    media_type="application/json",
+                # The rows are deleted but not inserted back
+                log_sheet_changes(
+                    workbook_name,
+                    sheet_name,
+                    "delete",
+                    [x["data"] for x in result["deleted_rows"].values()],
+                    db,
                 )
+                return json_response(result_insert, status_code=400)
+
+            log_sheet_changes(
+                workbook_name, sheet_name, "move", result_insert.pop("rows"), db
+            )
 
             # Update the message
             result_insert["message"] = "Move designs to the last row successfully"
 
-            return Response(
-                content=json.dumps(result_insert, ensure_ascii=False, indent=4),
-                status_code=200,
-                media_type="application/json",
-            )
+            return json_response(result_insert, status_code=200)
+
+
+@router.get("/design/changes")
+def get_design_changes(
+    workbook_name: str,
+    sheet_name: str,
+    since: int | None = None,
+    limit: int = const.SHEET_CHANGES_DEFAULT_LIMIT,
+    api_key: str = "",
+    db: Session = Depends(get_db),
+):
+    """
+    Returns the rows inserted, updated, moved or deleted in a sheet after the `since` cursor.
+
+    Read the sheet with /design/read, then poll this route from the cursor of its
+    X-Sheet-Cursor header. Without `since` only the cursor of the table /design/read
+    serves is returned. A 410 means the cursor is older than the log retention and
+    the sheet must be read again. A change can be returned twice, clients apply
+    them by SKU.
+    """
+    validate_apikey(api_key)
+
+    if since is None:
+        # The cursor stored with the cached table, not the latest one: the changes
+        # made between the fetch of that table and now come after it
+        result = GoogleSheetWorker(workbook_name).read_sheet_table(sheet_name)
+        if result["status"] == "error":
+            return json_response(result, status_code=400)
+
+        return json_response(
+            {
+                "status": "success",
+                "cursor": result["cursor"],
+                "changes": [],
+                "has_more": False,
+            }
+        )
+
+    lowest, highest = get_sheet_change_bounds(db)
+
+    if lowest and since < lowest - 1:
+        return json_response(
+            {
+                "status": "error",
+                "message": "The cursor has expired, read the whole sheet again",
+                "cursor": highest,
+            },
+            status_code=410,
+        )
+
+    limit = min(max(limit, 1), const.SHEET_CHANGES_MAX_LIMIT)
+    changes = get_sheet_changes(workbook_name, sheet_name, since, limit + 1, db)
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    return json_response(
+        {
+            "status": "success",
+            "cursor": changes[-1].id if changes else since,
+            "changes": [
+                {
+                    "id": x.id,
+                    "sku_id": x.sku_id,
+                    "operation": x.operation,
+                    "row": x.row,
+                    "changed_at": x.changed_at.isoformat() if x.changed_at else None,
+                }
+                for x in changes
+            ],
+            "has_more": has_more,
+        }
+    )
@@ -1,18 +1,70 @@
-from fastapi import APIRouter, Depends
+import csv
+import io
+import json
+import logging
+import time
+from typing import Iterator, List
+
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, UploadFile
 from sqlalchemy.orm import Session
 from starlette.responses import JSONResponse
 
-from app.database.crud import get_label_info
-from app.database.models import LabelInfo
-from app.utils import get_db
+from app.database.crud import get_labels_data, upsert_labels
+from app.utils import (
+    ProfilingRoute,
+    SharedCache,
+    TTLCache,
+    const,
+    get_db,
+    setup_logger,
+    validate_apikey,
+)
+
+logger = logging.getLogger(__name__)
+setup_logger(logger)
+
+router = APIRouter(route_class=ProfilingRoute)
+
+# Cache of (generation, tracking_id) -> scanned_info["data"] for the hot tracking
+# ids. Kept in memory per worker: a batch of up to LABEL_BATCH_MAX_SIZE ids is
+# resolved without a file read per id, and its size is bounded by LABEL_CACHE_SIZE
+label_cache = TTLCache(maxsize=const.LABEL_CACHE_SIZE, ttl=const.LABEL_CACHE_TTL)
+
+# The generation of the labels is shared by the workers, an ingest invalidates it so
+# every worker stops serving the values it cached before, at one file read per lookup
+label_generations = SharedCache("label", ttl=const.LABEL_CACHE_TTL)
+LABELS_KEY = "labels"
+
+
+def lookup_labels(tracking_ids: List[str], db: Session) -> dict:
+    """
+    Resolves the tracking ids from the cache first, then the missing ones with a single query.
+    """
+    # Read before the query, a value fetched while an ingest commits is filed under
+    # the old generation and never served after it
+    generation = label_generations.generation(LABELS_KEY)
 
-router = APIRouter()
+    cached = label_cache.get_many((generation, x) for x in tracking_ids)
+    result = {tracking_id: data for (_, tracking_id), data in cached.items()}
+
+    missing = [x for x in tracking_ids if x not in result]
+    if missing:
+        fetched = get_labels_data(missing, db)
+        for tracking_id, data in fetched.items():
+            label_cache.set((generation, tracking_id), data)
+        result.update(fetched)
+
+    return result
 
 
 @router.get("/search/{tracking_id}")
-def search_label(tracking_id: str, db: Session = Depends(get_db)):
-    label: LabelInfo = get_label_info(tracking_id, db)
-    if label is None:
+def search_label(
+    tracking_id: str, api_key: str = Query(default=""), db: Session = Depends(get_db)
+):
+    validate_apikey(api_key)
+
+    labels = lookup_labels([tracking_id], db)
+    if tracking_id not in labels:
         return JSONResponse(
             status_code=404,
             content={
@@ -25,6 +77,145 @@ def search_label(tracking_id: str, db: Session = Depends(get_db)):
         status_code=200,
         content={
             "status": "success",
-            "data": label.scanned_info.get("data"),
+            "data": labels[tracking_id],
+        },
+    )
+
+
+@router.post("/search")
+def search_labels(
+    body: List[str] = Body(...),
+    api_key: str = Query(default=""),
+    db: Session = Depends(get_db),
+):
+    validate_apikey(api_key)
+
+    # Remove duplicates but keep the order of the request
+    tracking_ids = list(dict.fromkeys(body))
+
+    if len(tracking_ids) > const.LABEL_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {const.LABEL_BATCH_MAX_SIZE} tracking ids are allowed per request",
+        )
+
+    labels = lookup_labels(tracking_ids, db)
+
+    return JSONResponse(
+        status_code=200,
+        content={
+            "status": "success",
+            "data": {x: labels.get(x) for x in tracking_ids},
+            "not_found": [x for x in tracking_ids if x not in labels],
+        },
+    )
+
+
+def iter_label_rows(upload: UploadFile, errors: list) -> Iterator[dict]:
+    """
+    Streams the rows of an NDJSON or CSV upload without loading the whole file.
+
+    NDJSON lines are objects with "tracking_id" and "scanned_info". CSV files have a
+    header with the columns tracking_id and scanned_info, the latter being a JSON string.
+    Malformed rows are skipped and their line numbers appended to `errors`.
+    """
+    text = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+
+    if upload.filename.lower().endswith(".csv"):
+        reader = csv.DictReader(text)
+        for line_number, record in enumerate(reader, start=2):
+            try:
+                tracking_id = record["tracking_id"].strip()
+                scanned_info = json.loads(record["scanned_info"])
+            except Exception:
+                errors.append(line_number)
+                continue
+
+            if not tracking_id:
+                errors.append(line_number)
+                continue
+
+            yield {"tracking_id": tracking_id, "scanned_info": scanned_info}
+    else:
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+
+            try:
+                record = json.loads(line)
+                tracking_id = str(record["tracking_id"]).strip()
+                scanned_info = record["scanned_info"]
+            except Exception:
+                errors.append(line_number)
+                continue
+
+            if not tracking_id:
+                errors.append(line_number)
+                continue
+
+            yield {"tracking_id": tracking_id, "scanned_info": scanned_info}
+
+
+@router.post("/ingest")
+def ingest_labels(
+    label_file: UploadFile = File(...),
+    api_key: str = Query(default=""),
+    db: Session = Depends(get_db),
+):
+    validate_apikey(api_key)
+
+    file_extension = label_file.filename.split(".")[-1].lower()
+    if file_extension not in ("ndjson", "jsonl", "csv"):
+        raise HTTPException(
+            status_code=400, detail="Only ndjson, jsonl or csv files are allowed"
+        )
+
+    start_time = time.perf_counter()
+    error_lines = []
+    total_rows = 0
+    batch = []
+
+    try:
+        for row in iter_label_rows(label_file, error_lines):
+            batch.append(row)
+
+            if len(batch) >= const.LABEL_INGEST_BATCH_SIZE:
+                total_rows += upsert_labels(batch, db)
+                db.commit()
+                label_generations.invalidate(LABELS_KEY)
+                batch = []
+
+        if batch:
+            total_rows += upsert_labels(batch, db)
+            db.commit()
+            label_generations.invalidate(LABELS_KEY)
+    except Exception as e:
+        db.rollback()
+        logger.error("Error when ingesting labels", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error when ingesting labels after {total_rows} rows: {str(e)}",
+        )
+
+    elapsed = time.perf_counter() - start_time
+    rows_per_second = round(total_rows / elapsed, 2) if elapsed > 0 else total_rows
+
+    logger.info(
+        "Ingested %d labels in %.2fs (%s rows/s), %d malformed rows",
+        total_rows,
+        elapsed,
+        rows_per_second,
+        len(error_lines),
+    )
+
+    return JSONResponse(
+        status_code=200,
+        content={
+            "status": "success",
+            "rows": total_rows,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": rows_per_second,
+            "error_lines": error_lines[:100],
+            "error_count": len(error_lines),
         },
     )
@@ -1,118 +1,236 @@
 import json
 import logging
-import os
-from pathlib import Path
+from typing import Dict
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Body, File, HTTPException, Request, UploadFile
+from starlette.concurrency import run_in_threadpool
 
 from app.api.schema.updater import UpdateInfo
-from app.utils import setup_logger
+from app.utils import (
+    ProfilingRoute,
+    UpdateManifest,
+    build_patches_for_version,
+    cached_response,
+    find_patch_chain,
+    parse_version,
+    ranged_file_response,
+    save_upload_file,
+    setup_logger,
+    update_manifests,
+    write_json_atomic,
+)
 
 logger = logging.getLogger(__name__)
 setup_logger(logger)
 
-router = APIRouter()
 
+def get_update_plan(manifest: UpdateManifest, current_version: str) -> dict:
+    """
+    Returns what a client on `current_version` has to download to reach the latest version.
+    """
+    latest_version = manifest.latest_version
 
-@router.get("/info")
-async def check_for_update():
-    with open("./update/aiotts/update_info.json", "r", encoding="utf-8") as f:
-        update_info = json.load(f)
+    if parse_version(current_version) >= parse_version(latest_version):
+        chain = {"type": "none", "size": 0, "steps": []}
+    else:
+        chain = find_patch_chain(manifest.data_dir, current_version, latest_version)
 
-    return update_info
+    # Each step carries the rename instructions of the version it leads to
+    for step in chain["steps"]:
+        release = manifest.get_release(step["to"])
+        step["metadata"] = (release or {}).get("metadata") or []
 
+    return {
+        "product": manifest.product,
+        "current_version": current_version,
+        "latest_version": latest_version,
+        "is_update_available": chain["type"] != "none",
+        **chain,
+    }
 
-@router.get("/download/data")
-async def download_update_zip(version: str):
-    file_path = Path(f"./update/aiotts/data/v{version}/main.zip")
 
-    # Print the file path as the logger and return the file
-    logger.info(f"Requested file path: {file_path}, Version: {version}")
+def create_update_router(product: str) -> APIRouter:
+    """
+    Creates the update routes of a product, served from update/{product}/.
+    """
+    manifest = update_manifests[product]
+    router = APIRouter(route_class=ProfilingRoute)
 
-    if not file_path.exists():
-        logger.error(f"File not found: {file_path}")
-        raise HTTPException(
-            status_code=404, detail=f"File v{version}/main.zip not found"
-        )
+    async def manifest_response(key: str) -> tuple | None:
+        # The watcher loads the manifest at startup, the fallback hashes the
+        # packages and must not run on the event loop
+        if manifest.info is None:
+            await run_in_threadpool(manifest.ensure_loaded)
 
-    return FileResponse(file_path)
+        return manifest.response(key)
 
+    @router.get("/info")
+    async def check_for_update(request: Request):
+        body, etag = await manifest_response("info")
 
-@router.get("/download/metadata")
-async def download_update_metadata(version: str):
-    file_path = Path(f"./update/aiotts/data/v{version}/metadata.json")
+        return cached_response(request, body, etag)
 
-    # Print the file path as the logger and return the file
-    logger.info(f"Requested file path: {file_path}, Version: {version}")
+    @router.get("/manifest")
+    async def get_update_manifest(request: Request):
+        body, etag = await manifest_response("manifest")
 
-    if not file_path.exists():
-        logger.error(f"File not found: {file_path}")
-        raise HTTPException(
-            status_code=404, detail=f"File v{version}/metadata.json not found"
-        )
+        return cached_response(request, body, etag)
 
-    return {
-        "status": "success",
-        "message": "File loaded successfully",
-        "data": json.load(file_path.open("r", encoding="utf-8")),
-    }
+    @router.get("/download/data")
+    def download_update_zip(version: str, request: Request):
+        file_path = manifest.version_dir(version) / "main.zip"
 
+        # Print the file path as the logger and return the file
+        logger.info("Requested file path: %s, Version: %s", file_path, version)
 
-@router.post("/upload", tags=["Update AIOTTS"])
-async def upload_update(
-    version: str,
-    metadata_file: UploadFile = File(...),
-    package_file: UploadFile = File(...),
-):
-    file_extension = package_file.filename.split(".")[-1]
-    if file_extension != "zip":
-        raise HTTPException(
-            status_code=400, detail="Only zip files are allowed for package"
-        )
+        try:
+            return ranged_file_response(request, file_path, filename=file_path.name)
+        except FileNotFoundError:
+            logger.error("File not found: %s", file_path)
+            raise HTTPException(
+                status_code=404, detail=f"File v{version}/main.zip not found"
+            )
 
-    file_extension = metadata_file.filename.split(".")[-1]
-    if file_extension != "json":
-        raise HTTPException(
-            status_code=400, detail="Only json files are allowed for metadata"
-        )
+    @router.get("/patch")
+    async def get_patch_chain(current_version: str):
+        plan = await run_in_threadpool(get_update_plan, manifest, current_version)
 
-    os.makedirs(f"./update/aiotts/data/v{version}", exist_ok=True)
+        return {"status": "success", **plan}
 
-    # Save the file to the specified path
-    try:
-        file_path = Path(f"./update/aiotts/data/v{version}/main.zip")
-        with file_path.open("wb") as buffer:
-            buffer.write(await package_file.read())
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Error while saving the file: {str(e)}"
+    @router.get("/download/patch")
+    def download_update_patch(from_version: str, to_version: str, request: Request):
+        file_path = (
+            manifest.version_dir(to_version) / "patches" / f"from-v{from_version}.zip"
         )
 
-    # Update the metadata
-    try:
-        metadata_file_path = Path(f"./update/aiotts/data/v{version}/metadata.json")
-        metadata = json.loads(metadata_file.file.read())
-        with metadata_file_path.open("w", encoding="utf-8") as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=4)
-    except Exception as e:
+        # Print the file path as the logger and return the file
+        logger.info("Requested file path: %s", file_path)
+
+        try:
+            return ranged_file_response(request, file_path, filename=file_path.name)
+        except FileNotFoundError:
+            logger.error("File not found: %s", file_path)
+            raise HTTPException(
+                status_code=404,
+                detail=f"Patch v{from_version} -> v{to_version} not found",
+            )
+
+    @router.get("/download/metadata")
+    async def download_update_metadata(version: str, request: Request):
+        response = await manifest_response(f"metadata/{version}")
+
+        if response is None:
+            logger.error("Metadata not found, Version: %s", version)
+            raise HTTPException(
+                status_code=404, detail=f"File v{version}/metadata.json not found"
+            )
+
+        body, etag = response
+        return cached_response(request, body, etag)
+
+    @router.post("/upload")
+    async def upload_update(
+        version: str,
+        metadata_file: UploadFile = File(...),
+        package_file: UploadFile = File(...),
+    ):
+        file_extension = package_file.filename.split(".")[-1]
+        if file_extension != "zip":
+            raise HTTPException(
+                status_code=400, detail="Only zip files are allowed for package"
+            )
+
+        file_extension = metadata_file.filename.split(".")[-1]
+        if file_extension != "json":
+            raise HTTPException(
+                status_code=400, detail="Only json files are allowed for metadata"
+            )
+
+        version_dir = manifest.version_dir(version)
+
+        # Parse the metadata first, so a bad file does not leave a half published version
+        try:
+            metadata = json.loads(await metadata_file.read())
+        except Exception as e:
+            raise HTTPException(
+                status_code=400, detail=f"Error while reading the metadata: {str(e)}"
+            )
+
+        # Stream the package to disk, it is never held in memory as a whole
+        try:
+            checksums = await save_upload_file(package_file, version_dir / "main.zip")
+        except Exception as e:
+            logger.error("Error while saving the file", exc_info=True)
+            raise HTTPException(
+                status_code=500, detail=f"Error while saving the file: {str(e)}"
+            )
+
+        # Update the metadata and the checksums of the package
+        try:
+            await run_in_threadpool(
+                write_json_atomic, metadata, version_dir / "metadata.json"
+            )
+            await run_in_threadpool(
+                write_json_atomic, checksums, version_dir / "checksums.json"
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Error while updating the metadata: {str(e)}"
+            )
+
+        # Build the per-file patches from the previous versions to this one
+        try:
+            patched_from = await run_in_threadpool(
+                build_patches_for_version, manifest.data_dir, version
+            )
+        except Exception:
+            logger.error("Error while building the patches", exc_info=True)
+            patched_from = []
+
+        await run_in_threadpool(manifest.load)
+
+        return {
+            "status": "success",
+            "message": "File uploaded successfully",
+            "filename": package_file.filename,
+            "version": version,
+            "size": checksums["size"],
+            "md5": checksums["md5"],
+            "sha256": checksums["sha256"],
+            "patched_from": patched_from,
+        }
+
+    @router.post("/modify")
+    def modify_update_info_base(update_info: UpdateInfo):
+        write_json_atomic(update_info.dict(), manifest.info_path)
+        manifest.load()
+
+        return {"message": "Update info modified successfully"}
+
+    return router
+
+
+# Routes shared by every product
+router = APIRouter(route_class=ProfilingRoute)
+
+
+@router.post("/check")
+def check_for_updates(body: Dict[str, str] = Body(..., examples=[{"aiotts": "4.5.6"}])):
+    """
+    Answers, in one round-trip, what to download for every installed product.
+
+    The body maps each installed product to its current version.
+    """
+    unknown_products = [x for x in body if x not in update_manifests]
+    if unknown_products:
         raise HTTPException(
-            status_code=500, detail=f"Error while updating the metadata: {str(e)}"
+            status_code=400, detail=f"Unknown products: {', '.join(unknown_products)}"
         )
 
     return {
         "status": "success",
-        "message": "File uploaded successfully",
-        "filename": package_file.filename,
-        "version": version,
+        "data": {
+            product: get_update_plan(update_manifests[product], current_version)
+            for product, current_version in body.items()
+        },
     }
-
-
-@router.post("/modify")
-def modify_update_info_base(update_info: UpdateInfo):
-    file_path = Path("./update/aiotts/update_info.json")
-
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(update_info.dict(), f, ensure_ascii=False, indent=4)
-
-    return {"message": "Update info modified successfully"}
@@ -0,0 +1,77 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class LoginBody(BaseModel):
+    api_key: str
+    username: str
+    password: str
+
+
+class OrderBody(BaseModel):
+    variant_id: int
+    printer_design_front_url: str
+    printer_design_back_url: str | None
+    printer_design_right_url: str | None
+    printer_design_left_url: str | None
+    printer_design_neck_url: str | None
+    mockup_front_url: None
+    mockup_back_url: None
+    mockup_right_url: None
+    mockup_left_url: None
+    mockup_neck_url: None
+    quantity: int
+    note: str
+
+
+class OrderData(BaseModel):
+    order_id: str
+    buyer_first_name: str
+    buyer_last_name: str
+    buyer_email: str
+    buyer_phone: str
+    buyer_address1: str
+    buyer_address2: str
+    buyer_city: str
+    buyer_province_code: str
+    buyer_zip: str
+    buyer_country_code: str
+    shipment: str
+    link_label: str
+    products: List[OrderBody]
+
+
+class OrderItem(OrderData):
+    access_token: str
+    api_key: str
+
+
+class BulkOrderItem(BaseModel):
+    access_token: str
+    api_key: str
+    orders: List[OrderData]
+
+
+class CancelOrderBody(BaseModel):
+    access_token: str
+    api_key: str
+    order_code_list: List[str]
+    reject_note: str
+
+
+class OrderStatusBody(BaseModel):
+    access_token: str
+    api_key: str
+    order_codes: List[str]
+
+
+__all__ = [
+    "LoginBody",
+    "OrderBody",
+    "OrderData",
+    "OrderItem",
+    "BulkOrderItem",
+    "CancelOrderBody",
+    "OrderStatusBody",
+]
@@ -4,7 +4,7 @@ from pydantic import BaseModel
 class UpdateInfo(BaseModel):
     latest: str
     date: str
-    detail: str
+    detail: str = ""
 
 
 __all__ = ["UpdateInfo"]
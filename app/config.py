@@ -0,0 +1,161 @@
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from dotenv import dotenv_values, find_dotenv
+
+
+@dataclass(frozen=True)
+class Config:
+    """
+    The settings of the service, read from the environment and the .env file.
+
+    Loaded once, then replaced as a whole by reload_config(). The requests in flight
+    keep the instance they started with.
+    """
+
+    mode: str | None
+    api_key: str | None
+    admin_api_key: str | None
+    # (key, requests per minute on the host or 0 for no limit) of every accepted key
+    api_keys: tuple[tuple[str, int], ...]
+
+    db_user: str | None
+    db_password: str | None
+    db_host: str | None
+    db_port: str | None
+    db_name: str | None
+
+    login_expired_days: str | None
+    telegram_bot_token: str | None
+    telegram_channel_id: str | None
+    sheet_secret_key: str | None
+    dev_flashship_endpoint: str | None
+    prod_flashship_endpoint: str | None
+
+    profile_sample_rate: float
+    file_serving_mode: str
+    x_accel_prefix: str
+
+    log_format: str
+    log_max_bytes: int
+    log_backup_count: int
+    log_rotate_when: str | None
+    log_file_per_process: bool
+
+    shared_cache_dir: str | None
+
+    @classmethod
+    def from_env(cls) -> "Config":
+        env = _read_env()
+
+        return cls(
+            mode=env.get("MODE"),
+            api_key=env.get("API_KEY"),
+            admin_api_key=env.get("ADMIN_API_KEY"),
+            api_keys=_parse_api_keys(
+                env.get("API_KEY"),
+                env.get("API_KEYS"),
+                int(env.get("API_KEY_RATE_LIMIT") or 0),
+            ),
+            db_user=env.get("DB_USER"),
+            db_password=env.get("DB_PASSWORD"),
+            db_host=env.get("DB_HOST"),
+            db_port=env.get("DB_PORT"),
+            db_name=env.get("DB_NAME"),
+            login_expired_days=env.get("LOGIN_EXPIRED_DAYS"),
+            telegram_bot_token=env.get("TELEGRAM_BOT_TOKEN"),
+            telegram_channel_id=env.get("TELEGRAM_CHANNEL_ID"),
+            sheet_secret_key=env.get("SHEET_SECRET_KEY"),
+            dev_flashship_endpoint=env.get("DEV_FLASHSHIP_ENDPOINT"),
+            prod_flashship_endpoint=env.get("PROD_FLASHSHIP_ENDPOINT"),
+            profile_sample_rate=float(env.get("PROFILE_SAMPLE_RATE") or 1),
+            file_serving_mode=env.get("FILE_SERVING_MODE") or "stream",
+            x_accel_prefix=env.get("X_ACCEL_PREFIX") or "/protected",
+            log_format=env.get("LOG_FORMAT") or "text",
+            log_max_bytes=int(env.get("LOG_MAX_BYTES") or 50 * 1024 * 1024),
+            log_backup_count=int(env.get("LOG_BACKUP_COUNT") or 10),
+            log_rotate_when=env.get("LOG_ROTATE_WHEN") or None,
+            log_file_per_process=env.get("LOG_FILE_PER_PROCESS", "").lower()
+            in ("1", "true", "yes"),
+            shared_cache_dir=env.get("SHARED_CACHE_DIR") or None,
+        )
+
+
+def _parse_api_keys(
+    api_key: str | None, api_keys: str | None, default_rate: int
+) -> tuple[tuple[str, int], ...]:
+    """
+    Parses API_KEY and API_KEYS ("key1,key2:120", a key with its own rate per minute).
+    """
+    keys = {}
+    if api_key:
+        keys[api_key] = default_rate
+
+    for item in (api_keys or "").split(","):
+        key, _, rate = item.strip().partition(":")
+        if key:
+            keys[key] = int(rate) if rate else default_rate
+
+    return tuple(keys.items())
+
+
+def dotenv_path() -> Path | None:
+    path = find_dotenv()
+    return Path(path) if path else None
+
+
+# The process environment as it was at the first load, before any .env value
+_process_env: dict | None = None
+
+
+def _read_env() -> dict:
+    """
+    Returns the process environment overridden by the values of the .env file.
+
+    The environment is never modified: a variable removed from the file falls back
+    to its value in the process environment (docker -e, systemd, ...), and the
+    threads reading os.environ meanwhile are not affected by a reload.
+    """
+    global _process_env
+
+    if _process_env is None:
+        _process_env = dict(os.environ)
+
+    path = dotenv_path()
+    values = dotenv_values(path) if path else {}
+
+    # Like load_dotenv(override=True)
+    return {**_process_env, **{k: v for k, v in values.items() if v is not None}}
+
+
+_config: Config | None = None
+
+
+def get_config() -> Config:
+    """
+    Returns the configuration, loading it on the first call only.
+    """
+    global _config
+
+    if _config is None:
+        _config = Config.from_env()
+
+    return _config
+
+
+def reload_config() -> Config:
+    """
+    Reads the environment and the .env file again, and replaces the configuration.
+
+    Only the settings read through get_config() on every use change without a
+    restart (API keys and their rate limits, login expiry, Telegram, profiling, file
+    serving). The database, cache directory, endpoints and logging stay as loaded.
+    """
+    global _config
+
+    _config = Config.from_env()
+    return _config
+
+
+__all__ = ["Config", "get_config", "reload_config", "dotenv_path"]
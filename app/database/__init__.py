@@ -1,23 +1,21 @@
-import os
 from urllib.parse import quote_plus
 
-from dotenv import load_dotenv
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-load_dotenv(override=True)
+from app.config import get_config
 
+config = get_config()
 
-db_user = os.getenv("DB_USER")
-db_password = os.getenv("DB_PASSWORD")
-db_host = os.getenv("DB_HOST")
-db_port = os.getenv("DB_PORT")
-db_name = os.getenv("DB_NAME")
+db_user = config.db_user
+db_password = config.db_password
+db_host = config.db_host
+db_port = config.db_port
+db_name = config.db_name
 
-SQLALCHEMY_DATABASE_URL = (
-    f"postgresql://{db_user}:{quote_plus(db_password)}@{db_host}:{db_port}/{db_name}"
-)
+# psycopg2, the driver in requirements.txt, whose LISTEN API the settings store uses
+SQLALCHEMY_DATABASE_URL = f"postgresql+psycopg2://{db_user}:{quote_plus(db_password)}@{db_host}:{db_port}/{db_name}"
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
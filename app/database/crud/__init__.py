@@ -1,4 +1,31 @@
 from .auth import get_user_info, get_uuid
-from .order import get_label_info
+from .design import (
+    add_sheet_changes,
+    delete_sheet_changes_before,
+    get_sheet_change_bounds,
+    get_sheet_changes,
+    get_sheet_changes_of_skus,
+    get_sheet_snapshot_digests,
+    lock_sheet_snapshot,
+    save_sheet_snapshot,
+)
+from .order import get_label_info, get_labels_data, upsert_labels
+from .settings import get_fulfilment_china_setting, get_update_infos
 
-__all__ = ["get_label_info", "get_user_info", "get_uuid"]
+__all__ = [
+    "add_sheet_changes",
+    "delete_sheet_changes_before",
+    "get_fulfilment_china_setting",
+    "get_label_info",
+    "get_sheet_change_bounds",
+    "get_sheet_changes",
+    "get_sheet_changes_of_skus",
+    "get_sheet_snapshot_digests",
+    "get_labels_data",
+    "get_update_infos",
+    "get_user_info",
+    "get_uuid",
+    "lock_sheet_snapshot",
+    "save_sheet_snapshot",
+    "upsert_labels",
+]
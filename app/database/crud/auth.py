@@ -1,11 +1,18 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from .. import models
 
 
 def get_uuid(uuid: str, db: Session) -> models.UUID | None:
-    return db.query(models.UUID).filter(models.UUID.value == uuid).first()
+    # value is unique (migration 0001), a plain index lookup
+    return db.query(models.UUID).filter(models.UUID.value == uuid).one_or_none()
 
 
 def get_user_info(email: str, db: Session) -> models.Personnel | None:
-    return db.query(models.Personnel).filter(models.Personnel.email == email).first()
+    # Must match the expression of the unique ix_personnel_email_lower to use the index
+    return (
+        db.query(models.Personnel)
+        .filter(func.lower(models.Personnel.email) == email.strip().lower())
+        .one_or_none()
+    )
@@ -0,0 +1,160 @@
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .. import models
+
+# Held by every transaction appending to the version log until it commits, so the
+# ids are committed in increasing order and the id is a safe change feed cursor
+SHEET_CHANGE_LOCK_ID = 0x5348454554  # "SHEET"
+
+
+def add_sheet_changes(
+    workbook_name: str, sheet_name: str, changes: List[dict], db: Session
+) -> int:
+    """
+    Appends changes to the version log of a sheet with a single INSERT.
+
+    Each change is a dict with "sku_id", "operation" and "row". The caller is
+    responsible for committing, which also releases the lock of the log.
+    """
+    if not changes:
+        return 0
+
+    # Without it a transaction given a lower id could commit after a reader has
+    # already moved its cursor past a higher one, and its changes would be lost
+    db.execute(select(func.pg_advisory_xact_lock(SHEET_CHANGE_LOCK_ID)))
+
+    db.execute(
+        insert(models.SheetChange).values(
+            [
+                {
+                    "workbook_name": workbook_name,
+                    "sheet_name": sheet_name,
+                    "sku_id": x["sku_id"],
+                    "operation": x["operation"],
+                    "row": x.get("row"),
+                }
+                for x in changes
+            ]
+        )
+    )
+
+    return len(changes)
+
+
+def get_sheet_changes(
+    workbook_name: str, sheet_name: str, since: int, limit: int, db: Session
+) -> List[models.SheetChange]:
+    return (
+        db.query(models.SheetChange)
+        .filter(
+            models.SheetChange.workbook_name == workbook_name,
+            models.SheetChange.sheet_name == sheet_name,
+            models.SheetChange.id > since,
+        )
+        .order_by(models.SheetChange.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def get_sheet_changes_of_skus(
+    workbook_name: str, sheet_name: str, since: int, sku_ids: List[str], db: Session
+) -> List[models.SheetChange]:
+    """
+    Returns every change of the given SKUs of a sheet after `since`, oldest first.
+    """
+    return (
+        db.query(models.SheetChange)
+        .filter(
+            models.SheetChange.workbook_name == workbook_name,
+            models.SheetChange.sheet_name == sheet_name,
+            models.SheetChange.id > since,
+            models.SheetChange.sku_id.in_(sku_ids),
+        )
+        .order_by(models.SheetChange.id)
+        .all()
+    )
+
+
+def lock_sheet_snapshot(workbook_name: str, sheet_name: str, db: Session):
+    """
+    Returns the (cursor, synced_at) of the snapshot of a sheet, None when it has none.
+
+    The row stays locked until the transaction ends, so the syncs of a sheet run one
+    after the other.
+    """
+    return db.execute(
+        select(models.SheetSnapshot.cursor, models.SheetSnapshot.synced_at)
+        .where(
+            models.SheetSnapshot.workbook_name == workbook_name,
+            models.SheetSnapshot.sheet_name == sheet_name,
+        )
+        .with_for_update()
+    ).one_or_none()
+
+
+def get_sheet_snapshot_digests(
+    workbook_name: str, sheet_name: str, db: Session
+) -> dict:
+    return db.scalar(
+        select(models.SheetSnapshot.digests).where(
+            models.SheetSnapshot.workbook_name == workbook_name,
+            models.SheetSnapshot.sheet_name == sheet_name,
+        )
+    )
+
+
+def save_sheet_snapshot(
+    workbook_name: str, sheet_name: str, cursor: int, digests: dict, db: Session
+) -> datetime:
+    """
+    Inserts or replaces the snapshot of a sheet, returns its synced_at.
+
+    The caller is responsible for committing.
+    """
+    statement = insert(models.SheetSnapshot).values(
+        workbook_name=workbook_name,
+        sheet_name=sheet_name,
+        cursor=cursor,
+        digests=digests,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[
+            models.SheetSnapshot.workbook_name,
+            models.SheetSnapshot.sheet_name,
+        ],
+        set_={
+            "cursor": statement.excluded.cursor,
+            "digests": statement.excluded.digests,
+            "synced_at": func.now(),
+        },
+    )
+
+    return db.scalar(statement.returning(models.SheetSnapshot.synced_at))
+
+
+def get_sheet_change_bounds(db: Session) -> tuple[int, int]:
+    """
+    Returns the lowest and the highest id kept in the version log, (0, 0) when it is empty.
+    """
+    lowest, highest = db.query(
+        func.min(models.SheetChange.id), func.max(models.SheetChange.id)
+    ).one()
+
+    return lowest or 0, highest or 0
+
+
+def delete_sheet_changes_before(changed_at: datetime, db: Session) -> int:
+    """
+    Deletes the changes older than `changed_at`. The caller is responsible for committing.
+    """
+    return (
+        db.query(models.SheetChange)
+        .filter(models.SheetChange.changed_at < changed_at)
+        .delete(synchronize_session=False)
+    )
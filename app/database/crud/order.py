@@ -1,3 +1,6 @@
+from typing import Any, List
+
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from .. import models
@@ -7,5 +10,47 @@ def get_label_info(tracking_id: str, db: Session) -> models.LabelInfo | None:
     return (
         db.query(models.LabelInfo)
         .filter(models.LabelInfo.tracking_id == tracking_id)
-        .first()
+        .one_or_none()
+    )
+
+
+def get_labels_data(tracking_ids: List[str], db: Session) -> dict[str, Any]:
+    """
+    Returns a mapping from tracking id to the "data" sub-document of scanned_info.
+
+    Only scanned_info -> 'data' is projected, so the rest of the JSONB document
+    never leaves Postgres. Tracking ids that do not exist are left out.
+    """
+    if not tracking_ids:
+        return {}
+
+    rows = (
+        db.query(models.LabelInfo.tracking_id, models.LabelInfo.scanned_info["data"])
+        .filter(models.LabelInfo.tracking_id.in_(tracking_ids))
+        .all()
+    )
+
+    return {tracking_id: data for tracking_id, data in rows}
+
+
+def upsert_labels(labels: List[dict], db: Session) -> int:
+    """
+    Inserts or updates a batch of labels with a single INSERT ... ON CONFLICT (tracking_id) DO UPDATE.
+
+    Each label is a dict with "tracking_id" and "scanned_info". A tracking id may only
+    appear once per statement, so the last occurrence in the batch wins.
+
+    Returns the number of rows written. The caller is responsible for committing.
+    """
+    unique_labels = {x["tracking_id"]: x for x in labels}
+    if not unique_labels:
+        return 0
+
+    statement = insert(models.LabelInfo).values(list(unique_labels.values()))
+    statement = statement.on_conflict_do_update(
+        index_elements=[models.LabelInfo.tracking_id],
+        set_={"scanned_info": statement.excluded.scanned_info},
     )
+    db.execute(statement)
+
+    return len(unique_labels)
@@ -0,0 +1,18 @@
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from .. import models
+
+
+def get_update_infos(db: Session) -> List[models.UpdateInfo]:
+    return db.query(models.UpdateInfo).order_by(models.UpdateInfo.id).all()
+
+
+def get_fulfilment_china_setting(db: Session) -> models.FulfilmentChinaSetting | None:
+    # There is a single settings row, the latest one wins if several exist
+    return (
+        db.query(models.FulfilmentChinaSetting)
+        .order_by(models.FulfilmentChinaSetting.id.desc())
+        .first()
+    )
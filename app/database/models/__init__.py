@@ -1,4 +1,14 @@
 from .auth import UUID, Personnel
+from .design import SheetChange, SheetSnapshot
 from .order import LabelInfo
+from .settings import FulfilmentChinaSetting, UpdateInfo
 
-__all__ = ["Personnel", "UUID", "LabelInfo"]
+__all__ = [
+    "Personnel",
+    "UUID",
+    "LabelInfo",
+    "UpdateInfo",
+    "FulfilmentChinaSetting",
+    "SheetChange",
+    "SheetSnapshot",
+]
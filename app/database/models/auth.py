@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, func
 
 from .. import Base
 
@@ -7,7 +7,7 @@ class UUID(Base):
     __tablename__ = "uuid"
 
     id = Column(Integer, unique=True, primary_key=True)
-    value = Column(String, index=True)
+    value = Column(String, unique=True, index=True)
 
 
 class Personnel(Base):
@@ -21,3 +21,7 @@ class Personnel(Base):
     is_default_password = Column(Boolean)
     last_login_uuid = Column(String)
     last_login_time = Column(DateTime)
+
+
+# Login lookups are case-insensitive, so the index is on lower(email)
+Index("ix_personnel_email_lower", func.lower(Personnel.email), unique=True)
@@ -0,0 +1,44 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, String, func
+from sqlalchemy.dialects.postgresql import JSONB
+
+from .. import Base
+
+
+class SheetChange(Base):
+    """
+    The version log of the design sheets, its id is the cursor of the change feed.
+    """
+
+    __tablename__ = "sheet_change"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    workbook_name = Column(String, nullable=False)
+    sheet_name = Column(String, nullable=False)
+    sku_id = Column(String, nullable=False)
+    operation = Column(String, nullable=False)  # insert | update | move | delete
+    row = Column(JSONB)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class SheetSnapshot(Base):
+    """
+    The row digests of a design sheet at its last sync, the base of the next diff.
+    """
+
+    __tablename__ = "sheet_snapshot"
+
+    workbook_name = Column(String, primary_key=True)
+    sheet_name = Column(String, primary_key=True)
+    # The change feed cursor when the digests were taken
+    cursor = Column(BigInteger, nullable=False)
+    digests = Column(JSONB, nullable=False)  # {sku_id: row digest}
+    synced_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# The change feed reads the changes of one sheet after a cursor
+Index(
+    "ix_sheet_change_sheet_id",
+    SheetChange.workbook_name,
+    SheetChange.sheet_name,
+    SheetChange.id,
+)
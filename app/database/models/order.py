@@ -1,4 +1,5 @@
-from sqlalchemy import JSON, Column, String
+from sqlalchemy import Column, String
+from sqlalchemy.dialects.postgresql import JSONB
 
 from .. import Base
 
@@ -7,4 +8,4 @@ class LabelInfo(Base):
     __tablename__ = "label_info"
 
     tracking_id = Column(String, unique=True, primary_key=True, index=True)
-    scanned_info = Column(JSON)
+    scanned_info = Column(JSONB)
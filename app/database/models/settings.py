@@ -4,7 +4,8 @@ from .. import Base
 
 
 class UpdateInfo(Base):
-    __tablename__ = "settings.update_info"
+    __tablename__ = "update_info"
+    __table_args__ = {"schema": "settings"}
 
     id = Column(Integer, unique=True, primary_key=True)
     version = Column(String, index=True)
@@ -14,7 +15,9 @@ class UpdateInfo(Base):
 
 
 class FulfilmentChinaSetting(Base):
-    __tablename__ = "settings.fulfilment_china"
+    __tablename__ = "fulfilment_china"
+    __table_args__ = {"schema": "settings"}
 
+    id = Column(Integer, unique=True, primary_key=True)
     tier_1_keywords = Column(JSON)
     tier_2_keywords = Column(JSON)
@@ -1,6 +1,69 @@
+import asyncio
+import logging
+import signal
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+
+from app.api import admission_groups, api_router
+from app.utils import (
+    AdmissionMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    config_watcher,
+    const,
+    flashship_client,
+    manifest_watcher,
+    metrics_endpoint,
+    settings_store,
+    setup_logger,
+    sheet_pool,
+    sheet_refresher,
+)
+
+logger = logging.getLogger(__name__)
+setup_logger(logger)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The admission groups are sized against this number of threads
+    anyio.to_thread.current_default_thread_limiter().total_tokens = (
+        const.THREADPOOL_SIZE
+    )
+    # SIGHUP reloads the keys and settings, edits of the .env file are picked up too
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGHUP, config_watcher.reload
+        )
+    except (NotImplementedError, RuntimeError, ValueError):
+        pass
+    config_watcher.start()
+    settings_store.start()
+    # The settings routes answer 503 until the first load, do not serve before it
+    if not await run_in_threadpool(
+        settings_store.wait_loaded, const.SETTINGS_STARTUP_TIMEOUT
+    ):
+        logger.warning("Serving before the settings are loaded, retrying meanwhile")
+    # Hash the packages before serving, the poll routes then never touch the disk
+    await run_in_threadpool(manifest_watcher.reload_all)
+    manifest_watcher.start()
+    sheet_refresher.start()
+    yield
+    sheet_refresher.stop()
+    manifest_watcher.stop()
+    settings_store.stop()
+    config_watcher.stop()
+    sheet_pool.shutdown()
+    await flashship_client.aclose()
 
-from app.api import api_router
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+# Innermost, so the shed requests are still counted by the metrics
+app.add_middleware(AdmissionMiddleware, groups=admission_groups)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.include_router(api_router)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
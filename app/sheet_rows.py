@@ -0,0 +1,157 @@
+"""
+The pure transformations of the sheet tables, run in the request threads or in
+the processes of the SheetPool (see app/utils/sheet_transform.py).
+
+A leaf module: it only imports the standard library (pandas and polars lazily),
+never the app.utils package, so a spawned pool process does not build the
+database engine, the loggers or the caches of the web workers to unpickle a task.
+"""
+
+import hashlib
+import json
+from multiprocessing import shared_memory
+from typing import Any, Callable, List
+
+
+def table_to_rows(table: list) -> list:
+    """
+    Converts a table read from a sheet (header first) to a list of row dicts.
+
+    pandas and polars are imported on first use, so workers that never read a
+    sheet do not pay for them at startup.
+    """
+    import pandas as pd
+    import polars as pl
+
+    # Convert the table to a dataframe (skip the first row)
+    data = pd.DataFrame(table[1:], columns=table[0], dtype=str)
+    data_pl = pl.from_pandas(data)
+    return data_pl.rows(named=True)
+
+
+def _encode(content: Any) -> bytes:
+    return json.dumps(content, ensure_ascii=False, indent=4).encode("utf-8")
+
+
+def encode_sheet_rows(table: list) -> bytes:
+    """
+    Returns the JSON body of a successful sheet read.
+    """
+    return _encode({"status": "success", "data": table_to_rows(table)})
+
+
+def search_sheet_rows(table: list, sku_ids: List[str]) -> bytes:
+    """
+    Returns the JSON body mapping every requested SKU ID to its row, or None when missing.
+    """
+    # Create a mapping from SKU to row data, the last row of a SKU wins
+    mapping = {}
+    for row in table_to_rows(table):
+        if row["SKU"]:
+            mapping[row["SKU"]] = row
+
+    return _encode({sku_id: mapping.get(sku_id) for sku_id in set(sku_ids)})
+
+
+def find_sku_rows(table: list, sku_ids: List[str]) -> dict:
+    """
+    Returns the sheet row index (first match) and the row data of the requested SKU IDs.
+    """
+    first_rows = {}
+    for idx, row in enumerate(table_to_rows(table)):
+        first_rows.setdefault(row["SKU"], (idx, row))
+
+    sku_infos = {}
+    for sku_id in set(sku_ids):
+        if sku_id in first_rows:
+            idx, row = first_rows[sku_id]
+            sku_infos[sku_id] = {
+                "index": idx + 3,  # Skip 2 rows, and google sheet index starts from 1
+                "data": row,
+            }
+
+    return sku_infos
+
+
+def find_duplicate_sku_rows(table: list) -> list:
+    """
+    Returns the repeated rows of the SKUs, the first row of a SKU is kept.
+
+    A row only counts as a duplicate when it equals the first row of its SKU apart
+    from "Created at", like the rows written twice by a retried insert.
+
+    Returns:
+        list: A dict per duplicate with its sheet row "index", the sheet row
+            "first_index" of its SKU and the "row" data of the duplicate.
+    """
+    first_rows = {}
+    duplicates = []
+    for idx, row in enumerate(table_to_rows(table)):
+        sku_id = row.get("SKU")
+        if not sku_id:
+            continue
+
+        values = tuple(v for k, v in row.items() if k != "Created at")
+        if sku_id not in first_rows:
+            first_rows[sku_id] = (idx + 3, values)  # Same indexes as find_sku_rows
+        elif first_rows[sku_id][1] == values:
+            duplicates.append(
+                {"index": idx + 3, "first_index": first_rows[sku_id][0], "row": row}
+            )
+
+    return duplicates
+
+
+def diff_sheet_rows(table: list, previous: dict | None) -> tuple[dict, list]:
+    """
+    Compares a table with the row digests of its previous sync.
+
+    Args:
+        table (list): The table read from the sheet (header first).
+        previous (dict | None): The SKU -> row digest mapping of the previous sync, None on the first one.
+
+    Returns:
+        tuple: The SKU -> row digest mapping of the table, and the insert, update and
+            delete changes since `previous` (none on the first sync).
+    """
+    digests = {}
+    rows = {}
+    for row in table_to_rows(table):
+        sku_id = row.get("SKU")
+        if not sku_id:
+            continue
+
+        content = json.dumps(row, sort_keys=True, ensure_ascii=False)
+        digests[sku_id] = hashlib.md5(content.encode("utf-8")).hexdigest()
+        rows[sku_id] = row
+
+    if previous is None:
+        return digests, []
+
+    changes = []
+    for sku_id, digest in digests.items():
+        if sku_id not in previous:
+            changes.append(
+                {"sku_id": sku_id, "operation": "insert", "row": rows[sku_id]}
+            )
+        elif previous[sku_id] != digest:
+            changes.append(
+                {"sku_id": sku_id, "operation": "update", "row": rows[sku_id]}
+            )
+
+    for sku_id in previous.keys() - digests.keys():
+        changes.append({"sku_id": sku_id, "operation": "delete", "row": None})
+
+    return digests, changes
+
+
+def _run_in_child(func: Callable, table: list, *args) -> tuple:
+    result = func(table, *args)
+    if not isinstance(result, bytes):
+        return "value", result
+
+    # A JSON body is handed back through shared memory instead of the result pipe
+    block = shared_memory.SharedMemory(create=True, size=max(len(result), 1))
+    block.buf[: len(result)] = result
+    block.close()
+    return "shared_memory", (block.name, len(result))
@@ -1,6 +1,88 @@
+from app.sheet_rows import (
+    encode_sheet_rows,
+    find_duplicate_sku_rows,
+    find_sku_rows,
+    search_sheet_rows,
+    table_to_rows,
+)
+
 from . import constants as const
-from .authorization import validate_apikey
+from .admission import AdmissionGroup, AdmissionMiddleware
+from .authorization import validate_admin_key, validate_apikey
+from .cache import TTLCache
+from .config_watcher import ConfigWatcher, config_watcher
 from .database import get_db
+from .files import (
+    cached_response,
+    get_file_checksums,
+    get_file_digest,
+    ranged_file_response,
+    save_upload_file,
+    write_json_atomic,
+)
+from .flashship import flashship_client, response_content
+from .idempotency import run_idempotent
+from .keyword_matcher import KeywordMatcher
 from .logger import setup_logger
+from .metrics import (
+    MetricsMiddleware,
+    metrics_endpoint,
+    record_sheets_response,
+    timed,
+)
+from .profiling import ProfilingMiddleware, ProfilingRoute
+from .settings_store import SettingsStore, settings_store
+from .shared_cache import SharedCache
+from .sheet_changes import get_sheet_change_cursor, sync_sheet_changes
+from .sheet_refresh import SheetRefresher, sheet_refresher
+from .sheet_transform import sheet_pool
+from .update_delta import build_patches_for_version, find_patch_chain, parse_version
+from .update_manifest import UpdateManifest, manifest_watcher, update_manifests
 
-__all__ = ["get_db", "setup_logger", "validate_apikey", "const"]
+__all__ = [
+    "get_db",
+    "setup_logger",
+    "validate_admin_key",
+    "validate_apikey",
+    "const",
+    "TTLCache",
+    "SharedCache",
+    "KeywordMatcher",
+    "settings_store",
+    "SettingsStore",
+    "save_upload_file",
+    "write_json_atomic",
+    "get_file_digest",
+    "get_file_checksums",
+    "cached_response",
+    "ranged_file_response",
+    "build_patches_for_version",
+    "find_patch_chain",
+    "parse_version",
+    "UpdateManifest",
+    "update_manifests",
+    "manifest_watcher",
+    "timed",
+    "metrics_endpoint",
+    "MetricsMiddleware",
+    "record_sheets_response",
+    "ProfilingMiddleware",
+    "ProfilingRoute",
+    "sheet_pool",
+    "SheetRefresher",
+    "sheet_refresher",
+    "sync_sheet_changes",
+    "get_sheet_change_cursor",
+    "flashship_client",
+    "response_content",
+    "table_to_rows",
+    "encode_sheet_rows",
+    "search_sheet_rows",
+    "find_sku_rows",
+    "find_duplicate_sku_rows",
+    "run_idempotent",
+    "AdmissionGroup",
+    "AdmissionMiddleware",
+    "ConfigWatcher",
+    "config_watcher",
+]
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import math
+import time
+from typing import List
+
+from starlette.responses import JSONResponse
+
+from . import constants as const
+from .logger import setup_logger
+from .metrics import ADMISSION_REJECTIONS, ADMISSION_WAIT
+
+logger = logging.getLogger(__name__)
+setup_logger(logger)
+
+
+class AdmissionGroup:
+    """
+    The concurrency limit and queue-time budget of a group of routes, in one worker.
+
+    At most `max_concurrent` requests of the group are served at a time. The next
+    ones wait in a queue of at most `max_queue` requests, for at most `max_wait`
+    seconds. A request is shed right away when the queue is full, or when the queue
+    ahead of it is not expected to drain within `max_wait`.
+
+    Attributes:
+        name (str): The name of the group, used as the metrics label.
+        prefixes (List[str]): The path prefixes of the routes of the group.
+        max_concurrent (int): The number of requests served at a time.
+        max_queue (int): The number of requests waiting for a slot.
+        max_wait (float): The number of seconds a request may wait for a slot.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        prefixes: List[str],
+        max_concurrent: int,
+        max_queue: int = 0,
+        max_wait: float = 0.0,
+    ) -> None:
+        self.name = name
+        self.prefixes = prefixes
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._waiting = 0
+        # Moving average of the time a request holds its slot
+        self._service_time = 0.0
+
+    def estimated_wait(self) -> float:
+        return self._service_time * (self._waiting + 1) / self.max_concurrent
+
+    def retry_after(self) -> int:
+        """
+        Returns the seconds after which a shed request should be retried.
+        """
+        return min(
+            max(math.ceil(self.estimated_wait()), 1), const.ADMISSION_MAX_RETRY_AFTER
+        )
+
+    async def acquire(self) -> str | None:
+        """
+        Waits for a slot of the group, returns None once acquired or why the request is shed.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._loop = loop
+
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            ADMISSION_WAIT.labels(self.name).observe(0)
+            return None
+
+        if self._waiting >= self.max_queue:
+            return "queue_full"
+        if self.estimated_wait() > self.max_wait:
+            return "over_budget"
+
+        start = time.perf_counter()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            return "timeout"
+        finally:
+            self._waiting -= 1
+            ADMISSION_WAIT.labels(self.name).observe(time.perf_counter() - start)
+
+        return None
+
+    def release(self, service_time: float) -> None:
+        self._service_time += 0.1 * (service_time - self._service_time)
+        self._semaphore.release()
+
+
+class AdmissionMiddleware:
+    """
+    Bounds the requests served at a time per route group, and sheds the others with a 503.
+
+    The route of a request belongs to the group with the longest matching prefix,
+    the routes in no group are not limited. A shed request gets a 503 with a
+    Retry-After header, instead of waiting for a thread or a Google call until the
+    client times out. Giving the heavy groups (Sheets, label, ...) fewer slots than
+    the threadpool has threads leaves room for the cheap auth and update checks.
+
+    A plain ASGI middleware, so streamed and zero-copy file responses pass through as is.
+    """
+
+    def __init__(self, app, groups: List[AdmissionGroup]) -> None:
+        self.app = app
+        self.prefixes = sorted(
+            (
+                (prefix.rstrip("/"), group)
+                for group in groups
+                for prefix in group.prefixes
+            ),
+            key=lambda x: len(x[0]),
+            reverse=True,
+        )
+
+    def _group(self, path: str) -> AdmissionGroup | None:
+        for prefix, group in self.prefixes:
+            if path == prefix or path.startswith(prefix + "/"):
+                return group
+
+        return None
+
+    async def __call__(self, scope, receive, send) -> None:
+        group = self._group(scope["path"]) if scope["type"] == "http" else None
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await group.acquire()
+        if reason is not None:
+            ADMISSION_REJECTIONS.labels(group.name, reason).inc()
+            logger.info("Shed %s (%s, %s)", scope["path"], group.name, reason)
+
+            response = JSONResponse(
+                content={"detail": "The server is busy, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(group.retry_after())},
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            group.release(time.perf_counter() - start)
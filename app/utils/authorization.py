@@ -1,18 +1,118 @@
 # Authorize by API KEY
-import os
+import hashlib
+import hmac
+import math
+import time
 
-from dotenv import load_dotenv
 from fastapi import HTTPException, status
 
-load_dotenv(override=True)
+from app.config import Config, get_config
+
+from . import constants as const
+from .shared_cache import SharedCache
+
+# The token bucket of every rate limited key, shared by the workers: [tokens, updated_at]
+_buckets = SharedCache("rate_limit", ttl=const.RATE_LIMIT_BUCKET_TTL)
+
+# The config the key digests were computed for, and the (digest, rate) of its keys
+_accepted_keys: tuple[Config | None, list] = (None, [])
+
+
+def _take_token(bucket: list | None, rate: int) -> tuple[list, float]:
+    """
+    Takes a token out of a bucket of `rate` tokens refilled over a minute.
+
+    Returns the new bucket, and 0 or the seconds until the next token.
+    """
+    now = time.time()
+    tokens, updated_at = bucket if bucket is not None else (rate, now)
+    tokens = min(rate, tokens + (now - updated_at) * rate / 60)
+
+    if tokens >= 1:
+        return [tokens - 1, now], 0.0
+
+    return [tokens, now], (1 - tokens) * 60 / rate
+
+
+def _digest(api_key: str) -> bytes:
+    return hashlib.sha256(api_key.encode("utf-8")).digest()
+
+
+def _get_accepted_keys(config: Config) -> list:
+    global _accepted_keys
+
+    accepted_config, keys = _accepted_keys
+    if accepted_config is not config:
+        keys = [(_digest(key), rate) for key, rate in config.api_keys]
+        _accepted_keys = (config, keys)
+
+    return keys
 
 
 def validate_apikey(api_key: str):
-    if os.getenv("MODE") == "development":
+    """
+    Accepts any key of API_KEY / API_KEYS, within the rate limit of the key.
+
+    The limit is shared by all the workers of the host, whatever worker serves the request.
+
+    Raises:
+        HTTPException: 401 for an unknown key, 429 with Retry-After when the key is over its limit.
+    """
+    config = get_config()
+
+    if config.mode == "development":
         return
 
-    if api_key != os.getenv("API_KEY"):
+    digest = _digest(api_key or "")
+    rate = None
+    # Every key is compared in constant time, the timing tells nothing about them
+    for key_digest, key_rate in _get_accepted_keys(config):
+        if hmac.compare_digest(digest, key_digest):
+            rate = key_rate
+
+    if rate is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key",
         )
+
+    if not rate:
+        return
+
+    # A rate changed by a reload is a new bucket
+    retry_after = _buckets.update(
+        (digest.hex(), rate), lambda bucket: _take_token(bucket, rate)
+    )
+
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests for this API key",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+def is_admin_key(admin_key: str | None) -> bool:
+    """
+    Returns whether a key is the ADMIN_API_KEY, never when it is not set.
+    """
+    expected_key = get_config().admin_api_key
+    if not expected_key:
+        return False
+
+    # Digests, compare_digest raises TypeError on non-ASCII str
+    return hmac.compare_digest(_digest(admin_key or ""), _digest(expected_key))
+
+
+def validate_admin_key(admin_key: str):
+    """
+    Accepts the ADMIN_API_KEY only, the admin routes are closed when it is not set.
+
+    Raises:
+        HTTPException: 403 for any other key.
+    """
+    if not is_admin_key(admin_key):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin key",
+        )
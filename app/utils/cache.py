@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable
+
+
+class TTLCache:
+    """
+    A thread-safe LRU cache whose entries expire after a fixed time-to-live.
+
+    Sync routes run in the threadpool, so every access goes through a lock.
+
+    Attributes:
+        maxsize (int): The maximum number of entries kept, the least recently used are evicted first.
+        ttl (float): The number of seconds an entry stays valid.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def get_many(self, keys: Iterable[Hashable]) -> dict:
+        """
+        Returns a dict with the cached values of the given keys, missing or expired keys are left out.
+        """
+        result = {}
+        now = time.monotonic()
+
+        with self._lock:
+            for key in keys:
+                item = self._data.get(key)
+                if item is None:
+                    continue
+
+                expires_at, value = item
+                if expires_at < now:
+                    del self._data[key]
+                    continue
+
+                self._data.move_to_end(key)
+                result[key] = value
+
+        return result
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,84 @@
+import dataclasses
+import logging
+import threading
+
+from app.config import dotenv_path, get_config, reload_config
+
+from . import constants as const
+from .logger import setup_logger
+
+logger = logging.getLogger(__name__)
+setup_logger(logger)
+
+
+class ConfigWatcher:
+    """
+    Reloads the configuration when the .env file changes, or when reload() is called (SIGHUP).
+
+    The new configuration replaces the old one at once, so the requests in flight
+    finish with the settings they started with, and the next ones get the new keys
+    and settings without restarting the worker.
+    """
+
+    def __init__(self) -> None:
+        self._mtime = self._file_mtime()
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _file_mtime(self) -> float | None:
+        path = dotenv_path()
+        try:
+            return path.stat().st_mtime if path else None
+        except OSError:
+            return None
+
+    def reload(self) -> None:
+        with self._lock:
+            old = get_config()
+            try:
+                new = reload_config()
+            except Exception:
+                logger.error("Error when reloading the configuration", exc_info=True)
+                return
+
+        # Only the names, the values may be secrets
+        changed = [
+            x.name
+            for x in dataclasses.fields(new)
+            if getattr(old, x.name) != getattr(new, x.name)
+        ]
+        logger.info("Reloaded the configuration, changed: %s", changed or "nothing")
+
+    def reload_if_changed(self) -> None:
+        mtime = self._file_mtime()
+        if mtime == self._mtime:
+            return
+
+        self._mtime = mtime
+        self.reload()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="config-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout=const.CONFIG_POLL_INTERVAL)
+            self._thread = None
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(const.CONFIG_POLL_INTERVAL):
+            self.reload_if_changed()
+
+
+config_watcher = ConfigWatcher()
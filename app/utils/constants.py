@@ -0,0 +1,107 @@
+# Label lookup cache, one bounded LRU per worker invalidated through a generation
+# shared by the workers (see app/api/routes/label.py)
+LABEL_CACHE_SIZE = 100_000
+LABEL_CACHE_TTL = 300  # seconds
+
+# Maximum number of tracking ids resolved by one batch lookup
+LABEL_BATCH_MAX_SIZE = 1000
+
+# Number of rows sent per INSERT ... ON CONFLICT statement by the label ingestion
+LABEL_INGEST_BATCH_SIZE = 5000
+
+# Settings store (see app/utils/settings_store.py)
+SETTINGS_NOTIFY_CHANNEL = "settings_changed"
+SETTINGS_REFRESH_INTERVAL = 300  # seconds, safety net when a notification is missed
+SETTINGS_RECONNECT_DELAY = 5  # seconds
+SETTINGS_STARTUP_TIMEOUT = (
+    10  # seconds a worker waits for the first load before serving
+)
+
+# Maximum number of titles classified by one request (see app/api/routes/fulfilment.py)
+CLASSIFY_BATCH_MAX_SIZE = 20_000
+
+# Size of the chunks read and written when streaming uploaded files to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Number of previous versions a patch is built from when a release is uploaded
+DELTA_MAX_BASE_VERSIONS = 3
+
+# Size of the chunks read when streaming files to clients
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+# Threads reading the streamed files, apart from the THREADPOOL_SIZE threads of the routes
+DOWNLOAD_READ_THREADS = 16
+# Seconds the checksums of a served file are shared by the workers
+FILE_CHECKSUMS_TTL = 7 * 24 * 3600
+
+# Update manifests (see app/utils/update_manifest.py)
+UPDATE_ROOT_DIR = "./update"
+UPDATE_PRODUCTS = ["aiotts", "autopts"]
+MANIFEST_POLL_INTERVAL = 5  # seconds
+
+# Directories of the files served for download, the only ones exposed to a
+# fronting nginx with FILE_SERVING_MODE=x-accel (see app/utils/files.py)
+SERVED_FILE_DIRS = ["./uploads", "./dependencies", "./update"]
+
+# Known device uuids, shared by the workers (see app/api/routes/auth.py)
+# Seconds a found uuid is trusted, also how long a deleted one keeps matching
+UUID_CACHE_TTL = 5
+
+# Process pool of the sheet transformations (see app/utils/sheet_transform.py)
+SHEET_POOL_WORKERS = 2
+SHEET_POOL_MIN_ROWS = 5000  # smaller tables are transformed in the request thread
+SHEET_POOL_MAX_TASKS_PER_CHILD = 100
+
+# Sheet cache and its refresh-ahead scheduler (see app/utils/sheet_refresh.py)
+SHEET_CACHE_TTL = 120  # seconds
+SHEET_REFRESH_INTERVAL = 5  # seconds between two scheduler passes
+SHEET_REFRESH_AHEAD = 40  # seconds before expiry a hot sheet is refreshed
+SHEET_REFRESH_HALF_LIFE = 600  # seconds, decay of the access counts
+# Decayed reads for a sheet to be kept warm (~3 recent reads)
+SHEET_REFRESH_MIN_SCORE = 2.5
+SHEET_REFRESH_MAX_PER_PASS = 4
+# Seconds paused after a quota error, doubled on each one
+SHEET_REFRESH_BACKOFF_MIN = 30
+SHEET_REFRESH_BACKOFF_MAX = 600
+
+# Change feed of the design sheets (see app/utils/sheet_changes.py)
+SHEET_CHANGES_DEFAULT_LIMIT = 1000
+SHEET_CHANGES_MAX_LIMIT = 5000
+SHEET_CHANGE_RETENTION_DAYS = 14
+
+# Idempotent writes of the design sheets
+IDEMPOTENCY_TTL = 600  # seconds the response of an Idempotency-Key is replayed
+
+# FlashShip seller API client (see app/utils/flashship.py)
+FLASHSHIP_TIMEOUT = 30  # seconds
+FLASHSHIP_CONNECT_TIMEOUT = 5  # seconds
+FLASHSHIP_MAX_CONNECTIONS = 100
+FLASHSHIP_MAX_KEEPALIVE = 20
+FLASHSHIP_RETRIES = 3
+FLASHSHIP_RETRY_BACKOFF = 0.5  # seconds, doubled on each retry
+FLASHSHIP_TOKEN_TTL = 1800  # seconds a successful login is reused
+FLASHSHIP_BULK_CONCURRENCY = 16
+FLASHSHIP_BULK_MAX_ORDERS = 1000
+FLASHSHIP_STATUS_CONCURRENCY = 32
+FLASHSHIP_STATUS_MAX_ORDERS = 5000
+FLASHSHIP_ORDER_TTL = 60  # seconds the details of an in-flight order are reused
+# Seconds the details of a finished order are reused
+FLASHSHIP_TERMINAL_ORDER_TTL = 30 * 24 * 3600
+# Statuses after which an order never changes again, compared case-insensitively
+FLASHSHIP_TERMINAL_STATUSES = {
+    "CANCELED",
+    "CANCELLED",
+    "COMPLETED",
+    "DELIVERED",
+    "REFUNDED",
+    "REJECTED",
+}
+
+# Admission control (see app/utils/admission.py, the groups are in app/api/__init__.py)
+THREADPOOL_SIZE = 40  # threads running the sync routes, per worker
+ADMISSION_MAX_RETRY_AFTER = 30  # seconds
+
+# Seconds the rate limit bucket of an idle API key is kept, it is full again after 60
+RATE_LIMIT_BUCKET_TTL = 120
+
+# Hot reload of the .env file (see app/utils/config_watcher.py)
+CONFIG_POLL_INTERVAL = 5  # seconds
@@ -0,0 +1,509 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from email.utils import formatdate
+from pathlib import Path
+from stat import S_IMODE
+from urllib.parse import quote
+
+import anyio
+from fastapi import Request, Response, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.config import get_config
+
+from . import constants as const
+from .shared_cache import SharedCache
+
+_digest_cache: dict = {}
+_digest_lock = threading.Lock()
+
+# (path, inode, size, mtime) -> checksums of the file, computed once per host
+file_checksums = SharedCache("file_checksums", ttl=const.FILE_CHECKSUMS_TTL)
+
+# The event loop the limiter was created in, and the limiter of the file reads
+_read_limiter: tuple = (None, None)
+
+
+def _get_read_limiter() -> anyio.CapacityLimiter:
+    """
+    Returns the limiter of the threads reading the streamed files, in this event loop.
+
+    The downloads do not take their chunks from the threadpool of the sync routes,
+    so hundreds of them in flight never make the auth and update checks wait.
+    """
+    global _read_limiter
+
+    loop = asyncio.get_running_loop()
+    limiter_loop, limiter = _read_limiter
+    if limiter_loop is not loop:
+        limiter = anyio.CapacityLimiter(const.DOWNLOAD_READ_THREADS)
+        _read_limiter = (loop, limiter)
+
+    return limiter
+
+
+def _published_mode(destination: Path) -> int:
+    """
+    Returns the mode of the file being replaced, or 0644 for a new one.
+
+    mkstemp creates 0600 files, which a fronting nginx (X-Accel) could not read.
+    """
+    try:
+        return S_IMODE(destination.stat().st_mode)
+    except FileNotFoundError:
+        return 0o644
+
+
+async def save_upload_file(upload: UploadFile, destination: Path) -> dict:
+    """
+    Streams an uploaded file to `destination` in chunks and hashes it on the way.
+
+    The data goes to a temporary file in the destination directory, written from the
+    threadpool so the event loop is never blocked, then renamed over `destination`
+    atomically. Memory use stays bounded by UPLOAD_CHUNK_SIZE whatever the file size.
+
+    Returns:
+        dict: The size in bytes, the mtime (ns) and the MD5 / SHA-256 hex digests of the published file.
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    size = 0
+
+    def write_chunk(buffer, chunk: bytes) -> None:
+        md5.update(chunk)
+        sha256.update(chunk)
+        buffer.write(chunk)
+
+    fd, tmp_name = tempfile.mkstemp(
+        dir=destination.parent, prefix=f".{destination.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = await upload.read(const.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+
+                # Hashing and writing both happen off the event loop
+                await run_in_threadpool(write_chunk, buffer, chunk)
+
+            await run_in_threadpool(buffer.flush)
+            await run_in_threadpool(os.fsync, buffer.fileno())
+
+        await run_in_threadpool(os.chmod, tmp_name, _published_mode(destination))
+        await run_in_threadpool(os.replace, tmp_name, destination)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+    # Recorded with the digests, so they are only trusted for this very file
+    stat = await run_in_threadpool(destination.stat)
+    checksums = {"size": size, "md5": md5.hexdigest(), "sha256": sha256.hexdigest()}
+
+    # The first download of the file is then served without hashing it again
+    await run_in_threadpool(_remember_checksums, destination, stat, checksums)
+
+    return {
+        "size": size,
+        "mtime_ns": stat.st_mtime_ns,
+        "md5": checksums["md5"],
+        "sha256": checksums["sha256"],
+    }
+
+
+def write_json_atomic(data, destination: Path) -> None:
+    """
+    Writes `data` as JSON to a temporary file then renames it over `destination`.
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_name = tempfile.mkstemp(
+        dir=destination.parent, prefix=f".{destination.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+
+        os.chmod(tmp_name, _published_mode(destination))
+        os.replace(tmp_name, destination)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+
+    return if_none_match.strip() == "*" or etag in [
+        x.strip().removeprefix("W/") for x in if_none_match.split(",")
+    ]
+
+
+def get_file_checksums(file_path: Path) -> dict:
+    """
+    Returns the size and the MD5 / SHA-256 hex digests of a file.
+
+    They are computed in a single pass, once per host and (inode, size, mtime) of the
+    open file: the threads and workers missing them at the same time wait for the
+    one hashing the file. A checksums.json written next to a package at upload time
+    is used when it was recorded for that very (size, mtime).
+    """
+    with file_path.open("rb") as f:
+        # The stat of the open file, so the digests always match the content hashed
+        return _open_file_checksums(file_path, f, os.fstat(f.fileno()))
+
+
+def _file_version(file_path: Path, stat: os.stat_result) -> tuple:
+    return (str(file_path.resolve()), stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _remember_checksums(file_path: Path, stat: os.stat_result, checksums: dict) -> None:
+    version = _file_version(file_path, stat)
+    file_checksums.set(version, checksums)
+
+    with _digest_lock:
+        _digest_cache[version[0]] = (version, checksums)
+
+
+def _recorded_checksums(file_path: Path, stat: os.stat_result) -> dict | None:
+    """
+    Returns the checksums of the checksums.json of a package, when they describe `stat`.
+    """
+    checksums_path = file_path.parent / "checksums.json"
+    if file_path.name != "main.zip" or not checksums_path.exists():
+        return None
+
+    try:
+        checksums = json.loads(checksums_path.read_text(encoding="utf-8"))
+        if (checksums.get("size"), checksums.get("mtime_ns")) != (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            return None
+
+        return {x: checksums[x] for x in ("size", "md5", "sha256")}
+    except Exception:
+        return None
+
+
+def _hash_open_file(f, stat: os.stat_result) -> dict:
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    offset = 0
+    while chunk := os.pread(f.fileno(), const.UPLOAD_CHUNK_SIZE, offset):
+        offset += len(chunk)
+        md5.update(chunk)
+        sha256.update(chunk)
+
+    return {"size": stat.st_size, "md5": md5.hexdigest(), "sha256": sha256.hexdigest()}
+
+
+def _open_file_checksums(file_path: Path, f, stat: os.stat_result) -> dict:
+    """
+    Returns the checksums of the open file `f` of `file_path`, whose stat is `stat`.
+    """
+    version = _file_version(file_path, stat)
+
+    with _digest_lock:
+        cached = _digest_cache.get(version[0])
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    checksums = _recorded_checksums(file_path, stat)
+    if checksums is None:
+        checksums = file_checksums.get_or_set(version, lambda: _hash_open_file(f, stat))
+
+    with _digest_lock:
+        _digest_cache[version[0]] = (version, checksums)
+
+    return checksums
+
+
+def get_file_digest(file_path: Path) -> str:
+    """
+    Returns the SHA-256 hex digest of a file, see get_file_checksums.
+    """
+    return get_file_checksums(file_path)["sha256"]
+
+
+def cached_response(
+    request: Request, body: bytes, etag: str, media_type: str = "application/json"
+) -> Response:
+    """
+    Returns a precomputed body, or a 304 when the client already has this ETag.
+    """
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, headers=headers, media_type=media_type)
+
+
+def _parse_range(range_header: str, file_size: int) -> tuple | None:
+    """
+    Parses a single "bytes=start-end" range, returns (start, end) inclusive.
+
+    Returns None for a syntactically invalid or multi-range header, which is then
+    ignored, and raises ValueError when the range can not be satisfied.
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_str, separator, end_str = ranges.strip().partition("-")
+    if not separator or not all(x == "" or x.isdigit() for x in (start_str, end_str)):
+        return None
+
+    if start_str == "":
+        # Suffix range, the last N bytes
+        if end_str == "":
+            return None
+        if int(end_str) == 0 or file_size == 0:
+            raise ValueError("Empty suffix range")
+        return max(file_size - int(end_str), 0), file_size - 1
+
+    start = int(start_str)
+    end = int(end_str) if end_str else file_size - 1
+
+    if start >= file_size:
+        raise ValueError("Range start is past the end of the file")
+    if start > end:
+        return None
+
+    return start, min(end, file_size - 1)
+
+
+class FileRangeResponse(Response):
+    """
+    Sends `length` bytes of an open file starting at `start`, then closes the file.
+
+    The file was opened (and its stat, ETag and Content-Length taken) before the
+    response, so a release replacing it meanwhile does not change what is sent.
+
+    Zero-copy only happens on ASGI servers offering the "http.response.pathsend"
+    extension: a whole file whose path still names the same file is then handed to
+    the server, which copies it to the socket with sendfile. uvicorn, and so the
+    shipped gunicorn + UvicornWorker runtime, does not offer it: there every byte
+    is read with pread in DOWNLOAD_CHUNK_SIZE chunks, in the DOWNLOAD_READ_THREADS
+    threads of the file reads, and copied through Python. Production deployments
+    serving large files should front the app with nginx (FILE_SERVING_MODE=x-accel).
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        file,
+        start: int,
+        length: int,
+        status_code: int,
+        headers: dict,
+        media_type: str,
+    ) -> None:
+        super().__init__(
+            status_code=status_code, headers=headers, media_type=media_type
+        )
+
+        self.file_path = file_path
+        self.file = file
+        self.start = start
+        self.length = length
+
+    def _can_pathsend(self, scope) -> bool:
+        if "http.response.pathsend" not in scope.get("extensions", {}):
+            return False
+        if self.start != 0 or self.length != os.fstat(self.file.fileno()).st_size:
+            return False
+
+        try:
+            stat = self.file_path.stat()
+        except OSError:
+            return False
+        opened = os.fstat(self.file.fileno())
+        return (stat.st_dev, stat.st_ino) == (opened.st_dev, opened.st_ino)
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self._send_file(scope, send)
+        finally:
+            self.file.close()
+
+    async def _send_file(self, scope, send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+
+        if scope.get("method") == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        limiter = _get_read_limiter()
+        if await anyio.to_thread.run_sync(self._can_pathsend, scope, limiter=limiter):
+            await send(
+                {
+                    "type": "http.response.pathsend",
+                    "path": str(self.file_path.resolve()),
+                }
+            )
+            return
+
+        fd = self.file.fileno()
+        offset = self.start
+        remaining = self.length
+        while remaining > 0:
+            chunk = await anyio.to_thread.run_sync(
+                os.pread,
+                fd,
+                min(const.DOWNLOAD_CHUNK_SIZE, remaining),
+                offset,
+                limiter=limiter,
+            )
+            if not chunk:
+                # Only an in-place truncation gets here, releases are replaced
+                # atomically. The Content-Length can no longer be honoured, so
+                # the connection is aborted rather than the response ended early
+                raise RuntimeError(f"{self.file_path} was truncated while being sent")
+
+            offset += len(chunk)
+            remaining -= len(chunk)
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                }
+            )
+
+
+def _x_accel_path(file_path: Path) -> str | None:
+    """
+    Returns the path of a file relative to the app directory, or None for a file
+    outside the directories exposed to the fronting server (SERVED_FILE_DIRS).
+    """
+    path = file_path.resolve()
+    for served_dir in const.SERVED_FILE_DIRS:
+        if path.is_relative_to(Path(served_dir).resolve()):
+            return path.relative_to(Path.cwd()).as_posix()
+
+    return None
+
+
+def ranged_file_response(
+    request: Request,
+    file_path: Path,
+    filename: str | None = None,
+    media_type: str = "application/octet-stream",
+) -> Response:
+    """
+    Serves a file with a strong content-hash ETag and single-range support.
+
+    Handles If-None-Match (304), Range (206 / 416) and If-Range, so interrupted
+    downloads resume where they stopped and proxies can revalidate cached copies.
+
+    With FILE_SERVING_MODE set to "x-accel" (nginx) or "x-sendfile" (Apache, lighttpd)
+    the body is left to the fronting server, which also handles the ranges.
+
+    Raises:
+        FileNotFoundError: When there is no such file.
+    """
+    try:
+        f = file_path.open("rb")
+    except (NotADirectoryError, IsADirectoryError) as e:
+        raise FileNotFoundError(file_path) from e
+
+    try:
+        response = _ranged_file_response(request, file_path, f, filename, media_type)
+    except BaseException:
+        f.close()
+        raise
+
+    if not isinstance(response, FileRangeResponse):
+        f.close()
+
+    return response
+
+
+def _ranged_file_response(
+    request: Request,
+    file_path: Path,
+    f,
+    filename: str | None,
+    media_type: str,
+) -> Response:
+    # The stat of the open file, the size and ETag always describe what is sent
+    stat = os.fstat(f.fileno())
+    file_size = stat.st_size
+    etag = f'"{_open_file_checksums(file_path, f, stat)["sha256"]}"'
+
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": "public, no-cache",
+    }
+    if filename is not None:
+        headers["Content-Disposition"] = (
+            f"attachment; filename*=utf-8''{quote(filename)}"
+            if quote(filename) != filename
+            else f'attachment; filename="{filename}"'
+        )
+
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    config = get_config()
+    serving_mode = config.file_serving_mode
+    x_accel_path = _x_accel_path(file_path) if serving_mode == "x-accel" else None
+    if x_accel_path is not None:
+        prefix = config.x_accel_prefix.rstrip("/")
+        headers["X-Accel-Redirect"] = quote(f"{prefix}/{x_accel_path}")
+        return Response(headers=headers, media_type=media_type)
+    if serving_mode == "x-sendfile":
+        headers["X-Sendfile"] = str(file_path.resolve())
+        return Response(headers=headers, media_type=media_type)
+
+    start, end = 0, file_size - 1
+    status_code = 200
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header is not None and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = _parse_range(range_header, file_size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{file_size}"
+            return Response(status_code=416, headers=headers)
+
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+
+    length = end - start + 1 if file_size > 0 else 0
+    headers["Content-Length"] = str(length)
+
+    return FileRangeResponse(
+        file_path,
+        f,
+        start=start,
+        length=length,
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+    )
@@ -0,0 +1,256 @@
+import asyncio
+import hashlib
+import logging
+from urllib.parse import quote
+
+import httpx
+
+from app.config import get_config
+
+from . import constants as const
+from .logger import setup_logger
+from .metrics import timed
+from .shared_cache import SharedCache
+
+logger = logging.getLogger(__name__)
+setup_logger(logger)
+
+
+def get_flashship_header(auth: bool = False, access_token: str | None = None) -> dict:
+    headers = {
+        "accept": "application/json, text/plain, */*",
+        "accept-language": "vi,en-US;q=0.9,en;q=0.8,vi-VN;q=0.7",
+        "access-control-allow-origin": "*",
+        "origin": "https://devpod.flashship.net",
+        "priority": "u=1, i",
+        "referer": "https://devpod.flashship.net/upload-orders",
+        "sec-ch-ua": '"Google Chrome";v="125", "Chromium";v="125", "Not.A/Brand";v="24"',
+        "sec-ch-ua-mobile": "?0",
+        "sec-ch-ua-platform": '"Windows"',
+        "sec-fetch-dest": "empty",
+        "sec-fetch-mode": "cors",
+        "sec-fetch-site": "same-origin",
+        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
+    }
+
+    if auth:
+        headers["authorization"] = f"Bearer {access_token}"
+
+    return headers
+
+
+class FlashShipClient:
+    """
+    A pooled async client of the FlashShip seller API, one keep-alive pool per mode.
+
+    Calls have connect and read timeouts. Reads (GET) are retried with an exponential
+    back-off on connection errors, 429 and 5xx. Writes are only retried when the
+    connection could not be opened, so an order is never created twice. Successful
+    logins are cached per user, and order details per order, shared by the workers.
+
+    Attributes:
+        endpoints (dict): The base URL of each mode ("dev", "prod").
+    """
+
+    def __init__(self) -> None:
+        config = get_config()
+        self.endpoints = {
+            "dev": config.dev_flashship_endpoint,
+            "prod": config.prod_flashship_endpoint,
+        }
+
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._tokens = SharedCache("flashship_token", ttl=const.FLASHSHIP_TOKEN_TTL)
+        self._orders = SharedCache("flashship_order", ttl=const.FLASHSHIP_ORDER_TTL)
+        self._order_requests: dict[tuple, asyncio.Future] = {}
+
+    def _get_client(self, mode: str) -> httpx.AsyncClient:
+        client = self._clients.get(mode)
+        if client is None:
+            client = httpx.AsyncClient(
+                base_url=self.endpoints[mode] or "",
+                limits=httpx.Limits(
+                    max_connections=const.FLASHSHIP_MAX_CONNECTIONS,
+                    max_keepalive_connections=const.FLASHSHIP_MAX_KEEPALIVE,
+                ),
+                timeout=httpx.Timeout(
+                    const.FLASHSHIP_TIMEOUT, connect=const.FLASHSHIP_CONNECT_TIMEOUT
+                ),
+            )
+            self._clients[mode] = client
+
+        return client
+
+    async def request(
+        self,
+        mode: str,
+        method: str,
+        path: str,
+        access_token: str | None = None,
+        json: dict | None = None,
+    ) -> httpx.Response:
+        """
+        Sends a request to FlashShip, retrying the failures that are safe to retry.
+
+        Raises:
+            httpx.HTTPError: When the last attempt failed without a response.
+        """
+        client = self._get_client(mode)
+        headers = get_flashship_header(
+            auth=access_token is not None, access_token=access_token
+        )
+        is_idempotent = method == "GET"
+
+        for attempt in range(const.FLASHSHIP_RETRIES + 1):
+            is_last = attempt == const.FLASHSHIP_RETRIES
+            try:
+                with timed(f"flashship.{method.lower()}"):
+                    response = await client.request(
+                        method, path, headers=headers, json=json
+                    )
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                # Nothing reached FlashShip, any request can be sent again
+                if is_last:
+                    raise
+            except httpx.TransportError:
+                if is_last or not is_idempotent:
+                    raise
+            else:
+                is_retryable = (
+                    response.status_code == 429 or response.status_code >= 500
+                )
+                if is_last or not is_idempotent or not is_retryable:
+                    return response
+
+            logger.warning(
+                "Retrying FlashShip %s %s (attempt %d)", method, path, attempt + 1
+            )
+            await asyncio.sleep(const.FLASHSHIP_RETRY_BACKOFF * 2**attempt)
+
+    async def login(
+        self, mode: str, username: str, password: str
+    ) -> tuple[int, dict | list]:
+        """
+        Returns the status code and content of the token request, cached per user.
+        """
+        key = (
+            mode,
+            username,
+            hashlib.sha256(password.encode("utf-8")).hexdigest(),
+        )
+        cached = self._tokens.get(key)
+        if cached is not None:
+            return 200, cached
+
+        response = await self.request(
+            mode,
+            "POST",
+            "/seller-api-v2/token",
+            json={"username": username, "password": password},
+        )
+        content = response_content(response)
+
+        status_code = response.status_code
+        if isinstance(content, dict) and content.get("msg") == "fail":
+            status_code = 401
+        elif status_code == 200:
+            self._tokens.set(key, content)
+
+        return status_code, content
+
+    async def get_order(
+        self, mode: str, order_code: str, access_token: str
+    ) -> tuple[int, dict | list]:
+        """
+        Returns the status code and content of the details of an order, cached by its status.
+
+        The details of an order in a terminal status are reused for
+        FLASHSHIP_TERMINAL_ORDER_TTL, the others for FLASHSHIP_ORDER_TTL. Concurrent
+        lookups of the same order with the same token share one upstream request.
+        The cache and the shared requests are keyed by a digest of the token too, so
+        a caller only ever gets the details FlashShip returned for its own account.
+        """
+        key = (
+            mode,
+            hashlib.sha256(access_token.encode("utf-8")).hexdigest(),
+            order_code,
+        )
+        cached = self._orders.get(key)
+        if cached is not None:
+            return 200, cached
+
+        future = self._order_requests.get(key)
+        if future is None:
+            future = asyncio.ensure_future(
+                self._fetch_order(key, mode, order_code, access_token)
+            )
+            self._order_requests[key] = future
+            future.add_done_callback(lambda _: self._order_requests.pop(key, None))
+
+        # A cancelled caller must not cancel the request the others are waiting for
+        return await asyncio.shield(future)
+
+    async def _fetch_order(
+        self, key: tuple, mode: str, order_code: str, access_token: str
+    ) -> tuple[int, dict | list]:
+        response = await self.request(
+            mode,
+            "GET",
+            f"/seller-api-v2/orders/{quote(order_code, safe='')}",
+            access_token=access_token,
+        )
+        content = response_content(response)
+
+        if response.status_code == 200:
+            self._orders.set(
+                key,
+                content,
+                ttl=(
+                    const.FLASHSHIP_TERMINAL_ORDER_TTL
+                    if is_order_terminal(content)
+                    else None
+                ),
+            )
+
+        return response.status_code, content
+
+    async def aclose(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+
+def response_content(response: httpx.Response) -> dict | list:
+    """
+    Returns the JSON content of a FlashShip response, wrapped when it is not JSON.
+    """
+    try:
+        return response.json()
+    except ValueError:
+        return {"msg": "fail", "error": response.text[:1000]}
+
+
+def get_order_status(content: dict | list) -> str | None:
+    """
+    Returns the status of an order from the content of its details, None when absent.
+    """
+    if not isinstance(content, dict):
+        return None
+
+    data = content.get("data")
+    for source in (data, content):
+        if isinstance(source, dict) and isinstance(source.get("status"), str):
+            return source["status"]
+
+    return None
+
+
+def is_order_terminal(content: dict | list) -> bool:
+    status = get_order_status(content)
+    return (
+        status is not None
+        and status.strip().upper() in const.FLASHSHIP_TERMINAL_STATUSES
+    )
+
+
+flashship_client = FlashShipClient()
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import logging
+from typing import Callable, Hashable
+
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+
+from . import constants as const
+from .logger import setup_logger
+from .shared_cache import SharedCache
+
+logger = logging.getLogger(__name__)
+setup_logger(logger)
+
+# (scope, Idempotency-Key) -> the stored response of the first request
+idempotent_responses = SharedCache("idempotency", ttl=const.IDEMPOTENCY_TTL)
+
+
+def run_idempotent(
+    scope: Hashable,
+    idempotency_key: str | None,
+    payload,
+    handler: Callable[[], Response],
+) -> Response:
+    """
+    Runs a write route once per Idempotency-Key, its retries get the stored response.
+
+    The response is stored for IDEMPOTENCY_TTL seconds and shared by the workers. A
+    retry arriving while the first request still runs waits for it. Error responses
+    are dropped once returned, so a failed write can be retried with the same key.
+    Without a key the handler just runs.
+
+    Args:
+        scope (Hashable): What the key applies to, e.g. (route, workbook, sheet).
+        idempotency_key (str | None): The Idempotency-Key header of the request.
+        payload: The request parameters, a key reused with another payload is rejected.
+        handler (Callable[[], Response]): Runs the write and returns its response.
+
+    Raises:
+        HTTPException: 422 when the key was used with another payload.
+    """
+    if not idempotency_key:
+        return handler()
+
+    fingerprint = hashlib.sha256(
+        json.dumps(jsonable_encoder(payload), sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+    key = (scope, idempotency_key)
+    is_replayed = True
+
+    def run() -> dict:
+        nonlocal is_replayed
+        is_replayed = False
+
+        response = handler()
+        return {
+            "fingerprint": fingerprint,
+            "status_code": response.status_code,
+            "media_type": response.media_type,
+            "body": response.body.decode("utf-8"),
+        }
+
+    stored = idempotent_responses.get_or_set(key, run)
+
+    if not is_replayed and stored["status_code"] >= 400:
+        idempotent_responses.pop(key)
+
+    if stored["fingerprint"] != fingerprint:
+        raise HTTPException(
+            status_code=422,
+            detail="The Idempotency-Key was already used with another request",
+        )
+
+    response = Response(
+        content=stored["body"],
+        status_code=stored["status_code"],
+        media_type=stored["media_type"],
+    )
+    if is_replayed:
+        logger.info("Replayed the response of Idempotency-Key %s", idempotency_key)
+        response.headers["Idempotent-Replayed"] = "true"
+
+    return response
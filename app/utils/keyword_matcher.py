@@ -0,0 +1,125 @@
+import re
+import threading
+from typing import Iterable, List
+
+
+class KeywordMatcher:
+    """
+    Classifies product titles against the tier-1/tier-2 keywords of FulfilmentChinaSetting.
+
+    Each tier is compiled once into a trie of its keywords, emitted as a single regex
+    (a plain alternation backtracks through every keyword at each position, the trie
+    shares common prefixes). A title is scanned once per tier instead of once per
+    keyword, and the regexes are only rebuilt when the keyword lists change.
+
+    Attributes:
+        tier_1_keywords (tuple): The tier-1 keywords the matcher was compiled with.
+        tier_2_keywords (tuple): The tier-2 keywords the matcher was compiled with.
+    """
+
+    def __init__(self) -> None:
+        self.tier_1_keywords: tuple = ()
+        self.tier_2_keywords: tuple = ()
+
+        self._tier_1_pattern: re.Pattern | None = None
+        self._tier_2_pattern: re.Pattern | None = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(keywords: Iterable) -> tuple:
+        normalized = {str(x).strip().lower() for x in keywords or [] if str(x).strip()}
+        return tuple(sorted(normalized))
+
+    @classmethod
+    def _trie_pattern(cls, node: dict) -> str:
+        if list(node) == [""]:
+            return ""
+
+        alternatives = []
+        single_chars = []
+        is_optional = False
+
+        for char in sorted(node):
+            if char == "":
+                is_optional = True
+                continue
+
+            sub_pattern = cls._trie_pattern(node[char])
+            if sub_pattern == "" and "" in node[char]:
+                single_chars.append(re.escape(char))
+            else:
+                alternatives.append(re.escape(char) + sub_pattern)
+
+        if single_chars:
+            alternatives.append(
+                single_chars[0]
+                if len(single_chars) == 1
+                else "[" + "".join(single_chars) + "]"
+            )
+
+        pattern = (
+            alternatives[0]
+            if len(alternatives) == 1
+            else "(?:" + "|".join(alternatives) + ")"
+        )
+
+        # Greedy, so the longest (most specific) keyword is reported
+        if is_optional:
+            pattern = "(?:" + pattern + ")?"
+
+        return pattern
+
+    @classmethod
+    def _compile(cls, keywords: tuple) -> re.Pattern | None:
+        if not keywords:
+            return None
+
+        trie: dict = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = {}
+
+        return re.compile(cls._trie_pattern(trie))
+
+    def compile(self, tier_1_keywords: Iterable, tier_2_keywords: Iterable) -> bool:
+        """
+        Compiles the keyword lists, returns False when they did not change.
+        """
+        tier_1 = self._normalize(tier_1_keywords)
+        tier_2 = self._normalize(tier_2_keywords)
+
+        with self._lock:
+            if tier_1 == self.tier_1_keywords and tier_2 == self.tier_2_keywords:
+                return False
+
+            tier_1_pattern = self._compile(tier_1)
+            tier_2_pattern = self._compile(tier_2)
+
+            self._tier_1_pattern, self._tier_2_pattern = tier_1_pattern, tier_2_pattern
+            self.tier_1_keywords, self.tier_2_keywords = tier_1, tier_2
+
+        return True
+
+    def classify(self, title: str) -> dict:
+        """
+        Returns the tier (1, 2 or None) of a title and the keyword that matched.
+        """
+        tier_1_pattern, tier_2_pattern = self._tier_1_pattern, self._tier_2_pattern
+        title = title.lower()
+
+        if tier_1_pattern is not None:
+            match = tier_1_pattern.search(title)
+            if match:
+                return {"tier": 1, "keyword": match.group(0)}
+
+        if tier_2_pattern is not None:
+            match = tier_2_pattern.search(title)
+            if match:
+                return {"tier": 2, "keyword": match.group(0)}
+
+        return {"tier": None, "keyword": None}
+
+    def classify_many(self, titles: List[str]) -> List[dict]:
+        return [self.classify(x) for x in titles]
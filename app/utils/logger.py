@@ -1,26 +1,163 @@
+import atexit
+import fcntl
+import itertools
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+
+from app.config import get_config
 
 os.makedirs("log", exist_ok=True)
 
+LOG_FILE = "log/backend.log"
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records untouched, so the %-style message is only built by the listener.
+
+    The queue never leaves the process, there is no need to pickle-proof the record.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+# The single queue every logger writes to, drained by one listener thread
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_queue_handler = LazyQueueHandler(_log_queue)
+_listener: logging.handlers.QueueListener | None = None
+_listener_lock = threading.Lock()
+# The open lock file of the log slot of this process, see _worker_log_file
+_slot_file = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as a single JSON line, enabled with LOG_FORMAT=json.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        content = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "name": record.name,
+            "message": record.getMessage(),
+            "path": record.pathname,
+            "line": record.lineno,
+        }
+        if record.exc_info:
+            content["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(content, ensure_ascii=False)
+
+
+def _create_formatter() -> logging.Formatter:
+    date_format = "%Y-%m-%d %H:%M:%S"
+
+    if get_config().log_format == "json":
+        return JsonFormatter(datefmt=date_format)
 
-def setup_logger(logger, is_root=False, level=logging.INFO):
-    # Set up the log formatter
     msg_format = (
         "%(asctime)s [%(levelname)8s] %(message)s (%(name)s - %(pathname)s:%(lineno)d)"
     )
-    date_format = "%Y-%m-%d %H:%M:%S"
-    formatter = logging.Formatter(fmt=msg_format, datefmt=date_format)
+    return logging.Formatter(fmt=msg_format, datefmt=date_format)
+
+
+def _worker_log_file() -> str:
+    """
+    Returns log/backend.{n}.log for the lowest slot n no other live process holds.
+
+    The slot is locked for the life of the process, so a worker recycled after
+    max_requests hands its file over to its replacement, and there are never more
+    files than workers alive at once.
+    """
+    global _slot_file
+
+    for index in itertools.count():
+        slot_file = open(f"log/backend.{index}.lock", "a")
+        try:
+            fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            slot_file.close()
+            continue
+
+        _slot_file = slot_file
+        return f"log/backend.{index}.log"
+
+
+def _create_file_handler() -> logging.Handler:
+    config = get_config()
+    rotate_when = config.log_rotate_when
+    backup_count = config.log_backup_count
+
+    # Worker processes must not rotate the same file, each one gets its own
+    log_file = LOG_FILE
+    if config.log_file_per_process:
+        log_file = _worker_log_file()
+
+    # Time based rotation (e.g. "midnight") when configured, size based otherwise
+    if rotate_when:
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file, when=rotate_when, backupCount=backup_count, encoding="utf-8"
+        )
+
+    return logging.handlers.RotatingFileHandler(
+        log_file,
+        maxBytes=config.log_max_bytes,
+        backupCount=backup_count,
+        encoding="utf-8",
+    )
+
+
+def _start_listener() -> None:
+    global _listener
+
+    with _listener_lock:
+        if _listener is not None:
+            return
+
+        formatter = _create_formatter()
+
+        file_handler = _create_file_handler()
+        file_handler.setFormatter(formatter)
+
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+
+        _listener = logging.handlers.QueueListener(
+            _log_queue, file_handler, stream_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(stop_listener)
+
+
+def stop_listener() -> None:
+    """
+    Flushes the queued records and stops the listener thread.
+    """
+    global _listener
+
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def setup_logger(logger, is_root=False, level=logging.INFO):
+    """
+    Routes a logger to the shared queue, written to the log file and stderr by one thread.
 
-    # File Handler
-    file_handler = logging.FileHandler("log/backend.log", encoding="utf-8")
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    Callers only pay for putting the record on the queue, the formatting and the disk
+    I/O happen on the listener thread. Calling it again for the same logger is a no-op.
+    """
+    _start_listener()
 
-    # Stream Handler
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
+    if _queue_handler not in logger.handlers:
+        logger.addHandler(_queue_handler)
 
     if is_root:
         logger.propagate = False
@@ -0,0 +1,241 @@
+import os
+import re
+import time
+from contextlib import ContextDecorator
+
+from fastapi import Request, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+from app.database import engine
+
+REQUEST_LATENCY = Histogram(
+    "aiotts_http_request_duration_seconds",
+    "Latency of the HTTP requests, by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "aiotts_http_requests_in_progress",
+    "Number of HTTP requests being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+SPAN_LATENCY = Histogram(
+    "aiotts_span_duration_seconds",
+    "Latency of the timed steps inside a request (Sheets calls, DB queries, encoding)",
+    ["span"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+SHEETS_API_CALLS = Counter(
+    "aiotts_sheets_api_calls_total",
+    "Number of HTTP calls made to the Google Sheets / Drive APIs",
+    ["operation", "status"],
+)
+SHEETS_API_BYTES = Counter(
+    "aiotts_sheets_api_response_bytes_total",
+    "Bytes received from the Google Sheets / Drive APIs",
+    ["operation"],
+)
+SHEET_CACHE_LOOKUPS = Counter(
+    "aiotts_sheet_cache_lookups_total",
+    "Sheet reads served from the sheet cache (hit) or from Google (miss)",
+    ["result"],
+)
+SHEET_REFRESHES = Counter(
+    "aiotts_sheet_refreshes_total",
+    "Background refreshes of the hot sheets",
+    ["status"],
+)
+ADMISSION_WAIT = Histogram(
+    "aiotts_admission_wait_seconds",
+    "Time the requests waited for a slot of their route group",
+    ["group"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+ADMISSION_REJECTIONS = Counter(
+    "aiotts_admission_rejections_total",
+    "Requests shed with a 503 by the admission control, by route group",
+    ["group", "reason"],
+)
+
+# Summed over the live workers, every worker has its own pool
+DB_POOL_SIZE = Gauge(
+    "aiotts_db_pool_size",
+    "Size of the database connection pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "aiotts_db_pool_checked_out",
+    "Database connections currently in use",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "aiotts_db_pool_overflow",
+    "Database connections opened above the pool size",
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE.set(engine.pool.size())
+
+
+class timed(ContextDecorator):
+    """
+    Records the duration of a block, or of every call of a function, under a span name.
+
+    Usage:
+        with timed("sheets.fetch_range"):
+            ...
+
+        @timed("db.get_uuid")
+        def get_uuid(...): ...
+    """
+
+    def __init__(self, span: str) -> None:
+        self.span = span
+        self._histogram = SPAN_LATENCY.labels(span)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+    def _recreate_cm(self):
+        # Each call of a decorated function gets its own start time
+        return timed(self.span)
+
+
+_SHEETS_OPERATIONS = [
+    (re.compile(r"/values:batchGet"), "values.batchGet"),
+    (re.compile(r"/values:batchUpdate"), "values.batchUpdate"),
+    (re.compile(r"/values/[^/]+:append"), "values.append"),
+    (re.compile(r"/values/"), "values.get"),
+    (re.compile(r":batchUpdate"), "batchUpdate"),
+    (re.compile(r"/drive/"), "drive.files"),
+    (re.compile(r"/spreadsheets/"), "spreadsheets.get"),
+]
+
+
+def record_sheets_response(response, *args, **kwargs):
+    """
+    A requests response hook counting the calls and bytes of the Google APIs.
+    """
+    operation = "other"
+    for pattern, name in _SHEETS_OPERATIONS:
+        if pattern.search(response.url):
+            operation = name
+            break
+
+    if operation.startswith("values.get") and response.request.method != "GET":
+        operation = f"values.{response.request.method.lower()}"
+
+    SHEETS_API_CALLS.labels(operation, str(response.status_code)).inc()
+    SHEETS_API_BYTES.labels(operation).inc(len(response.content))
+
+    return response
+
+
+def _route_template(scope) -> str:
+    """
+    Returns the full path template of the matched route, e.g. /aiotts/update/info.
+
+    The routes of an included router keep their path without the router prefix, so
+    the prefix is taken from the request path, in front of what the route matched.
+    """
+    route = scope.get("route")
+    path_regex = getattr(route, "path_regex", None)
+    if path_regex is None:
+        return "unmatched"
+
+    path = scope["path"]
+    for index, char in enumerate(path):
+        if char == "/" and path_regex.match(path[index:]):
+            return path[:index] + route.path_format
+
+    return route.path_format
+
+
+class MetricsMiddleware:
+    """
+    Records the latency of every HTTP request by method, route template and status.
+
+    A plain ASGI middleware, so streamed and zero-copy file responses pass through as is.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.labels(method).inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.labels(method).dec()
+
+            # The route template keeps the label cardinality bounded
+            REQUEST_LATENCY.labels(method, _route_template(scope), status).observe(
+                time.perf_counter() - start
+            )
+
+
+def metrics_endpoint(request: Request) -> Response:
+    # Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR,
+    # the worker serving the scrape aggregates them
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(
+            content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST
+        )
+
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+def _update_pool_gauges(*args) -> None:
+    # Set on pool events rather than with set_function, which multiprocess mode ignores
+    DB_POOL_CHECKED_OUT.set(engine.pool.checkedout())
+    DB_POOL_OVERFLOW.set(max(engine.pool.overflow(), 0))
+
+
+event.listen(engine, "checkout", _update_pool_gauges)
+event.listen(engine, "checkin", _update_pool_gauges)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+
+    # One span per statement kind (db.select, db.insert, ...) for every crud query
+    kind = (
+        statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "other"
+    )
+    SPAN_LATENCY.labels(f"db.{kind}").observe(elapsed)
@@ -0,0 +1,217 @@
+import cProfile
+import functools
+import inspect
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+
+from fastapi.routing import APIRoute
+
+from app.config import get_config
+
+from .authorization import is_admin_key
+from .logger import setup_logger
+
+logger = logging.getLogger(__name__)
+setup_logger(logger)
+
+PROFILE_DIR = Path("log/profiles")
+PROFILE_MODES = ("sample", "cprofile")
+
+# Set by ProfilingMiddleware for the requests that must be profiled
+_profile_request: ContextVar[dict | None] = ContextVar("profile_request", default=None)
+
+
+class StackSampler:
+    """
+    Samples the Python stack of one thread at a fixed interval.
+
+    The samples are written in the folded format ("frame;frame;frame count" per line)
+    read by flamegraph.pl, speedscope or inferno.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.001) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._sample, name="stack-sampler", daemon=True
+        )
+
+    def _sample(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})"
+                )
+                frame = frame.f_back
+
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self._stop_event.set()
+        self._thread.join()
+        return False
+
+    def dump(self, file_path: Path) -> None:
+        with file_path.open("w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class _Profiler:
+    """
+    Profiles the calling thread with the sampler or cProfile, and saves the result.
+    """
+
+    def __init__(self, request: dict) -> None:
+        self.request = request
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        if self.request["mode"] == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = StackSampler(threading.get_ident()).__enter__()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        elapsed = time.perf_counter() - self._start
+
+        try:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            if self.request["mode"] == "cprofile":
+                self._profiler.disable()
+                file_path = PROFILE_DIR / f"{self.request['name']}.prof"
+                self._profiler.dump_stats(file_path)
+            else:
+                self._profiler.__exit__(*exc)
+                file_path = PROFILE_DIR / f"{self.request['name']}.folded"
+                self._profiler.dump(file_path)
+
+            self.request["output"] = file_path.name
+            logger.info(
+                "Profiled %s in %.3fs: %s", self.request["path"], elapsed, file_path
+            )
+        except Exception:
+            logger.error("Error when saving the profile", exc_info=True)
+
+        return False
+
+
+def _wrap_endpoint(endpoint):
+    """
+    Runs the endpoint under a profiler when the current request asked for one.
+
+    The wrapper runs where the endpoint runs, so sync endpoints are profiled inside
+    their threadpool thread rather than on the event loop.
+    """
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            request = _profile_request.get()
+            if request is None:
+                return await endpoint(*args, **kwargs)
+
+            with _Profiler(request):
+                return await endpoint(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        request = _profile_request.get()
+        if request is None:
+            return endpoint(*args, **kwargs)
+
+        with _Profiler(request):
+            return endpoint(*args, **kwargs)
+
+    return wrapper
+
+
+class ProfilingRoute(APIRoute):
+    """
+    An APIRoute whose endpoint can be profiled on demand, see ProfilingMiddleware.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs) -> None:
+        super().__init__(path, _wrap_endpoint(endpoint), **kwargs)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests sent with an "X-Profile: sample | cprofile" header.
+
+    The request must also carry "X-Admin-Key" matching ADMIN_API_KEY, and is then
+    profiled with probability PROFILE_SAMPLE_RATE. The output is saved under
+    log/profiles/ and its file name returned in the X-Profile-Output header.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    def _profile_mode(self, scope) -> str | None:
+        headers = dict(scope.get("headers") or [])
+
+        mode = headers.get(b"x-profile", b"").decode("latin-1").strip().lower()
+        if mode not in PROFILE_MODES:
+            return None
+
+        if not is_admin_key(headers.get(b"x-admin-key", b"").decode("latin-1")):
+            return None
+
+        if random.random() >= get_config().profile_sample_rate:
+            return None
+
+        return mode
+
+    async def __call__(self, scope, receive, send) -> None:
+        mode = self._profile_mode(scope) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        slug = scope["path"].strip("/").replace("/", "_") or "root"
+        request = {
+            "mode": mode,
+            "path": scope["path"],
+            "name": f"{datetime.now():%Y%m%d-%H%M%S-%f}-{scope['method']}-{slug}",
+            "output": None,
+        }
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                # The endpoint has returned, the profile is saved by now
+                if request["output"] is not None:
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (b"x-profile-output", request["output"].encode())
+                    ]
+            await send(message)
+
+        token = _profile_request.set(request)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _profile_request.reset(token)
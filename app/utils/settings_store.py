@@ -0,0 +1,158 @@
+import logging
+import select
+import threading
+import time
+from typing import Callable, List
+
+from app.database import SessionLocal, engine
+from app.database.crud import get_fulfilment_china_setting, get_update_infos
+
+from . import constants as const
+from .logger import setup_logger
+
+logger = logging.getLogger(__name__)
+setup_logger(logger)
+
+
+class SettingsStore:
+    """
+    An in-memory copy of the settings tables, kept fresh by Postgres LISTEN/NOTIFY.
+
+    The tables are loaded once at startup and reloaded whenever a trigger publishes on
+    the settings channel (see migration 0003), with a periodic reload as a safety net.
+    Readers only touch the in-memory snapshot, so the hot path never hits the database.
+
+    Attributes:
+        update_infos (dict): A mapping from version to the row of settings.update_info.
+        tier_1_keywords (list): The tier-1 keywords of settings.fulfilment_china.
+        tier_2_keywords (list): The tier-2 keywords of settings.fulfilment_china.
+        version (int): Incremented on every successful reload.
+    """
+
+    def __init__(self) -> None:
+        self.update_infos: dict = {}
+        self.tier_1_keywords: list = []
+        self.tier_2_keywords: list = []
+        self.version = 0
+
+        self._listeners: List[Callable[["SettingsStore"], None]] = []
+        self._loaded_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add_listener(self, callback: Callable[["SettingsStore"], None]) -> None:
+        """
+        Registers a callback that is called with the store after every reload.
+        """
+        self._listeners.append(callback)
+
+    def load(self) -> None:
+        """
+        Reloads every settings table and swaps the in-memory snapshot.
+        """
+        with SessionLocal() as db:
+            update_infos = {
+                x.version: {
+                    "version": x.version,
+                    "md5_checksum": x.md5_checksum,
+                    "is_required": bool(x.is_required),
+                    "is_active": bool(x.is_active),
+                }
+                for x in get_update_infos(db)
+            }
+            fulfilment_china = get_fulfilment_china_setting(db)
+
+        if fulfilment_china is None:
+            tier_1_keywords, tier_2_keywords = [], []
+        else:
+            tier_1_keywords = list(fulfilment_china.tier_1_keywords or [])
+            tier_2_keywords = list(fulfilment_china.tier_2_keywords or [])
+
+        self.update_infos = update_infos
+        self.tier_1_keywords = tier_1_keywords
+        self.tier_2_keywords = tier_2_keywords
+        self.version += 1
+        self._loaded_event.set()
+
+        logger.info(
+            "Loaded settings version %d: %d update versions, %d/%d keywords",
+            self.version,
+            len(update_infos),
+            len(tier_1_keywords),
+            len(tier_2_keywords),
+        )
+
+        for callback in self._listeners:
+            try:
+                callback(self)
+            except Exception:
+                logger.error("Error in settings listener %r", callback, exc_info=True)
+
+    def wait_loaded(self, timeout: float) -> bool:
+        """
+        Waits for the first load, returns whether the settings are loaded.
+        """
+        return self._loaded_event.wait(timeout)
+
+    def start(self) -> None:
+        """
+        Starts the background thread that listens for settings changes.
+        """
+        if self._thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._listen, name="settings-listener", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout=const.SETTINGS_RECONNECT_DELAY)
+            self._thread = None
+
+    def _listen(self) -> None:
+        while not self._stop_event.is_set():
+            connection = None
+            try:
+                # A dedicated connection, taken out of the pool since it stays in LISTEN
+                connection = engine.raw_connection()
+                connection.detach()
+                dbapi_connection = connection.driver_connection
+                dbapi_connection.autocommit = True
+
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {const.SETTINGS_NOTIFY_CHANNEL}")
+
+                # Load after subscribing so no change between both steps is missed
+                self.load()
+                last_load = time.monotonic()
+
+                while not self._stop_event.is_set():
+                    readable, _, _ = select.select([dbapi_connection], [], [], 1.0)
+
+                    if readable:
+                        dbapi_connection.poll()
+
+                    if dbapi_connection.notifies:
+                        dbapi_connection.notifies.clear()
+                        self.load()
+                        last_load = time.monotonic()
+                    elif time.monotonic() - last_load > const.SETTINGS_REFRESH_INTERVAL:
+                        self.load()
+                        last_load = time.monotonic()
+            except Exception:
+                logger.error("Error in settings listener, reconnecting", exc_info=True)
+                self._stop_event.wait(const.SETTINGS_RECONNECT_DELAY)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+
+settings_store = SettingsStore()
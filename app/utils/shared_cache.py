@@ -0,0 +1,352 @@
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Hashable, Iterable
+
+from app.config import get_config
+
+from .cache import TTLCache
+
+
+def default_cache_dir() -> Path:
+    """
+    Returns the directory of the shared cache, on tmpfs (/dev/shm) when available.
+    """
+    configured = get_config().shared_cache_dir
+    if configured:
+        return Path(configured)
+
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return Path(base) / "aiotts-cache"
+
+
+class SharedCache:
+    """
+    A TTL cache shared by all the worker processes of one host.
+
+    Every entry is a small JSON snapshot file in a directory on tmpfs, so the
+    data is held once in memory for N workers, and a value filled by one worker
+    is served by the others without reaching the database or Google Sheets again.
+
+    Every process keeps the values it read in a TTLCache in front, with the
+    identity (inode, mtime) of their entry file. A hit only stats the file to
+    check the copy is current, so a large value is parsed once per process and
+    entry, and a set() or pop() in one worker is seen by the others at once.
+
+    invalidate() and pop() also bump the generation of the key: a value loaded by
+    get_or_set() or refresh() meanwhile is not stored, it may predate the change.
+
+    Values must be JSON serializable.
+
+    Attributes:
+        namespace (str): The sub directory of the entries, one per cache.
+        ttl (float): The number of seconds an entry stays valid.
+        local_ttl (float): The number of seconds a value is kept in the per-process front cache.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float = 60.0,
+        local_maxsize: int = 1024,
+        local_ttl: float = 2.0,
+        directory: Path | None = None,
+    ) -> None:
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+
+        self.directory = (directory or default_cache_dir()) / namespace
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._local = TTLCache(maxsize=local_maxsize, ttl=min(local_ttl, ttl))
+        self._next_prune = time.time() + ttl
+
+    def _path(self, key: Hashable) -> Path:
+        digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=16).hexdigest()
+        return self.directory / digest
+
+    def _identity(self, path: Path) -> tuple | None:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+
+        return stat.st_ino, stat.st_mtime_ns
+
+    def generation(self, key: Hashable) -> str:
+        """
+        Returns the generation of the key, it changes on every invalidate() or pop() of the key.
+        """
+        try:
+            return self._path(key).with_suffix(".gen").read_text()
+        except OSError:
+            return ""
+
+    def _bump_generation(self, key: Hashable) -> None:
+        self._write_file(
+            self._path(key).with_suffix(".gen"), f"{os.getpid()}-{time.time_ns()}"
+        )
+
+    def _write_file(
+        self, path: Path, content: str, mtime: float | None = None
+    ) -> tuple | None:
+        """
+        Writes a file next to `path` then renames it, readers never see a partial file.
+
+        Returns the identity of the written file.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+            if mtime is not None:
+                os.utime(tmp_path, (mtime, mtime))
+            identity = self._identity(Path(tmp_path))
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        return identity
+
+    def _read(self, key: Hashable) -> tuple[bool, Any]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                expires_at, value = json.loads(f.read())
+        except (OSError, ValueError):
+            return False, None
+
+        if expires_at < time.time():
+            path.unlink(missing_ok=True)
+            return False, None
+
+        # Never keep a value locally longer than it is valid in the shared tier
+        self._local.set(
+            key,
+            ((stat.st_ino, stat.st_mtime_ns), value),
+            ttl=min(self.local_ttl, expires_at - time.time()),
+        )
+        return True, value
+
+    def _lookup(self, key: Hashable) -> tuple[bool, Any]:
+        local = self._local.get(key)
+        if local is not None:
+            identity, value = local
+            if identity == self._identity(self._path(key)):
+                return True, value
+
+            self._local.pop(key)
+
+        return self._read(key)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        found, value = self._lookup(key)
+        return value if found else default
+
+    def get_many(self, keys: Iterable[Hashable]) -> dict:
+        """
+        Returns a dict with the cached values of the given keys, missing or expired keys are left out.
+        """
+        result = {}
+        for key in keys:
+            found, value = self._lookup(key)
+            if found:
+                result[key] = value
+
+        return result
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl
+        content = json.dumps([expires_at, value], ensure_ascii=False)
+
+        # The expiry is also the mtime, so refresh() and prune() only stat the entries
+        identity = self._write_file(self._path(key), content, mtime=expires_at)
+
+        self._local.set(key, (identity, value), ttl=min(self.local_ttl, ttl))
+        self._prune_if_due()
+
+    def _set_if_current(
+        self, key: Hashable, value: Any, generation: str, ttl: float | None
+    ) -> None:
+        """
+        Stores a loaded value, unless the key was popped since `generation` was read.
+        """
+        self.set(key, value, ttl=ttl)
+
+        # Checked after the write, a pop() racing with it unlinks the entry itself
+        if self.generation(key) != generation:
+            self._local.pop(key)
+            self._path(key).unlink(missing_ok=True)
+
+    def get_or_set(
+        self, key: Hashable, loader: Callable[[], Any], ttl: float | None = None
+    ) -> Any:
+        """
+        Returns the cached value of the key, or fills it with loader().
+
+        A per-key file lock makes the workers that miss at the same time wait for
+        the first one, so an entry is loaded once per host instead of once per worker.
+        """
+        found, value = self._lookup(key)
+        if found:
+            return value
+
+        lock_path = self._path(key).with_suffix(".lock")
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                found, value = self._read(key)
+                if found:
+                    return value
+
+                generation = self.generation(key)
+                value = loader()
+                self._set_if_current(key, value, generation, ttl)
+                return value
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def update(
+        self,
+        key: Hashable,
+        updater: Callable[[Any], tuple[Any, Any]],
+        ttl: float | None = None,
+    ) -> Any:
+        """
+        Replaces the value of the key with the first item of updater(value), and
+        returns the second one. updater gets None when the key is missing.
+
+        The per-key file lock is held around the read and the write, so the updates
+        of all the workers are applied one after the other (counters, rate limits).
+        """
+        lock_path = self._path(key).with_suffix(".lock")
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                found, value = self._read(key)
+                value, result = updater(value if found else None)
+                self.set(key, value, ttl=ttl)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def refresh(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        min_remaining: float,
+        ttl: float | None = None,
+    ) -> bool:
+        """
+        Reloads the entry of the key with loader() when it expires within `min_remaining` seconds.
+
+        The entry keeps being served while it is reloaded. When another worker is
+        already reloading it the call returns at once, so each entry is refreshed
+        once per host. Returns True when the entry was reloaded.
+        """
+        lock_path = self._path(key).with_suffix(".lock")
+        with open(lock_path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            try:
+                try:
+                    expires_at = self._path(key).stat().st_mtime
+                except OSError:
+                    expires_at = 0.0
+
+                if expires_at - time.time() > min_remaining:
+                    return False
+
+                generation = self.generation(key)
+                self._set_if_current(key, loader(), generation, ttl)
+                return True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drops the entry of the key, and the value of any loader running meanwhile.
+        """
+        # Bumped first, a loader storing its value after this is caught either way
+        self._bump_generation(key)
+        self._local.pop(key)
+        self._path(key).unlink(missing_ok=True)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        found, value = self._lookup(key)
+        self.invalidate(key)
+
+        return value if found else default
+
+    def clear(self) -> None:
+        self._local.clear()
+        for path in self.directory.iterdir():
+            path.unlink(missing_ok=True)
+
+    def prune(self) -> int:
+        """
+        Deletes the expired entries and returns how many were removed.
+        """
+        removed = 0
+        now = time.time()
+
+        for path in self.directory.iterdir():
+            if path.suffix == ".lock" or path.name.startswith(".tmp-"):
+                continue
+            try:
+                expires_at = path.stat().st_mtime
+            except OSError:
+                continue
+
+            if path.suffix == ".gen":
+                # No loader runs for a whole TTL, an old generation guards nothing
+                if expires_at < now - self.ttl:
+                    path.unlink(missing_ok=True)
+                continue
+
+            if expires_at < now:
+                path.unlink(missing_ok=True)
+                path.with_suffix(".lock").unlink(missing_ok=True)
+                removed += 1
+
+        return removed
+
+    def _prune_if_due(self) -> None:
+        if time.time() < self._next_prune:
+            return
+        self._next_prune = time.time() + self.ttl
+
+        # Swept in the background, never on the thread of the request that set()
+        threading.Thread(
+            target=self._prune_locked, name=f"prune-{self.namespace}", daemon=True
+        ).start()
+
+    def _prune_locked(self) -> None:
+        # Only one worker sweeps at a time, the others skip instead of waiting
+        with open(self.directory / ".prune.lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            try:
+                self.prune()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __len__(self) -> int:
+        return sum(
+            1
+            for path in self.directory.iterdir()
+            if path.suffix not in (".lock", ".gen") and not path.name.startswith(".")
+        )
@@ -0,0 +1,148 @@
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.database import SessionLocal
+from app.database.crud import (
+    add_sheet_changes,
+    delete_sheet_changes_before,
+    get_sheet_change_bounds,
+    get_sheet_changes_of_skus,
+    get_sheet_snapshot_digests,
+    lock_sheet_snapshot,
+    save_sheet_snapshot,
+)
+from app.sheet_rows import diff_sheet_rows
+
+from . import constants as const
+from .cache import TTLCache
+from .logger import setup_logger
+from .sheet_transform import sheet_pool
+
+logger = logging.getLogger(__name__)
+setup_logger(logger)
+
+# (workbook, sheet) -> (synced_at, digests) of the snapshots this worker read or wrote,
+# so the digests are only read from the database when another worker synced since
+_snapshot_digests = TTLCache(maxsize=4, ttl=const.SHEET_CACHE_TTL)
+
+_next_prune = 0.0
+
+
+def _cell(value) -> str:
+    return "" if value is None else str(value)
+
+
+def _is_logged(change: dict, logged) -> bool:
+    """
+    Returns whether the latest change the routes logged for a SKU already says what
+    the diff found, so a manual edit of the same row is still logged.
+    """
+    if change["operation"] == "delete" or logged.operation == "delete":
+        return change["operation"] == logged.operation
+
+    # The routes log the columns they wrote, the sheet may have more
+    return all(
+        _cell(value) == _cell(change["row"].get(column))
+        for column, value in (logged.row or {}).items()
+    )
+
+
+def sync_sheet_changes(workbook_name: str, sheet_name: str, table: list) -> int:
+    """
+    Logs the rows inserted, updated or deleted in a sheet since its previous sync.
+
+    Called with every table fetched from Google, so the edits made directly in the
+    sheet reach the change feed. The row digests of the previous sync are kept in
+    the database, so the edits made while the service was down are logged by the
+    next sync. A change is skipped when the latest change the routes logged for its
+    SKU since the previous sync holds the same row. The first sync of a sheet only
+    records its digests.
+
+    Returns:
+        int: The number of changes logged.
+    """
+    key = (workbook_name, sheet_name)
+
+    with SessionLocal() as db:
+        # Locks the snapshot, two workers never diff a sheet against the same one
+        snapshot = lock_sheet_snapshot(workbook_name, sheet_name, db)
+
+        cursor, synced_at, previous = 0, None, None
+        if snapshot is not None:
+            cursor, synced_at = snapshot
+            cached = _snapshot_digests.get(key)
+            if cached is not None and cached[0] == synced_at:
+                previous = cached[1]
+            else:
+                previous = get_sheet_snapshot_digests(workbook_name, sheet_name, db)
+
+        digests, changes = sheet_pool.run(diff_sheet_rows, table, previous)
+
+        if changes:
+            # Oldest first, the latest change of every SKU wins
+            latest = {
+                x.sku_id: x
+                for x in get_sheet_changes_of_skus(
+                    workbook_name,
+                    sheet_name,
+                    cursor,
+                    [x["sku_id"] for x in changes],
+                    db,
+                )
+            }
+
+            changes = [
+                x
+                for x in changes
+                if x["sku_id"] not in latest or not _is_logged(x, latest[x["sku_id"]])
+            ]
+            add_sheet_changes(workbook_name, sheet_name, changes, db)
+
+        if digests != previous:
+            _, highest = get_sheet_change_bounds(db)
+            synced_at = save_sheet_snapshot(
+                workbook_name, sheet_name, highest, digests, db
+            )
+
+        db.commit()
+        _snapshot_digests.set(key, (synced_at, digests))
+
+        _prune_if_due(db)
+
+    if changes:
+        logger.info(
+            "Logged %d changes of sheet %s of %s",
+            len(changes),
+            sheet_name,
+            workbook_name,
+        )
+
+    return len(changes)
+
+
+def get_sheet_change_cursor() -> int:
+    """
+    Returns the current cursor of the change feed, the highest id of the version log.
+    """
+    with SessionLocal() as db:
+        _, cursor = get_sheet_change_bounds(db)
+
+    return cursor
+
+
+def _prune_if_due(db) -> None:
+    global _next_prune
+
+    if time.monotonic() < _next_prune:
+        return
+    _next_prune = time.monotonic() + 3600
+
+    cutoff = datetime.now(timezone.utc) - timedelta(
+        days=const.SHEET_CHANGE_RETENTION_DAYS
+    )
+    deleted = delete_sheet_changes_before(cutoff, db)
+    db.commit()
+
+    if deleted:
+        logger.info("Deleted %d sheet changes older than %s", deleted, cutoff)
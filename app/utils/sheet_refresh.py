@@ -0,0 +1,277 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from . import constants as const
+from .logger import setup_logger
+from .metrics import SHEET_CACHE_LOOKUPS, SHEET_REFRESHES
+from .shared_cache import SharedCache
+
+logger = logging.getLogger(__name__)
+setup_logger(logger)
+
+_MISSING = object()
+
+
+class SheetRefresher:
+    """
+    Caches the sheet tables and refreshes the most read ones before they expire.
+
+    Every read through `get_table` bumps a decaying access score of its
+    (workbook, sheet). A background thread refreshes the sheets scoring at least
+    SHEET_REFRESH_MIN_SCORE once their cache entry is within SHEET_REFRESH_AHEAD
+    seconds of expiring, so their readers keep getting warm hits. The cache is a
+    SharedCache, one worker refreshes an entry for the whole host.
+
+    Every table fetched from Google is also handed to the listeners (e.g. the
+    change feed sync), on a separate thread so the reads never wait for them.
+
+    A table is cached with the change feed cursor read just before its fetch, so
+    polling the feed from that cursor misses none of the changes made after it.
+
+    A 429 from the Google APIs, in the foreground or in the background, pauses the
+    refreshes with an exponential back-off, leaving the quota to the client reads.
+
+    Attributes:
+        cache (SharedCache): The cache of the tables and their cursors, keyed by (workbook, sheet).
+        fetcher (Callable | None): Fetches the table of (workbook_name, sheet_name), set by the Sheets routes.
+        cursor_reader (Callable | None): Returns the current change feed cursor, set by the Sheets routes.
+    """
+
+    def __init__(self, cache: SharedCache) -> None:
+        self.cache = cache
+        self.fetcher: Callable[[str, str], list] | None = None
+        self.cursor_reader: Callable[[], int] | None = None
+
+        self._listeners: List[Callable[[str, str, list], None]] = []
+        self._listener_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="sheet-listener"
+        )
+
+        self._scores: dict = {}
+        self._lock = threading.Lock()
+
+        self._backoff = 0.0
+        self._paused_until = 0.0
+
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add_listener(self, listener: Callable[[str, str, list], None]) -> None:
+        """
+        Registers a callback called with (workbook_name, sheet_name, table) after every fetch.
+        """
+        self._listeners.append(listener)
+
+    def clear_listeners(self) -> None:
+        self._listeners.clear()
+
+    def _notify(self, workbook_name: str, sheet_name: str, table: list) -> None:
+        for listener in self._listeners:
+            try:
+                listener(workbook_name, sheet_name, table)
+            except Exception:
+                logger.error(
+                    "Error in a listener of sheet %s of %s",
+                    sheet_name,
+                    workbook_name,
+                    exc_info=True,
+                )
+
+    def _load(
+        self, workbook_name: str, sheet_name: str, fetch: Callable[[], list]
+    ) -> dict:
+        # Read first, the changes made while the table is fetched are after it
+        cursor = None
+        if self.cursor_reader is not None:
+            try:
+                cursor = self.cursor_reader()
+            except Exception:
+                # The table is still served, only without a change feed cursor
+                logger.error("Error when reading the change feed cursor", exc_info=True)
+
+        table = fetch()
+
+        if self._listeners:
+            self._listener_executor.submit(
+                self._notify, workbook_name, sheet_name, table
+            )
+
+        return {"cursor": cursor, "table": table}
+
+    def _decayed(self, score: float, last_time: float, now: float) -> float:
+        return score * 0.5 ** ((now - last_time) / const.SHEET_REFRESH_HALF_LIFE)
+
+    def record_access(self, workbook_name: str, sheet_name: str) -> None:
+        key = (workbook_name, sheet_name)
+        now = time.monotonic()
+
+        with self._lock:
+            score, last_time = self._scores.get(key, (0.0, now))
+            self._scores[key] = (self._decayed(score, last_time, now) + 1, now)
+
+    def hottest(self) -> List[tuple]:
+        """
+        Returns the (workbook, sheet) scoring at least SHEET_REFRESH_MIN_SCORE, hottest first.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            scores = {
+                key: self._decayed(score, last_time, now)
+                for key, (score, last_time) in self._scores.items()
+            }
+
+            # Forget the sheets nobody reads anymore
+            for key, score in scores.items():
+                if score < 0.05:
+                    del self._scores[key]
+
+        hot = [
+            key
+            for key, score in scores.items()
+            if score >= const.SHEET_REFRESH_MIN_SCORE
+        ]
+        return sorted(hot, key=lambda x: scores[x], reverse=True)
+
+    def get_snapshot(
+        self, workbook_name: str, sheet_name: str, fetch: Callable[[], list]
+    ) -> dict:
+        """
+        Returns the cached {"cursor", "table"} of the sheet, or fetches and caches it with fetch().
+        """
+        self.record_access(workbook_name, sheet_name)
+
+        key = (workbook_name, sheet_name)
+        snapshot = self.cache.get(key, _MISSING)
+        if snapshot is not _MISSING:
+            SHEET_CACHE_LOOKUPS.labels("hit").inc()
+            return snapshot
+
+        SHEET_CACHE_LOOKUPS.labels("miss").inc()
+        return self.cache.get_or_set(
+            key, lambda: self._load(workbook_name, sheet_name, fetch)
+        )
+
+    def get_table(
+        self, workbook_name: str, sheet_name: str, fetch: Callable[[], list]
+    ) -> list:
+        """
+        Returns the cached table of the sheet, or fetches and caches it with fetch().
+        """
+        return self.get_snapshot(workbook_name, sheet_name, fetch)["table"]
+
+    def invalidate(self, workbook_name: str, sheet_name: str) -> None:
+        """
+        Drops the cached table of a sheet the app just modified.
+
+        A fetch already in flight in any worker still answers its own request, but
+        its table, read before the change, is not cached.
+        """
+        self.cache.invalidate((workbook_name, sheet_name))
+
+    def record_response(self, response, *args, **kwargs):
+        """
+        A requests response hook pausing the refreshes when the Google quota is exceeded.
+        """
+        if response.status_code == 429:
+            self.note_quota_exceeded()
+
+        return response
+
+    def note_quota_exceeded(self) -> None:
+        with self._lock:
+            self._backoff = min(
+                max(self._backoff * 2, const.SHEET_REFRESH_BACKOFF_MIN),
+                const.SHEET_REFRESH_BACKOFF_MAX,
+            )
+            self._paused_until = time.monotonic() + self._backoff
+
+        logger.warning(
+            "Google quota exceeded, sheet refreshes paused for %ds", self._backoff
+        )
+
+    def refresh_due(self) -> int:
+        """
+        Refreshes the hot sheets whose entry expires soon, returns how many were refreshed.
+        """
+        if self.fetcher is None or time.monotonic() < self._paused_until:
+            return 0
+
+        refreshed = 0
+        for workbook_name, sheet_name in self.hottest():
+            if refreshed >= const.SHEET_REFRESH_MAX_PER_PASS:
+                break
+
+            try:
+                is_refreshed = self.cache.refresh(
+                    (workbook_name, sheet_name),
+                    lambda: self._load(
+                        workbook_name,
+                        sheet_name,
+                        lambda: self.fetcher(workbook_name, sheet_name),
+                    ),
+                    min_remaining=const.SHEET_REFRESH_AHEAD,
+                )
+            except Exception as e:
+                SHEET_REFRESHES.labels("error").inc()
+                if getattr(getattr(e, "response", None), "status_code", None) == 429:
+                    self.note_quota_exceeded()
+                    break
+
+                logger.error(
+                    "Error when refreshing sheet %s of %s",
+                    sheet_name,
+                    workbook_name,
+                    exc_info=True,
+                )
+                continue
+
+            if is_refreshed:
+                SHEET_REFRESHES.labels("success").inc()
+                refreshed += 1
+
+            # Another 429 may have paused the refreshes meanwhile
+            if time.monotonic() < self._paused_until:
+                break
+        else:
+            # A full pass without quota errors relaxes the back-off
+            with self._lock:
+                self._backoff /= 2
+
+        return refreshed
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="sheet-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout=const.SHEET_REFRESH_INTERVAL)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(const.SHEET_REFRESH_INTERVAL):
+            try:
+                self.refresh_due()
+            except Exception:
+                logger.error("Error when refreshing the hot sheets", exc_info=True)
+
+
+sheet_cache = SharedCache(
+    "sheet_table",
+    ttl=const.SHEET_CACHE_TTL,
+    local_maxsize=16,
+    local_ttl=const.SHEET_CACHE_TTL,
+)
+sheet_refresher = SheetRefresher(sheet_cache)
@@ -0,0 +1,77 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable
+
+from app.sheet_rows import _run_in_child
+
+from . import constants as const
+
+
+class SheetPool:
+    """
+    A bounded process pool running the CPU-heavy sheet transformations.
+
+    Building the DataFrames, the row dicts and the JSON bodies of a large sheet
+    holds the GIL for seconds, in the pool it only blocks the calling thread,
+    which waits without holding the GIL. Tables below `min_rows` rows are
+    transformed in the calling thread, the round trip costs more than the work.
+
+    Attributes:
+        max_workers (int): The number of worker processes.
+        min_rows (int): The number of rows from which a table is sent to the pool.
+    """
+
+    def __init__(self, max_workers: int, min_rows: int) -> None:
+        self.max_workers = max_workers
+        self.min_rows = min_rows
+
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Forking a process running the logger and listener threads is unsafe.
+                # The tasks come from the leaf module app.sheet_rows, so a spawned
+                # process does not import the app.utils package to run them
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=const.SHEET_POOL_MAX_TASKS_PER_CHILD,
+                )
+
+            return self._executor
+
+    def run(self, func: Callable, table: list, *args) -> Any:
+        """
+        Returns func(table, *args), computed in the pool for the large tables.
+        """
+        if len(table) < self.min_rows:
+            return func(table, *args)
+
+        kind, result = (
+            self._get_executor().submit(_run_in_child, func, table, *args).result()
+        )
+        if kind == "value":
+            return result
+
+        name, size = result
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            return bytes(block.buf[:size])
+        finally:
+            block.close()
+            block.unlink()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+sheet_pool = SheetPool(
+    max_workers=const.SHEET_POOL_WORKERS, min_rows=const.SHEET_POOL_MIN_ROWS
+)
@@ -0,0 +1,274 @@
+import heapq
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import List
+
+from . import constants as const
+from .files import get_file_digest
+from .logger import setup_logger
+
+logger = logging.getLogger(__name__)
+setup_logger(logger)
+
+PACKAGE_NAME = "main.zip"
+PATCH_DIR_NAME = "patches"
+
+
+def parse_version(version: str) -> tuple:
+    """
+    Turns "4.7.2" into (4, 7, 2) so versions sort numerically.
+    """
+    return tuple(int(x) if x.isdigit() else 0 for x in version.lstrip("v").split("."))
+
+
+def list_versions(data_dir: Path) -> List[str]:
+    """
+    Returns the versions that have a full package in `data_dir`, oldest first.
+    """
+    if not data_dir.exists():
+        return []
+
+    versions = [
+        x.name[1:]
+        for x in data_dir.iterdir()
+        if x.is_dir() and x.name.startswith("v") and (x / PACKAGE_NAME).exists()
+    ]
+    return sorted(versions, key=parse_version)
+
+
+def _file_digest(file_path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with file_path.open("rb") as f:
+        for chunk in iter(lambda: f.read(const.UPLOAD_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def build_patch(old_package: Path, new_package: Path, patch_path: Path) -> dict:
+    """
+    Builds a per-file patch that turns the content of `old_package` into `new_package`.
+
+    Files are compared by CRC-32 and size from the zip directories, so unchanged files
+    are never decompressed. The patch zip holds the added and changed files, and the
+    JSON manifest next to it lists the deleted ones, with the digests of both packages
+    so a patch is only served while they are unchanged.
+
+    Returns:
+        dict: The patch manifest, also written to `patch_path` with a .json suffix.
+    """
+    with zipfile.ZipFile(old_package) as old_zip:
+        old_files = {
+            x.filename: (x.CRC, x.file_size)
+            for x in old_zip.infolist()
+            if not x.is_dir()
+        }
+
+    patch_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(
+        dir=patch_path.parent, prefix=f".{patch_path.name}.", suffix=".tmp"
+    )
+    os.close(fd)
+
+    changed, added = [], []
+    try:
+        with zipfile.ZipFile(new_package) as new_zip, zipfile.ZipFile(
+            tmp_name, "w", compression=zipfile.ZIP_DEFLATED
+        ) as patch_zip:
+            new_names = set()
+            for info in new_zip.infolist():
+                if info.is_dir():
+                    continue
+
+                new_names.add(info.filename)
+                old = old_files.get(info.filename)
+                if old == (info.CRC, info.file_size):
+                    continue
+
+                (changed if old is not None else added).append(info.filename)
+                with new_zip.open(info) as src, patch_zip.open(
+                    info.filename, "w"
+                ) as dst:
+                    shutil.copyfileobj(src, dst, const.UPLOAD_CHUNK_SIZE)
+
+        os.replace(tmp_name, patch_path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+    manifest = {
+        "added": added,
+        "changed": changed,
+        "deleted": sorted(set(old_files) - new_names),
+        "size": patch_path.stat().st_size,
+        "sha256": _file_digest(patch_path),
+        "base_sha256": get_file_digest(old_package),
+        "target_sha256": get_file_digest(new_package),
+    }
+    patch_path.with_suffix(".json").write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=4), encoding="utf-8"
+    )
+
+    return manifest
+
+
+def _build_version_patch(data_dir: Path, base_version: str, version: str) -> bool:
+    patch_path = data_dir / f"v{version}" / PATCH_DIR_NAME / f"from-v{base_version}.zip"
+    try:
+        manifest = build_patch(
+            data_dir / f"v{base_version}" / PACKAGE_NAME,
+            data_dir / f"v{version}" / PACKAGE_NAME,
+            patch_path,
+        )
+    except Exception:
+        logger.error(
+            "Error when building patch v%s -> v%s",
+            base_version,
+            version,
+            exc_info=True,
+        )
+        # Never leave a patch built from another upload of the packages
+        patch_path.unlink(missing_ok=True)
+        patch_path.with_suffix(".json").unlink(missing_ok=True)
+        return False
+
+    logger.info(
+        "Built patch v%s -> v%s: %d added, %d changed, %d deleted, %d bytes",
+        base_version,
+        version,
+        len(manifest["added"]),
+        len(manifest["changed"]),
+        len(manifest["deleted"]),
+        manifest["size"],
+    )
+    return True
+
+
+def build_patches_for_version(data_dir: Path, version: str) -> List[str]:
+    """
+    Builds the patches from the DELTA_MAX_BASE_VERSIONS versions preceding `version`.
+
+    When `version` is uploaded again, the patches the newer versions have from it
+    are rebuilt from its new package.
+
+    Returns:
+        List[str]: The versions a patch was built from.
+    """
+    versions = list_versions(data_dir)
+    older = [x for x in versions if parse_version(x) < parse_version(version)]
+    newer = [x for x in versions if parse_version(x) > parse_version(version)]
+
+    built = [
+        base_version
+        for base_version in older[-const.DELTA_MAX_BASE_VERSIONS :]
+        if _build_version_patch(data_dir, base_version, version)
+    ]
+
+    for newer_version in newer:
+        patch_path = (
+            data_dir / f"v{newer_version}" / PATCH_DIR_NAME / f"from-v{version}.zip"
+        )
+        if patch_path.exists():
+            _build_version_patch(data_dir, version, newer_version)
+
+    return built
+
+
+def _version_edges(data_dir: Path, version: str) -> List[tuple]:
+    """
+    Returns the (base_version, size, manifest) of every patch leading to `version`.
+    """
+    patch_dir = data_dir / f"v{version}" / PATCH_DIR_NAME
+    if not patch_dir.exists():
+        return []
+
+    edges = []
+    for manifest_path in patch_dir.glob("from-v*.json"):
+        if not manifest_path.with_suffix(".zip").exists():
+            continue
+
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        base_version = manifest_path.stem[len("from-v") :]
+
+        # A patch only applies to the exact packages it was built from
+        try:
+            is_current = manifest.get("base_sha256") == get_file_digest(
+                data_dir / f"v{base_version}" / PACKAGE_NAME
+            ) and manifest.get("target_sha256") == get_file_digest(
+                data_dir / f"v{version}" / PACKAGE_NAME
+            )
+        except FileNotFoundError:
+            is_current = False
+
+        if not is_current:
+            logger.debug("Skipping stale patch v%s -> v%s", base_version, version)
+            continue
+
+        edges.append((base_version, manifest["size"], manifest))
+
+    return edges
+
+
+def find_patch_chain(data_dir: Path, current_version: str, target_version: str) -> dict:
+    """
+    Finds the cheapest way, in bytes, to go from `current_version` to `target_version`.
+
+    Versions are the nodes and patches the edges of a graph searched with Dijkstra.
+    When no chain exists or the full package is smaller, the full package is returned.
+
+    Returns:
+        dict: {"type": "none" | "patch" | "full", "size": int, "steps": [...]}
+    """
+    if current_version == target_version:
+        return {"type": "none", "size": 0, "steps": []}
+
+    full_package = data_dir / f"v{target_version}" / PACKAGE_NAME
+    full = {
+        "type": "full",
+        "size": full_package.stat().st_size if full_package.exists() else None,
+        "steps": [{"from": current_version, "to": target_version}],
+    }
+
+    versions = list_versions(data_dir)
+    if current_version not in versions or target_version not in versions:
+        return full
+
+    # Reverse search from the target, following the patches backwards
+    incoming = {x: _version_edges(data_dir, x) for x in versions}
+    distances = {target_version: 0}
+    next_step = {}
+    queue = [(0, target_version)]
+
+    while queue:
+        distance, version = heapq.heappop(queue)
+        if version == current_version:
+            break
+        if distance > distances.get(version, float("inf")):
+            continue
+
+        for base_version, size, manifest in incoming.get(version, []):
+            candidate = distance + size
+            if candidate < distances.get(base_version, float("inf")):
+                distances[base_version] = candidate
+                next_step[base_version] = (version, manifest)
+                heapq.heappush(queue, (candidate, base_version))
+
+    if current_version not in distances:
+        return full
+    if full["size"] is not None and distances[current_version] >= full["size"]:
+        return full
+
+    steps = []
+    version = current_version
+    while version != target_version:
+        to_version, manifest = next_step[version]
+        steps.append({"from": version, "to": to_version, **manifest})
+        version = to_version
+
+    return {"type": "patch", "size": distances[current_version], "steps": steps}
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+
+from . import constants as const
+from .files import get_file_checksums
+from .logger import setup_logger
+from .update_delta import PACKAGE_NAME, parse_version
+
+logger = logging.getLogger(__name__)
+setup_logger(logger)
+
+
+def _encode(content) -> tuple:
+    """
+    Returns the JSON body of `content` and its strong ETag.
+    """
+    body = json.dumps(content, ensure_ascii=False).encode("utf-8")
+    return body, f'"{hashlib.sha256(body).hexdigest()}"'
+
+
+class UpdateManifest:
+    """
+    An in-memory view of the releases of a product under update/{product}/.
+
+    It holds update_info.json, the metadata.json of every version and the size and
+    checksums of every package, with the JSON responses and their ETags encoded once
+    per reload. The poll endpoints answer from here without touching the disk.
+
+    Attributes:
+        product (str): The name of the product, e.g. "aiotts".
+        root (Path): The directory of the product, holding update_info.json and data/.
+        info (dict): The content of update_info.json.
+        versions (dict): A mapping from version to its metadata and package checksums.
+    """
+
+    def __init__(self, product: str, root_dir: str = const.UPDATE_ROOT_DIR) -> None:
+        self.product = product
+        self.root = Path(root_dir) / product
+
+        self.info: dict | None = None
+        self.versions: dict = {}
+        self.responses: dict = {}
+
+        self._signature = None
+        self._lock = threading.Lock()
+
+    @property
+    def info_path(self) -> Path:
+        return self.root / "update_info.json"
+
+    @property
+    def data_dir(self) -> Path:
+        return self.root / "data"
+
+    def version_dir(self, version: str) -> Path:
+        return self.data_dir / f"v{version}"
+
+    def _compute_signature(self) -> tuple:
+        files = [self.info_path]
+        if self.data_dir.exists():
+            for version_dir in self.data_dir.iterdir():
+                files.append(version_dir / PACKAGE_NAME)
+                files.append(version_dir / "metadata.json")
+
+        signature = []
+        for file_path in files:
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+            signature.append((str(file_path), stat.st_size, stat.st_mtime_ns))
+
+        return tuple(sorted(signature))
+
+    def load(self) -> None:
+        """
+        Reads every release of the product from disk and swaps the in-memory snapshot.
+        """
+        with self._lock:
+            signature = self._compute_signature()
+
+            info = json.loads(self.info_path.read_text(encoding="utf-8"))
+
+            versions = {}
+            if self.data_dir.exists():
+                for version_dir in self.data_dir.iterdir():
+                    if not version_dir.is_dir() or not version_dir.name.startswith("v"):
+                        continue
+
+                    version = version_dir.name[1:]
+                    metadata_path = version_dir / "metadata.json"
+                    package_path = version_dir / PACKAGE_NAME
+
+                    try:
+                        metadata = (
+                            json.loads(metadata_path.read_text(encoding="utf-8"))
+                            if metadata_path.exists()
+                            else None
+                        )
+                        checksums = (
+                            get_file_checksums(package_path)
+                            if package_path.exists()
+                            else None
+                        )
+                    except Exception:
+                        logger.error(
+                            "Error when loading %s v%s",
+                            self.product,
+                            version,
+                            exc_info=True,
+                        )
+                        continue
+
+                    versions[version] = {
+                        "version": version,
+                        "metadata": metadata,
+                        "package": checksums,
+                    }
+
+            versions = dict(sorted(versions.items(), key=lambda x: parse_version(x[0])))
+
+            responses = {"info": _encode(info)}
+            responses["manifest"] = _encode(
+                {"product": self.product, "info": info, "versions": versions}
+            )
+            for version, release in versions.items():
+                if release["metadata"] is not None:
+                    responses[f"metadata/{version}"] = _encode(
+                        {
+                            "status": "success",
+                            "message": "File loaded successfully",
+                            "data": release["metadata"],
+                        }
+                    )
+
+            self.info = info
+            self.versions = versions
+            self.responses = responses
+            self._signature = signature
+
+        logger.info(
+            "Loaded %s update manifest: latest %s, %d versions",
+            self.product,
+            info.get("latest"),
+            len(versions),
+        )
+
+    def ensure_loaded(self) -> None:
+        if self.info is None:
+            self.load()
+
+    def reload_if_changed(self) -> bool:
+        if self._signature == self._compute_signature():
+            return False
+
+        self.load()
+        return True
+
+    def response(self, key: str) -> tuple | None:
+        """
+        Returns the precomputed (body, etag) of "info", "manifest" or "metadata/{version}".
+        """
+        self.ensure_loaded()
+        return self.responses.get(key)
+
+    @property
+    def latest_version(self) -> str:
+        self.ensure_loaded()
+        return self.info["latest"]
+
+    def get_release(self, version: str) -> dict | None:
+        self.ensure_loaded()
+        return self.versions.get(version)
+
+
+class ManifestWatcher:
+    """
+    Polls the update directories and reloads the manifests whose files changed.
+    """
+
+    def __init__(self, manifests: dict) -> None:
+        self.manifests = manifests
+
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def reload_all(self) -> None:
+        for manifest in self.manifests.values():
+            try:
+                manifest.reload_if_changed()
+            except Exception:
+                logger.error(
+                    "Error when reloading %s update manifest",
+                    manifest.product,
+                    exc_info=True,
+                )
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="manifest-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout=const.MANIFEST_POLL_INTERVAL)
+            self._thread = None
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(const.MANIFEST_POLL_INTERVAL):
+            self.reload_all()
+
+
+update_manifests = {x: UpdateManifest(x) for x in const.UPDATE_PRODUCTS}
+manifest_watcher = ManifestWatcher(update_manifests)
@@ -0,0 +1,91 @@
+"""
+Concurrent download benchmark of a running server, e.g. 200 clients fetching the installer.
+
+Every client opens its own connection and downloads the file `--requests` times,
+discarding the body. Only the standard library is used.
+
+Usage:
+    python -m benchmarks.concurrent_downloads \\
+        --url "http://localhost:1234/aiotts/installer?file_name=setup.exe" --clients 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def download(host: str, port: int, target: str) -> int:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f"GET {target} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode()
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if b" 200 " not in status_line and b" 206 " not in status_line:
+            raise RuntimeError(status_line.decode(errors="replace").strip())
+
+        # Skip the headers, then count the body until the server closes
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass
+
+        size = 0
+        while chunk := await reader.read(1024 * 1024):
+            size += len(chunk)
+
+        return size
+    finally:
+        writer.close()
+
+
+async def client(host: str, port: int, target: str, requests: int, results: list):
+    for _ in range(requests):
+        start = time.perf_counter()
+        try:
+            size = await download(host, port, target)
+        except Exception as e:
+            results.append((None, str(e)))
+            continue
+        results.append((time.perf_counter() - start, size))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=1, help="Per client")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    target = url.path + (f"?{url.query}" if url.query else "")
+    results: list = []
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[
+            client(url.hostname, url.port or 80, target, args.requests, results)
+            for _ in range(args.clients)
+        ]
+    )
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(x[0] for x in results if x[0] is not None)
+    errors = [x[1] for x in results if x[0] is None]
+    total_bytes = sum(x[1] for x in results if x[0] is not None)
+
+    print(f"clients={args.clients} downloads={len(latencies)} errors={len(errors)}")
+    print(f"elapsed: {elapsed:.2f} s")
+    print(f"throughput: {total_bytes / elapsed / 1024 / 1024:,.1f} MiB/s")
+    if latencies:
+        print(f"latency p50: {statistics.median(latencies):.3f} s")
+        print(f"latency p95: {latencies[int(len(latencies) * 0.95) - 1]:.3f} s")
+        print(f"latency max: {latencies[-1]:.3f} s")
+    if errors:
+        print(f"first error: {errors[0]}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
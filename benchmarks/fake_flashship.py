@@ -0,0 +1,99 @@
+"""
+A local stub of the FlashShip seller API, for running the FlashShip routes offline.
+
+It serves the endpoints used by FlashShipClient (token, shirt-add, order details,
+seller-reject) with a configurable latency, and counts the calls it receives. Every
+order gets a status derived from its code, a `--terminal` share of them finished.
+
+Usage:
+    python -m benchmarks.fake_flashship --port 9100 --latency 0.05
+    DEV_FLASHSHIP_ENDPOINT=http://127.0.0.1:9100 python server.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+from collections import Counter
+
+from fastapi import FastAPI, Request
+from starlette.responses import JSONResponse
+
+IN_FLIGHT_STATUSES = ["PENDING", "PROCESSING", "SHIPPED"]
+TERMINAL_STATUSES = ["DELIVERED", "CANCELLED"]
+
+
+def make_fake_flashship(latency: float = 0.05, terminal: float = 0.5) -> FastAPI:
+    """
+    Returns the stub app. Its `state.calls` counts the calls per endpoint.
+    """
+    app = FastAPI()
+    app.state.calls = Counter()
+
+    def order_status(order_code: str) -> str:
+        digest = hashlib.sha256(order_code.encode("utf-8")).digest()
+        if digest[0] / 256 < terminal:
+            return TERMINAL_STATUSES[digest[1] % len(TERMINAL_STATUSES)]
+        return IN_FLIGHT_STATUSES[digest[1] % len(IN_FLIGHT_STATUSES)]
+
+    @app.post("/seller-api-v2/token")
+    async def token(request: Request):
+        app.state.calls["token"] += 1
+        await asyncio.sleep(latency)
+
+        body = await request.json()
+        return {
+            "msg": "success",
+            "data": {"access_token": f"token-{body.get('username')}"},
+        }
+
+    @app.post("/seller-api-v2/orders/shirt-add")
+    async def create_order(request: Request):
+        app.state.calls["create"] += 1
+        await asyncio.sleep(latency)
+
+        body = await request.json()
+        return {"msg": "success", "data": {"order_code": f"FS-{body['order_id']}"}}
+
+    @app.post("/seller-api-v2/orders/seller-reject")
+    async def cancel_order(request: Request):
+        app.state.calls["cancel"] += 1
+        await asyncio.sleep(latency)
+
+        body = await request.json()
+        return {"msg": "success", "data": body.get("order_code_list", [])}
+
+    @app.get("/seller-api-v2/orders/{order_code}")
+    async def get_order(order_code: str, request: Request):
+        app.state.calls["details"] += 1
+        await asyncio.sleep(latency)
+
+        if not request.headers.get("authorization", "").startswith("Bearer "):
+            return JSONResponse({"msg": "fail", "error": "Unauthorized"}, 401)
+
+        return {
+            "msg": "success",
+            "data": {"order_code": order_code, "status": order_status(order_code)},
+        }
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--terminal", type=float, default=0.5)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        make_fake_flashship(args.latency, args.terminal),
+        host=args.host,
+        port=args.port,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+An in-process double of the gspread client, for running the Sheets routes offline.
+
+It implements the part of the gspread API used by GoogleSheetWorker (open, worksheet,
+get, get_all_records, batch_format, batch_update, delete_row and the deleteDimension
+requests of Spreadsheet.batch_update) over in-memory tables,
+with a configurable latency per API call and a per-minute quota like the real API.
+
+Usage:
+    client = FakeSheetsClient(latency=0.05, quota_per_minute=300)
+    client.add_sheet("Workbook", "PHONGKD_1", make_design_rows(10_000))
+    GoogleSheetWorker.client_factory = lambda: client
+"""
+
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+
+HEADER = [
+    "SKU",
+    "Product Name",
+    "Variation",
+    "Image 1 (front)",
+    "Image 2 (back)",
+    "Mockup Front",
+    "Mockup Back",
+    "Mockup (For Onos)",
+    "Image front (Beefun)",
+    "Image back (Beefun)",
+    "Created at",
+    "User",
+]
+
+
+class FakeQuotaExceeded(Exception):
+    """
+    Raised like the 429 of the real API when the per-minute quota is exhausted.
+    """
+
+
+def make_design_rows(count: int, seller_name: str = "seller") -> list:
+    """
+    Returns a header row followed by `count` design rows shaped like the real sheets.
+    """
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = [list(HEADER)]
+    for i in range(count):
+        sku = f"17{i:017d}"
+        rows.append(
+            [
+                sku,
+                f"Product {i}",
+                f"SKU-{i % 500}; Black; T-Shirt; XL",
+                *[f"https://example.com/{sku}/{n}.png" for n in range(7)],
+                created_at,
+                seller_name,
+            ]
+        )
+    return rows
+
+
+def _column_index(letters: str) -> int:
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + ord(char) - ord("A") + 1
+    return index - 1
+
+
+def _parse_a1(cell_range: str) -> tuple:
+    """
+    Parses "A1:J200000" into zero-based (first_row, last_row, first_col, last_col).
+    """
+    match = re.fullmatch(r"([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?", cell_range.upper())
+    if match is None:
+        raise ValueError(f"Unsupported range: {cell_range}")
+
+    first_col, first_row, last_col, last_row = match.groups()
+    last_col = last_col or first_col
+    last_row = last_row or first_row
+
+    return (
+        int(first_row) - 1,
+        int(last_row) - 1,
+        _column_index(first_col),
+        _column_index(last_col),
+    )
+
+
+class FakeSheetsClient:
+    """
+    Holds every fake workbook and applies the latency and the quota to each API call.
+
+    Attributes:
+        latency (float): Seconds slept by every API call.
+        quota_per_minute (int | None): Maximum API calls per rolling minute, None for unlimited.
+        calls (dict): The number of calls made per operation.
+    """
+
+    def __init__(self, latency: float = 0.0, quota_per_minute: int | None = None):
+        self.latency = latency
+        self.quota_per_minute = quota_per_minute
+        self.calls: dict = {}
+
+        self._workbooks: dict = {}
+        self._call_times: deque = deque()
+        self._lock = threading.Lock()
+
+    def add_sheet(self, workbook_name: str, sheet_name: str, rows: list) -> None:
+        self._workbooks.setdefault(workbook_name, {})[sheet_name] = FakeWorksheet(
+            self, sheet_name, rows
+        )
+
+    def api_call(self, operation: str) -> None:
+        with self._lock:
+            now = time.monotonic()
+            while self._call_times and now - self._call_times[0] > 60:
+                self._call_times.popleft()
+
+            if (
+                self.quota_per_minute is not None
+                and len(self._call_times) >= self.quota_per_minute
+            ):
+                raise FakeQuotaExceeded(f"Quota exceeded for {operation}")
+
+            self._call_times.append(now)
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+    def open(self, workbook_name: str) -> "FakeSpreadsheet":
+        self.api_call("drive.files")
+        if workbook_name not in self._workbooks:
+            raise KeyError(f"Spreadsheet not found: {workbook_name}")
+        return FakeSpreadsheet(self, self._workbooks[workbook_name])
+
+
+class FakeSpreadsheet:
+    def __init__(self, client: FakeSheetsClient, sheets: dict) -> None:
+        self.client = client
+        self.sheets = sheets
+
+    def worksheet(self, sheet_name: str) -> "FakeWorksheet":
+        self.client.api_call("spreadsheets.get")
+        if sheet_name not in self.sheets:
+            raise KeyError(f"Worksheet not found: {sheet_name}")
+
+        sheet = self.sheets[sheet_name]
+        sheet.spreadsheet = self
+        return sheet
+
+    def batch_update(self, body: dict) -> None:
+        """
+        Applies the deleteDimension requests of the body in order, the others are ignored.
+        """
+        self.client.api_call("batchUpdate")
+
+        sheets = {x.id: x for x in self.sheets.values()}
+        for request in body["requests"]:
+            if "deleteDimension" not in request:
+                continue
+
+            dimension_range = request["deleteDimension"]["range"]
+            sheet = sheets[dimension_range["sheetId"]]
+            with sheet._lock:
+                del sheet.rows[
+                    dimension_range["startIndex"] : dimension_range["endIndex"]
+                ]
+
+
+class FakeWorksheet:
+    def __init__(self, client: FakeSheetsClient, title: str, rows: list) -> None:
+        self.client = client
+        self.title = title
+        self.id = zlib.crc32(title.encode("utf-8"))
+        self.spreadsheet: FakeSpreadsheet | None = None
+        self.rows = [list(x) for x in rows]
+        self.formats: dict = {}
+        self._lock = threading.Lock()
+
+    def _read(self, cell_range: str) -> list:
+        """
+        Like the API reads: trailing empty rows and cells are not returned.
+        """
+        first_row, last_row, first_col, last_col = _parse_a1(cell_range)
+
+        with self._lock:
+            result = []
+            for row in self.rows[first_row : last_row + 1]:
+                values = [str(x) for x in row[first_col : last_col + 1]]
+                while values and values[-1] == "":
+                    values.pop()
+                result.append(values)
+
+        while result and not result[-1]:
+            result.pop()
+        return result
+
+    def get(self, cell_range: str) -> list:
+        self.client.api_call("values.get")
+        return self._read(cell_range)
+
+    def batch_get(self, ranges: list) -> list:
+        """
+        Like values.batchGet: one call, the result of a get per range.
+        """
+        self.client.api_call("values.batchGet")
+        return [self._read(x) for x in ranges]
+
+    def get_all_records(self) -> list:
+        self.client.api_call("values.get")
+
+        with self._lock:
+            header, *rows = self.rows
+            return [dict(zip(header, x)) for x in rows]
+
+    def batch_format(self, formats: list) -> None:
+        self.client.api_call("batchUpdate")
+        for item in formats:
+            self.formats[item["range"]] = item["format"]
+
+    def batch_update(self, data: list) -> None:
+        self.client.api_call("values.batchUpdate")
+
+        with self._lock:
+            for item in data:
+                first_row, _, first_col, _ = _parse_a1(item["range"])
+                for offset, values in enumerate(item["values"]):
+                    row_index = first_row + offset
+                    while len(self.rows) <= row_index:
+                        self.rows.append([])
+
+                    row = self.rows[row_index]
+                    if len(row) < first_col + len(values):
+                        row.extend([""] * (first_col + len(values) - len(row)))
+                    row[first_col : first_col + len(values)] = [
+                        "" if x is None else x for x in values
+                    ]
+
+    def delete_row(self, index: int) -> None:
+        self.client.api_call("batchUpdate")
+
+        with self._lock:
+            del self.rows[index - 1]
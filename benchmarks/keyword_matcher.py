@@ -0,0 +1,80 @@
+"""
+Throughput benchmark of the FulfilmentChinaSetting keyword matcher.
+
+Compares the compiled KeywordMatcher against the naive loop over every keyword.
+
+Usage:
+    python -m benchmarks.keyword_matcher --titles 10000 --keywords 2000
+"""
+
+import argparse
+import os
+import random
+import string
+import time
+
+# app.utils builds the database engine at import, no connection is opened
+for key, value in {
+    "DB_USER": "bench",
+    "DB_PASSWORD": "bench",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "bench",
+}.items():
+    os.environ.setdefault(key, value)
+
+from app.utils.keyword_matcher import KeywordMatcher  # noqa: E402
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+
+
+def naive_classify(title: str, tier_1: list, tier_2: list) -> int | None:
+    title = title.lower()
+    for keyword in tier_1:
+        if keyword in title:
+            return 1
+    for keyword in tier_2:
+        if keyword in title:
+            return 2
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--titles", type=int, default=10_000)
+    parser.add_argument("--keywords", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keywords = list({random_word(rng) for _ in range(args.keywords)})
+    tier_1, tier_2 = keywords[: len(keywords) // 2], keywords[len(keywords) // 2 :]
+    vocabulary = [random_word(rng) for _ in range(5_000)] + keywords[:50]
+    titles = [" ".join(rng.choices(vocabulary, k=12)) for _ in range(args.titles)]
+
+    matcher = KeywordMatcher()
+    start = time.perf_counter()
+    matcher.compile(tier_1, tier_2)
+    compile_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled_results = [x["tier"] for x in matcher.classify_many(titles)]
+    compiled_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    naive_results = [naive_classify(x, tier_1, tier_2) for x in titles]
+    naive_time = time.perf_counter() - start
+
+    mismatches = sum(a != b for a, b in zip(compiled_results, naive_results))
+
+    print(f"titles={len(titles)} keywords={len(keywords)}")
+    print(f"compile:  {compile_time * 1000:.1f} ms")
+    print(f"compiled: {len(titles) / compiled_time:,.0f} titles/s")
+    print(f"naive:    {len(titles) / naive_time:,.0f} titles/s")
+    print(f"mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
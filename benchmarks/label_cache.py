@@ -0,0 +1,84 @@
+"""
+Latency benchmark of the label batch lookup cache.
+
+Resolves batches of LABEL_BATCH_MAX_SIZE tracking ids, all of them cached, from the
+per-worker LRU (TTLCache) and from the shared tier on tmpfs (SharedCache) that the
+labels used before. Once the shared tier's short local front cache has expired,
+every id of a batch costs an open, a read and a JSON parse.
+
+Usage:
+    python -m benchmarks.label_cache --labels 100000 --batches 200
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+# app.utils builds the database engine at import, no connection is opened
+for key, value in {
+    "DB_USER": "bench",
+    "DB_PASSWORD": "bench",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "bench",
+}.items():
+    os.environ.setdefault(key, value)
+os.environ.setdefault("SHARED_CACHE_DIR", tempfile.mkdtemp(prefix="bench-cache-"))
+
+from app.utils import SharedCache, TTLCache, const  # noqa: E402
+
+
+def make_label(rng: random.Random) -> dict:
+    return {
+        "carrier": rng.choice(["USPS", "UPS", "FedEx"]),
+        "weight": round(rng.uniform(0.1, 5), 2),
+        "items": [{"sku": f"SKU{rng.randint(0, 99999):05d}"} for _ in range(3)],
+    }
+
+
+def measure(cache, batches: list) -> list:
+    timings = []
+    for batch in batches:
+        start = time.perf_counter()
+        result = cache.get_many(batch)
+        timings.append(time.perf_counter() - start)
+        assert len(result) == len(batch)
+
+    return sorted(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labels", type=int, default=100_000)
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=const.LABEL_BATCH_MAX_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    labels = {f"TRK{i:010d}": make_label(rng) for i in range(args.labels)}
+    tracking_ids = list(labels)
+    batches = [rng.sample(tracking_ids, args.batch_size) for _ in range(args.batches)]
+
+    lru = TTLCache(maxsize=const.LABEL_CACHE_SIZE, ttl=const.LABEL_CACHE_TTL)
+    # No local front cache, as seen by the workers that did not set the entries
+    shared = SharedCache("label-bench", ttl=const.LABEL_CACHE_TTL, local_ttl=0)
+    for tracking_id, label in labels.items():
+        lru.set(tracking_id, label)
+        shared.set(tracking_id, label)
+
+    print(f"{args.batches} batches of {args.batch_size} cached tracking ids")
+    for name, cache in [("SharedCache (before)", shared), ("TTLCache (after)", lru)]:
+        timings = measure(cache, batches)
+        print(
+            f"  {name:22s} p50 {timings[len(timings) // 2] * 1000:8.2f} ms"
+            f"  p99 {timings[int(len(timings) * 0.99)] * 1000:8.2f} ms"
+        )
+
+    shared.clear()
+
+
+if __name__ == "__main__":
+    main()
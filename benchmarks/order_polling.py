@@ -0,0 +1,89 @@
+"""
+Benchmark of the batched FlashShip order status polling, against the local stub.
+
+The stub (benchmarks/fake_flashship.py) is served by uvicorn on a local port, so the
+pooled client makes real HTTP calls, and the app is called in-process through ASGI.
+Every round polls the same order codes, as the tooling does, and reports how many
+calls reached the stub.
+
+Usage:
+    python -m benchmarks.order_polling --orders 2000 --rounds 5 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+PORT = 0
+with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    PORT = s.getsockname()[1]
+
+os.environ.setdefault("DEV_FLASHSHIP_ENDPOINT", f"http://127.0.0.1:{PORT}")
+# A fresh cache, so the first round always reaches the stub
+os.environ.setdefault("SHARED_CACHE_DIR", tempfile.mkdtemp(prefix="bench-cache-"))
+
+from .fake_flashship import make_fake_flashship  # noqa: E402
+from .routes import call  # noqa: E402
+
+
+def serve_stub(latency: float, terminal: float):
+    import uvicorn
+
+    stub = make_fake_flashship(latency, terminal)
+    server = uvicorn.Server(
+        uvicorn.Config(stub, host="127.0.0.1", port=PORT, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+
+    while not server.started:
+        time.sleep(0.05)
+
+    return stub, server
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--duplicates", type=float, default=0.1)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="Per stub call")
+    parser.add_argument("--terminal", type=float, default=0.5)
+    args = parser.parse_args()
+
+    stub, server = serve_stub(args.latency, args.terminal)
+
+    order_codes = [f"FS{i:08d}" for i in range(args.orders)]
+    order_codes += order_codes[: int(args.orders * args.duplicates)]
+    body = {"api_key": "bench", "access_token": "bench", "order_codes": order_codes}
+
+    print(
+        f"{len(order_codes)} order codes ({args.orders} unique),"
+        f" {args.latency * 1000:.0f} ms per FlashShip call"
+    )
+    try:
+        for i in range(args.rounds):
+            calls = stub.state.calls["details"]
+            start = time.perf_counter()
+            status, content = await call(
+                "POST", "/aiotts/flashship/order/details/batch", {"mode": "dev"}, body
+            )
+            elapsed = time.perf_counter() - start
+
+            failed = json.loads(content)["failed"] if status == 200 else "-"
+            print(
+                f"  round {i + 1}: {elapsed * 1000:8.1f} ms  status {status}"
+                f"  failed {failed}"
+                f"  upstream calls {stub.state.calls['details'] - calls}"
+            )
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
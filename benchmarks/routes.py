@@ -0,0 +1,264 @@
+"""
+Offline benchmark of the API routes, with the Sheets routes served by FakeSheetsClient.
+
+The app is called in-process through ASGI, so neither Google credentials nor a network
+are needed. The routes backed by Postgres (auth, label) only run with --with-db and a
+database configured in .env.
+
+Usage:
+    python -m benchmarks.routes --rows 1000,10000,200000 --latency 0.05 --requests 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from urllib.parse import urlencode
+
+for key, value in {
+    "MODE": "development",
+    "DB_USER": "bench",
+    "DB_PASSWORD": "bench",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "bench",
+}.items():
+    os.environ.setdefault(key, value)
+
+from app.api.routes import fulfilment, google_sheet  # noqa: E402
+from app.api.routes.google_sheet import GoogleSheetWorker  # noqa: E402
+from app.main import app  # noqa: E402
+from app.utils import settings_store, sheet_refresher, update_manifests  # noqa: E402
+
+from .fake_sheets import FakeSheetsClient, make_design_rows  # noqa: E402
+
+WORKBOOK = "Bench Workbook"
+
+
+async def call(method: str, path: str, query: dict | None = None, body=None) -> tuple:
+    """
+    Sends one request to the app through ASGI, returns (status, body bytes).
+    """
+    payload = b"" if body is None else json.dumps(body).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(query or {}).encode(),
+        "headers": [
+            (b"host", b"bench"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.sleep(3600)
+        received = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    status = 0
+    chunks = []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+async def run_scenario(name: str, make_request, requests: int, concurrency: int):
+    latencies = []
+    statuses = {}
+    sizes = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            status, body = await make_request(i)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            sizes.append(len(body))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(requests)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    print(
+        f"  {name:<28} {requests / elapsed:8.1f} req/s"
+        f"  p50 {statistics.median(latencies) * 1000:8.1f} ms"
+        f"  p95 {p95 * 1000:8.1f} ms"
+        f"  {statistics.mean(sizes) / 1024:9.1f} KiB  status {statuses}"
+    )
+
+
+def sheet_scenarios(sheet_name: str, records_sheet_name: str, rows: int) -> list:
+    sku_ids = [f"17{i:017d}" for i in range(0, rows, max(rows // 100, 1))]
+    query = {"workbook_name": WORKBOOK, "sheet_name": sheet_name}
+
+    # move-down reads the "User" column, outside the A:J range of the PHONGKD sheets
+    records_query = {"workbook_name": WORKBOOK, "sheet_name": records_sheet_name}
+
+    def new_skus(i: int) -> list:
+        return [
+            {
+                "sku_id": f"99{i:08d}{n:03d}",
+                "color": "Black",
+                "product_type": "T-Shirt",
+                "size": "XL",
+                "seller_sku": f"SKU-{i}",
+                "product_name": f"Bench product {i}",
+            }
+            for n in range(10)
+        ]
+
+    return [
+        (
+            "GET /design/read",
+            lambda i: call("GET", "/aiotts/order/design/read", query),
+        ),
+        (
+            "POST /design/sku/search",
+            lambda i: call("POST", "/aiotts/order/design/sku/search", query, sku_ids),
+        ),
+        (
+            "POST /design/sku/insert",
+            lambda i: call(
+                "POST",
+                "/aiotts/order/design/sku/insert",
+                {**query, "seller_name": "bench"},
+                new_skus(i),
+            ),
+        ),
+        (
+            "POST /design/sku/move-down",
+            lambda i: call(
+                "POST",
+                "/aiotts/order/design/sku/move-down",
+                records_query,
+                sku_ids[i % len(sku_ids) : i % len(sku_ids) + 5],
+            ),
+        ),
+    ]
+
+
+def static_scenarios() -> list:
+    return [
+        ("GET /update/info", lambda i: call("GET", "/aiotts/update/info")),
+        ("GET /update/manifest", lambda i: call("GET", "/aiotts/update/manifest")),
+        (
+            "GET /update/download/metadata",
+            lambda i: call(
+                "GET",
+                "/aiotts/update/download/metadata",
+                {"version": latest_aiotts_version()},
+            ),
+        ),
+        (
+            "POST /update/check",
+            lambda i: call("POST", "/update/check", body={"aiotts": "4.0.1"}),
+        ),
+        (
+            "POST /fulfilment-china/classify",
+            lambda i: call(
+                "POST",
+                "/aiotts/fulfilment-china/classify",
+                body=[f"Black cotton t-shirt {n}" for n in range(1000)],
+            ),
+        ),
+    ]
+
+
+def db_scenarios() -> list:
+    return [
+        (
+            "GET /auth/search/uuid",
+            lambda i: call("GET", "/aiotts/auth/search/uuid", {"value": f"bench-{i}"}),
+        ),
+        (
+            "GET /auth/search/user",
+            lambda i: call(
+                "GET", "/aiotts/auth/search/user", {"email": f"bench-{i}@example.com"}
+            ),
+        ),
+        (
+            "GET /label/search/{id}",
+            lambda i: call("GET", f"/aiotts/label/search/bench-{i}"),
+        ),
+        (
+            "POST /label/search",
+            lambda i: call(
+                "POST", "/aiotts/label/search", body=[f"bench-{n}" for n in range(500)]
+            ),
+        ),
+    ]
+
+
+def latest_aiotts_version() -> str:
+    return update_manifests["aiotts"].latest_version
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="1000,10000,200000")
+    parser.add_argument("--latency", type=float, default=0.05, help="Per Sheets call")
+    parser.add_argument("--quota", type=int, default=None, help="Sheets calls/minute")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--with-db", action="store_true")
+    args = parser.parse_args()
+
+    # Keywords for the classification route, normally loaded from Postgres
+    settings_store.tier_1_keywords = ["t-shirt", "hoodie", "sweatshirt"]
+    settings_store.tier_2_keywords = ["mug", "poster"]
+    settings_store.version = 1
+    fulfilment.recompile_keywords(settings_store)
+
+    print("Static routes")
+    for name, make_request in static_scenarios():
+        await run_scenario(name, make_request, args.requests, args.concurrency)
+
+    if args.with_db:
+        print("Database routes")
+        for name, make_request in db_scenarios():
+            await run_scenario(name, make_request, args.requests, args.concurrency)
+
+    if not args.with_db:
+        # The change feed lives in Postgres: no cursor, sync or version log offline
+        sheet_refresher.cursor_reader = lambda: 0
+        sheet_refresher.clear_listeners()
+        google_sheet.log_sheet_changes = lambda *args: None
+
+    for rows in [int(x) for x in args.rows.split(",")]:
+        client = FakeSheetsClient(latency=args.latency, quota_per_minute=args.quota)
+        client.add_sheet(WORKBOOK, "PHONGKD_BENCH", make_design_rows(rows))
+        client.add_sheet(WORKBOOK, "BENCH", make_design_rows(rows))
+        GoogleSheetWorker.client_factory = lambda: client
+
+        print(f"Sheets routes, {rows} rows, {args.latency * 1000:.0f} ms per API call")
+        for name, make_request in sheet_scenarios("PHONGKD_BENCH", "BENCH", rows):
+            await run_scenario(name, make_request, args.requests, args.concurrency)
+        print(f"  API calls: {client.calls}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
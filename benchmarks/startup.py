@@ -0,0 +1,117 @@
+"""
+Cold start benchmark: import-time profile of app.main and time to the first served request.
+
+Usage:
+    python -m benchmarks.startup --target-ms 300
+"""
+
+import argparse
+import http.client
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ["pandas", "polars", "gspread", "oauth2client", "pyarrow"]
+
+
+def profile_imports(top: int) -> None:
+    """
+    Runs `python -X importtime -c "import app.main"` and prints the slowest imports.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise SystemExit("import app.main failed")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            imports.append((int(match.group(2)), len(match.group(3)), match.group(4)))
+
+    # Top level imports (least indented) carry the cumulative time of everything below
+    total = sum(x[0] for x in imports if x[1] == min(y[1] for y in imports))
+    print(f"import app.main: {total / 1000:.1f} ms cumulative")
+    for cumulative, _, name in sorted(imports, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    loaded_heavy = sorted({x[2].split(".")[0] for x in imports} & set(HEAVY_MODULES))
+    print(f"heavy modules loaded at import: {loaded_heavy or 'none'}")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_request(path: str, timeout: float) -> float:
+    """
+    Starts uvicorn and returns the seconds until `path` first answers with a 200.
+    """
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env={**os.environ},
+    )
+
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                connection.request("GET", path)
+                if connection.getresponse().status == 200:
+                    return time.perf_counter() - start
+            except OSError:
+                pass
+            time.sleep(0.005)
+
+        raise SystemExit(f"No 200 from {path} within {timeout} s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target-ms", type=float, default=300)
+    parser.add_argument("--path", default="/aiotts/update/info")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    profile_imports(args.top)
+
+    timings = sorted(
+        time_to_first_request(args.path, timeout=30) for _ in range(args.runs)
+    )
+    median = timings[len(timings) // 2] * 1000
+
+    print(f"time to first request (median of {args.runs}): {median:.0f} ms")
+    print(
+        f"target {args.target_ms:.0f} ms: {'PASS' if median <= args.target_ms else 'FAIL'}"
+    )
+
+    if median > args.target_ms:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# Production profile: gunicorn -c gunicorn.conf.py app.main:app
+import multiprocessing
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+bind = f"0.0.0.0:{os.getenv('PORT', '1234')}"
+
+# One worker per core, the Sheets and DataFrame work is CPU bound
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count())
+
+# uvicorn[standard] installs uvloop and httptools, which the worker picks automatically
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Long Sheets calls and uploads, restart workers now and then to bound memory growth
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+max_requests = 5000
+max_requests_jitter = 500
+
+# The workers share their caches through SharedCache and their metrics through
+# this directory, and must not rotate the same log file
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/aiotts-prometheus")
+os.environ.setdefault("LOG_FILE_PER_PROCESS", "1")
+
+
+def on_starting(server):
+    # Samples left by a previous run would be added to the new ones
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
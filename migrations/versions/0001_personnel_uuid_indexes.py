@@ -0,0 +1,106 @@
+"""Unique lower(email) index on personnel and unique uuid.value
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+
+import logging
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def _drop_invalid_index(name: str) -> None:
+    # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind, that would
+    # never be used nor enforce uniqueness
+    is_invalid = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ),
+            {"name": name},
+        )
+        .scalar()
+    )
+    if is_invalid:
+        logger.warning("Dropping the invalid index %s left by a failed build", name)
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # Personnel rows can not be merged automatically, they must be fixed by hand
+    duplicated_emails = bind.execute(sa.text("""
+        SELECT lower(email), array_agg(personnel_id ORDER BY personnel_id)
+        FROM personnel
+        WHERE email IS NOT NULL
+        GROUP BY lower(email)
+        HAVING count(*) > 1
+        """)).all()
+    if duplicated_emails:
+        raise RuntimeError(
+            "Duplicate personnel emails, fix them before upgrading: "
+            + ", ".join(f"{email} (ids {ids})" for email, ids in duplicated_emails)
+        )
+
+    duplicated_uuids = bind.execute(sa.text("""
+        SELECT value, array_agg(id ORDER BY id)
+        FROM uuid
+        GROUP BY value
+        HAVING count(*) > 1
+        """)).all()
+    if duplicated_uuids:
+        # Keep the oldest row of every duplicated uuid, a copy of the others is kept
+        op.execute("""
+            CREATE TABLE IF NOT EXISTS uuid_duplicate_backup
+            (LIKE uuid INCLUDING DEFAULTS, deleted_at TIMESTAMPTZ DEFAULT now())
+            """)
+        op.execute("""
+            WITH deleted AS (
+                DELETE FROM uuid a
+                USING uuid b
+                WHERE a.value = b.value AND a.id > b.id
+                RETURNING a.*
+            )
+            INSERT INTO uuid_duplicate_backup SELECT * FROM deleted
+            """)
+        for value, ids in duplicated_uuids:
+            logger.warning(
+                "Deleted duplicate uuid %s: kept id %s, moved ids %s to "
+                "uuid_duplicate_backup",
+                value,
+                ids[0],
+                ids[1:],
+            )
+
+    # CONCURRENTLY can not run inside a transaction, and keeps the tables writable
+    with op.get_context().autocommit_block():
+        # The former non-unique index has the same name
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_uuid_value")
+        op.execute("CREATE UNIQUE INDEX CONCURRENTLY ix_uuid_value ON uuid (value)")
+
+        _drop_invalid_index("ix_personnel_email_lower")
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY ix_personnel_email_lower "
+            "ON personnel (lower(email))"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_personnel_email_lower")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_uuid_value")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_uuid_value ON uuid (value)"
+        )
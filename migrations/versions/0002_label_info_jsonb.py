@@ -0,0 +1,27 @@
+"""Store label_info.scanned_info as JSONB
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE label_info "
+        "ALTER COLUMN scanned_info TYPE JSONB USING scanned_info::jsonb"
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "ALTER TABLE label_info "
+        "ALTER COLUMN scanned_info TYPE JSON USING scanned_info::json"
+    )
@@ -0,0 +1,63 @@
+"""Settings schema and change notifications
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE SCHEMA IF NOT EXISTS settings")
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS settings.update_info (
+            id SERIAL PRIMARY KEY,
+            version VARCHAR,
+            md5_checksum VARCHAR,
+            is_required BOOLEAN,
+            is_active BOOLEAN
+        )
+        """)
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_settings_update_info_version "
+        "ON settings.update_info (version)"
+    )
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS settings.fulfilment_china (
+            id SERIAL PRIMARY KEY,
+            tier_1_keywords JSON,
+            tier_2_keywords JSON
+        )
+        """)
+    # Older databases created the table without a key column
+    op.execute(
+        "ALTER TABLE settings.fulfilment_china ADD COLUMN IF NOT EXISTS id SERIAL"
+    )
+
+    # Publish every change on the channel the settings store listens to
+    op.execute("""
+        CREATE OR REPLACE FUNCTION settings.notify_settings_changed() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('settings_changed', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """)
+    for table in ("update_info", "fulfilment_china"):
+        op.execute(f"""
+            CREATE OR REPLACE TRIGGER {table}_notify_changed
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON settings.{table}
+            FOR EACH STATEMENT EXECUTE FUNCTION settings.notify_settings_changed()
+            """)
+
+
+def downgrade() -> None:
+    for table in ("update_info", "fulfilment_china"):
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_notify_changed ON settings.{table}")
+    op.execute("DROP FUNCTION IF EXISTS settings.notify_settings_changed()")
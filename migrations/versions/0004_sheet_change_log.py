@@ -0,0 +1,39 @@
+"""Version log of the design sheets
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS sheet_change (
+            id BIGSERIAL PRIMARY KEY,
+            workbook_name VARCHAR NOT NULL,
+            sheet_name VARCHAR NOT NULL,
+            sku_id VARCHAR NOT NULL,
+            operation VARCHAR NOT NULL,
+            row JSONB,
+            changed_at TIMESTAMPTZ DEFAULT now()
+        )
+        """)
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_sheet_change_sheet_id "
+        "ON sheet_change (workbook_name, sheet_name, id)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_sheet_change_changed_at "
+        "ON sheet_change (changed_at)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS sheet_change")
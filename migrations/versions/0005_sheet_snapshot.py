@@ -0,0 +1,30 @@
+"""Row digests of the last sync of the design sheets
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS sheet_snapshot (
+            workbook_name VARCHAR NOT NULL,
+            sheet_name VARCHAR NOT NULL,
+            "cursor" BIGINT NOT NULL,
+            digests JSONB NOT NULL,
+            synced_at TIMESTAMPTZ DEFAULT now(),
+            PRIMARY KEY (workbook_name, sheet_name)
+        )
+        """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS sheet_snapshot")
@@ -1,4 +1,24 @@
+import os
+import shutil
+
 import uvicorn
 
+from app.config import get_config
+
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", reload=True, port=1234)
+    if get_config().mode == "development":
+        uvicorn.run("app.main:app", host="0.0.0.0", reload=True, port=1234)
+    else:
+        # Same setup as gunicorn.conf.py, uvicorn reads the number of workers from WEB_CONCURRENCY
+        os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/aiotts-prometheus")
+        os.environ.setdefault("LOG_FILE_PER_PROCESS", "1")
+        shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+        os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=1234,
+            loop="uvloop",
+            http="httptools",
+        )
@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+# app.utils builds the database engine at import, no connection is opened
+for key, value in {
+    "MODE": "development",
+    "DB_USER": "test",
+    "DB_PASSWORD": "test",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "test",
+}.items():
+    os.environ.setdefault(key, value)
+os.environ.setdefault("SHARED_CACHE_DIR", tempfile.mkdtemp(prefix="test-cache-"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.utils.metrics import REQUEST_LATENCY  # noqa: E402
+
+
+def _latency_routes() -> set:
+    return {
+        sample.labels["route"]
+        for metric in REQUEST_LATENCY.collect()
+        for sample in metric.samples
+        if sample.name.endswith("_count")
+    }
+
+
+def test_routes_of_included_routers_get_their_own_series():
+    client = TestClient(app, raise_server_exceptions=False)
+
+    client.get("/aiotts/update/info")
+    client.get("/autopts/update/info")
+    client.get("/aiotts/label/search/TRK0000000001")
+
+    routes = _latency_routes()
+    assert "/aiotts/update/info" in routes
+    assert "/autopts/update/info" in routes
+    assert "/aiotts/label/search/{tracking_id}" in routes
+    assert "/info" not in routes